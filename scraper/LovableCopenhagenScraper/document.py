@@ -0,0 +1,115 @@
+# Per-response document context shared by vendor detection and extraction.
+#
+# Building the page text (`' '.join(response.css('body *::text').getall())`)
+# is the most expensive step of parsing a vendor page, so it is computed once
+# per response here and handed to every consumer instead of being rebuilt in
+# each callback.
+#
+# The document also pre-cleans the page: JSON-LD is parsed first, then
+# script, style, svg and template elements and comments are stripped from
+# the parsed tree in place. Every selector, text join and keyword scan after
+# that runs on the slimmed tree, which on rendered pages is a fraction of
+# the original markup.
+
+import json
+import weakref
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Set
+
+from lxml import etree
+
+from LovableCopenhagenScraper.extraction import CONTACT_EXTRACTOR, ExtractionResult, find_price
+
+# Elements that never hold vendor content (JSON-LD is read before they are removed)
+NON_CONTENT_TAGS = ('script', 'style', 'svg', 'template', etree.Comment)
+
+# JSON-LD of every pre-cleaned response: the tree is cleaned in place, so a
+# later document of the same response can no longer parse it from the page
+_cleaned: 'weakref.WeakKeyDictionary[Any, List[Any]]' = weakref.WeakKeyDictionary()
+
+
+class ResponseDocument:
+    """
+    Lazily computed, per-response view of a vendor page.
+
+    Each attribute is computed on first access and cached for the lifetime of
+    the document, so detection and the parse_* callbacks can share the work:
+
+    - root: the parsed lxml tree (shared with response.css/xpath), without
+      non-content elements once preclean() has run
+    - text: visible page text (all text nodes under <body>, space-joined)
+    - text_lower: lowercased page text, used for keyword matching
+    - contacts: phone and email candidates from a single pass over the
+      decoded body (script and style blocks skipped)
+    - price: amount of the first price in the page text
+    - json_ld: parsed JSON-LD blocks (invalid blocks are skipped)
+    - keyword_hits: keywords found in the page text, per category
+      (requires a KeywordMatcher)
+    """
+
+    def __init__(self, response, keyword_matcher=None):
+        self.response = response
+        self.keyword_matcher = keyword_matcher
+
+    @classmethod
+    def of(cls, response, keyword_matcher=None) -> 'ResponseDocument':
+        """A document of the response, pre-cleaning its tree on first use."""
+        doc = cls(response, keyword_matcher=keyword_matcher)
+        doc.preclean()
+        return doc
+
+    @property
+    def url(self) -> str:
+        return self.response.url
+
+    @property
+    def root(self):
+        return self.response.selector.root
+
+    def preclean(self) -> None:
+        """Parse the JSON-LD blocks, then strip non-content elements from the response's tree (once)."""
+        json_ld = _cleaned.get(self.response)
+        if json_ld is not None:
+            self.json_ld = json_ld
+            return
+        _cleaned[self.response] = self.json_ld  # must be read before the script elements go
+        etree.strip_elements(self.root, *NON_CONTENT_TAGS, with_tail=False)
+
+    @cached_property
+    def text(self) -> str:
+        return ' '.join(self.response.css('body *::text').getall())
+
+    @cached_property
+    def text_lower(self) -> str:
+        return self.text.lower()
+
+    @cached_property
+    def contacts(self) -> ExtractionResult:
+        return CONTACT_EXTRACTOR.extract(self.response.text)
+
+    @cached_property
+    def price(self) -> Optional[str]:
+        return find_price(self.text_lower)
+
+    @cached_property
+    def keyword_hits(self) -> Dict[str, Set[str]]:
+        return self.keyword_matcher.scan(self.text_lower)
+
+    @cached_property
+    def json_ld(self) -> List[Any]:
+        blocks = []
+        for raw in self.response.css('script[type="application/ld+json"]::text').getall():
+            try:
+                blocks.append(json.loads(raw))
+            except ValueError:
+                continue
+        return blocks
+
+    def json_ld_address(self) -> Dict[str, Any]:
+        """Return the first JSON-LD postal address object, or an empty dict."""
+        for data in self.json_ld:
+            if isinstance(data, dict):
+                addr = data.get('address')
+                if isinstance(addr, dict):
+                    return addr
+        return {}
@@ -0,0 +1,198 @@
+# Export artifacts published next to vendors.json for the frontend.
+#
+# vendors.json is indented for readability and is the largest static asset
+# the app fetches. When a run changed the catalogue, StoragePipeline also
+# writes, to data/ and public/:
+#
+#   vendors.min.json          minified JSON array
+#   vendors.columnar.json     one array per field; repeated strings (vendor_type,
+#                             amenities, event_types, ...) are replaced by indexes
+#                             into a per-field dictionary
+#   *.gz / *.br               pre-compressed copies of both, for servers that
+#                             serve precompressed files (gzip_static/brotli_static)
+#   vendors.manifest.json     size and SHA-256 of every file, for cache-busting
+#
+# Compressed files are deterministic (no timestamps), so unchanged content
+# keeps its hashes across runs.
+
+import gzip
+import hashlib
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from LovableCopenhagenScraper import jsonio
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - .br files are skipped
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_FORMAT = 'columnar-v1'
+
+# Fields whose strings (or lists of strings) are dictionary-encoded
+DEFAULT_DICTIONARY_FIELDS = (
+    'vendor_type', 'price_currency', 'event_types', 'amenities', 'cuisine_types', 'service_types',
+    'dietary_options', 'vehicle_types', 'features', 'activity_types', 'equipment_types', 'requirements',
+)
+
+MANIFEST_NAME = 'vendors.manifest.json'
+
+
+def _is_encodable(values: List[Any]) -> bool:
+    for value in values:
+        if value is None or isinstance(value, str):
+            continue
+        if isinstance(value, list) and all(isinstance(v, str) for v in value):
+            continue
+        return False
+    return True
+
+
+def encode_columnar(items: Sequence[Dict[str, Any]],
+                    dictionary_fields: Iterable[str] = DEFAULT_DICTIONARY_FIELDS) -> Dict[str, Any]:
+    """
+    Columnar encoding of a list of vendors.
+
+    Every field becomes a column of `count` values (null where a vendor does
+    not have it). Columns named in `dictionary_fields` that hold strings or
+    lists of strings are stored as {"dictionary": [...], "codes": [...]},
+    each code being an index into the dictionary (or a list of indexes).
+    """
+    columns: Dict[str, List[Any]] = {}
+    for position, item in enumerate(items):
+        for name, value in item.items():
+            column = columns.get(name)
+            if column is None:
+                column = columns[name] = [None] * position
+            column.append(value)
+        for column in columns.values():
+            if len(column) == position:
+                column.append(None)
+
+    dictionary_fields = set(dictionary_fields)
+    encoded: Dict[str, Any] = {}
+    for name, values in columns.items():
+        if name not in dictionary_fields or not _is_encodable(values):
+            encoded[name] = values
+            continue
+        codes_by_value: Dict[str, int] = {}
+        codes = []
+        for value in values:
+            if value is None:
+                codes.append(None)
+            elif isinstance(value, list):
+                codes.append([codes_by_value.setdefault(v, len(codes_by_value)) for v in value])
+            else:
+                codes.append(codes_by_value.setdefault(value, len(codes_by_value)))
+        encoded[name] = {'dictionary': list(codes_by_value), 'codes': codes}
+    return {'format': COLUMNAR_FORMAT, 'count': len(items), 'columns': encoded}
+
+
+def decode_columnar(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The vendors of a columnar export (fields in column order, nulls left out)."""
+    items: List[Dict[str, Any]] = [{} for _ in range(data['count'])]
+    for name, column in data['columns'].items():
+        if isinstance(column, dict):
+            dictionary = column['dictionary']
+            values = [None if code is None else
+                      [dictionary[c] for c in code] if isinstance(code, list) else dictionary[code]
+                      for code in column['codes']]
+        else:
+            values = column
+        for item, value in zip(items, values):
+            if value is not None:
+                item[name] = value
+    return items
+
+
+def _file_hash(path: str) -> Dict[str, Any]:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+            size += len(block)
+    return {'bytes': size, 'sha256': digest.hexdigest()}
+
+
+class ArtifactExporter:
+    """
+    Writes the export artifacts and their manifest to one or more directories.
+
+    Settings:
+        EXPORT_ARTIFACTS - write the artifacts (default True)
+        EXPORT_DICTIONARY_FIELDS - fields dictionary-encoded in the columnar export
+        EXPORT_GZIP_LEVEL - gzip compression level (default 9)
+        EXPORT_BROTLI_QUALITY - brotli quality (default 11; needs the brotli package)
+    """
+
+    def __init__(self, output_dirs: Sequence[str], dictionary_fields: Iterable[str] = DEFAULT_DICTIONARY_FIELDS,
+                 gzip_level: int = 9, brotli_quality: int = 11):
+        self.output_dirs = list(output_dirs)
+        self.dictionary_fields = tuple(dictionary_fields)
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        if brotli is None:
+            logger.warning("brotli is not installed; .br export files will not be written")
+
+    @classmethod
+    def from_settings(cls, settings, output_dirs: Sequence[str]) -> Optional['ArtifactExporter']:
+        if not settings.getbool('EXPORT_ARTIFACTS', True):
+            return None
+        return cls(
+            output_dirs,
+            dictionary_fields=settings.getlist('EXPORT_DICTIONARY_FIELDS') or DEFAULT_DICTIONARY_FIELDS,
+            gzip_level=settings.getint('EXPORT_GZIP_LEVEL', 9),
+            brotli_quality=settings.getint('EXPORT_BROTLI_QUALITY', 11),
+        )
+
+    def manifest_exists(self) -> bool:
+        return all(os.path.exists(os.path.join(d, MANIFEST_NAME)) for d in self.output_dirs)
+
+    def _compressed(self, name: str, data: bytes) -> Dict[str, bytes]:
+        files = {name: data, f'{name}.gz': gzip.compress(data, compresslevel=self.gzip_level, mtime=0)}
+        if brotli is not None:
+            files[f'{name}.br'] = brotli.compress(data, quality=self.brotli_quality)
+        return files
+
+    def export(self, items: Iterable[Dict[str, Any]], snapshot_name: str = 'vendors.json') -> Dict[str, Any]:
+        """
+        Write the artifacts for `items` and the manifest; returns the manifest.
+
+        `snapshot_name` is the already written snapshot in each directory; it
+        is listed in the manifest with the artifacts.
+        """
+        items = list(items)
+        files = self._compressed('vendors.min.json', jsonio.dumps(items))
+        files.update(self._compressed('vendors.columnar.json',
+                                      jsonio.dumps(encode_columnar(items, self.dictionary_fields))))
+
+        manifest = {
+            'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'count': len(items),
+            'files': {},
+        }
+        for name, data in files.items():
+            entry = {'bytes': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+            if name.endswith('.gz'):
+                entry['encoding'] = 'gzip'
+            elif name.endswith('.br'):
+                entry['encoding'] = 'br'
+            manifest['files'][name] = entry
+
+        for directory in self.output_dirs:
+            for name, data in files.items():
+                jsonio.atomic_write(os.path.join(directory, name), data)
+            files_manifest = dict(manifest)
+            snapshot_path = os.path.join(directory, snapshot_name)
+            if os.path.exists(snapshot_path):
+                files_manifest['files'] = {snapshot_name: _file_hash(snapshot_path), **manifest['files']}
+            jsonio.atomic_write(os.path.join(directory, MANIFEST_NAME), jsonio.dumps(files_manifest, indent=True))
+
+        sizes = ', '.join(f"{name} {entry['bytes']:,} B" for name, entry in manifest['files'].items())
+        logger.info(f"Exported {len(items)} vendors to {', '.join(self.output_dirs)}: {sizes}")
+        return manifest
@@ -0,0 +1,133 @@
+# Compiled contact and price extraction.
+#
+# The phone and email patterns are compiled once, at import time, into a
+# single alternation that walks the decoded body in one pass. Script and
+# style blocks, HTML comments and tag markup are consumed as opaque tokens so
+# digits inside inline JavaScript or attribute values are never reported as
+# phone numbers. Plain text, together with any tags that cannot hold a
+# mailto:/tel: link, is consumed in bulk up to the next digit, '+' or '@',
+# which keeps the regex engine from trying every pattern at every character.
+# Scanning stops as soon as every kind has enough candidates.
+#
+# Prices are matched on the visible page text instead (find_price): an amount
+# followed, after optional whitespace, by a currency word ('8500 kroner').
+
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+PHONE_PATTERN = r'\+?\d{2,3}[\s-]?\d{2,3}[\s-]?\d{2,4}[\s-]?\d{2,4}'
+EMAIL_PATTERN = r'[\w\.-]+@[\w\.-]+\.\w+'
+PRICE_PATTERN = r'(\d+)\s*(?:DKK|EUR|kr)'
+
+KINDS = ('phone', 'email')
+
+_TOKEN_RE = re.compile(
+    r'(?P<text>(?:[^<\d+@]+|<(?!(?i:script|style)\b|!--)[^>:]*>)+)'
+    r'|(?P<skip><(?P<block>(?i:script|style))\b[^>]*>.*?</(?P=block)\s*>|<!--.*?-->)'
+    r'|(?P<tag><[^>]*>)'
+    r'|(?P<phone>' + PHONE_PATTERN + r')'
+    # Emails are anchored on '@'; the local part is recovered from the text before it
+    r'|(?P<email>@[\w\.-]+\.\w+)',
+    re.DOTALL,
+)
+_LOCAL_PART_RE = re.compile(r'[\w\.-]+\Z')
+_EMAIL_RE = re.compile(EMAIL_PATTERN)
+_PHONE_RE = re.compile(PHONE_PATTERN)
+_PRICE_RE = re.compile(PRICE_PATTERN, re.IGNORECASE)
+
+
+class Candidate(NamedTuple):
+    """A single extracted value and its character offsets in the body."""
+    kind: str
+    value: str
+    start: int
+    end: int
+
+
+class ExtractionResult:
+    """Phone and email candidates found in a body, in document order."""
+
+    def __init__(self, candidates: Dict[str, List[Candidate]]):
+        self.candidates = candidates
+
+    def first(self, kind: str) -> Optional[str]:
+        found = self.candidates.get(kind)
+        return found[0].value if found else None
+
+    @property
+    def phone(self) -> Optional[str]:
+        return self.first('phone')
+
+    @property
+    def email(self) -> Optional[str]:
+        return self.first('email')
+
+
+class ContactExtractor:
+    """
+    Single-pass phone/email scanner over a decoded HTML body.
+
+    `limit` is the number of candidates kept per kind; the scan stops early
+    once all kinds have reached it. `mailto:` and `tel:` links inside tags
+    are still honoured.
+    """
+
+    def __init__(self, limit: int = 1):
+        self.limit = limit
+
+    def extract(self, body: str) -> ExtractionResult:
+        candidates: Dict[str, List[Candidate]] = {kind: [] for kind in KINDS}
+        missing = len(KINDS)
+        limit = self.limit
+
+        for match in _TOKEN_RE.finditer(body):
+            kind = match.lastgroup
+            if kind == 'text' or kind == 'skip':
+                continue
+            if kind == 'tag':
+                missing -= self._scan_tag(match, candidates)
+            elif len(candidates[kind]) < limit:
+                start = match.start()
+                if kind == 'email':
+                    local = _LOCAL_PART_RE.search(body, max(0, start - 64), start)
+                    if not local:
+                        continue
+                    start = local.start()
+                    value = body[start:match.end()]
+                else:
+                    value = match.group(kind)
+                candidates[kind].append(Candidate(kind, value, start, match.end()))
+                if len(candidates[kind]) == limit:
+                    missing -= 1
+            if not missing:
+                break
+
+        return ExtractionResult(candidates)
+
+    def _scan_tag(self, match, candidates: Dict[str, List[Candidate]]) -> int:
+        """Pick up mailto:/tel: links from a tag; returns the number of kinds completed."""
+        tag = match.group('tag')
+        if ':' not in tag:
+            return 0
+        lowered = tag.lower()
+        completed = 0
+        for kind, prefix, regex in (('email', 'mailto:', _EMAIL_RE), ('phone', 'tel:', _PHONE_RE)):
+            if len(candidates[kind]) >= self.limit or prefix not in lowered:
+                continue
+            found = regex.search(tag, lowered.index(prefix))
+            if found:
+                start = match.start() + found.start()
+                candidates[kind].append(Candidate(kind, found.group(0), start, start + len(found.group(0))))
+                if len(candidates[kind]) == self.limit:
+                    completed += 1
+        return completed
+
+
+def find_price(text: str) -> Optional[str]:
+    """Amount of the first price (e.g. '8500 kr', '450 DKK') in page text, without currency."""
+    match = _PRICE_RE.search(text)
+    return match.group(1) if match else None
+
+
+# Shared, module-level extractor used by every spider callback
+CONTACT_EXTRACTOR = ContactExtractor()
@@ -0,0 +1,129 @@
+# Process-pool execution of the spider's vendor extraction.
+#
+# Extraction (text joins, regex scans, keyword matching, JSON-LD parsing) is
+# CPU-bound and normally runs on the reactor thread, stalling downloads and
+# Playwright events while a large page is parsed. With the pool enabled the
+# spider hands (url, body, encoding) to a worker process instead and awaits
+# the resulting items, so the asyncio reactor keeps scheduling network I/O
+# and parsing scales across cores.
+#
+# The render gate's DOM checks (JSON-LD and vendor signals) and the not-vendor
+# check of pages without items run in the worker too, so the crawler never
+# parses a page it hands to the pool.
+#
+# Workers extract exactly as the crawler would in-process: they rebuild the
+# crawler's site adapters (SITE_ADAPTERS overrides, thresholds and the counts
+# loaded at startup), follow its probe decision for each page, and return the
+# selector hit counts they record with the items, to be merged and saved by
+# the crawler.
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from itemadapter import ItemAdapter
+from scrapy.http import HtmlResponse
+
+logger = logging.getLogger(__name__)
+
+# Per-process spider instance used by the workers (built once per worker)
+_extractor = None
+
+
+def _worker_extractor(adapter_state: Optional[Dict[str, Any]] = None):
+    global _extractor
+    if _extractor is None:
+        from LovableCopenhagenScraper.site_adapters import SiteAdapterRegistry
+        from LovableCopenhagenScraper.spiders.copenhagen_venue_spider import CopenhagenEventVendorSpider
+        _extractor = CopenhagenEventVendorSpider()
+        if adapter_state is not None:
+            _extractor.site_adapters = SiteAdapterRegistry.from_worker_state(_extractor.selector_plans,
+                                                                             adapter_state)
+    return _extractor
+
+
+def _init_worker(adapter_state: Optional[Dict[str, Any]] = None) -> None:
+    # Build the keyword automaton and the site adapters up front instead of on the first page
+    _worker_extractor(adapter_state)
+
+
+class PoolResult(NamedTuple):
+    """What a worker sends back for one page."""
+    items: List[Dict[str, Any]]
+    # Site adapter counts recorded for the page
+    counts: Dict[str, Any]
+    # Render gate signals (JSON-LD or vendor markup found)
+    has_signals: bool
+    # Why a detail page without items is not a vendor page (None: it looks like one)
+    not_vendor_reason: Optional[str] = None
+
+
+def extract_items(url: str, body: bytes, encoding: str, probe: Optional[bool] = None,
+                  rendered: bool = True, listing: bool = False, detail: bool = False) -> PoolResult:
+    """
+    Pure extraction function: check the page's vendor signals, detect its
+    vendor type and run the matching parse_* method. Items are returned as
+    plain dicts, so they can be pickled back to the crawler process. `probe`
+    is the crawler's probe decision for the page; a plain fetch (`rendered`
+    False) without signals is not extracted, the crawler renders it first.
+    """
+    extractor = _worker_extractor()
+    response = HtmlResponse(url=url, body=body, encoding=encoding)
+    has_signals = extractor._has_vendor_signals(response, listing)
+    if not rendered and not has_signals:
+        return PoolResult([], {}, False)
+    if probe is not None:
+        extractor.site_adapters.probes(response, probe)
+    items = [ItemAdapter(item).asdict() for item in extractor._extract_vendor(response)]
+    reason = extractor._not_vendor_reason(response) if detail and not items else None
+    return PoolResult(items, extractor.site_adapters.take_counts(), has_signals, reason)
+
+
+class ExtractionPool:
+    """
+    Pool of worker processes running `extract_items`.
+
+    Settings:
+        EXTRACTION_POOL_ENABLED - run extraction in the pool (default False)
+        EXTRACTION_POOL_WORKERS - worker processes (default: CPU count - 1)
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional['ExtractionPool']:
+        if not settings.getbool('EXTRACTION_POOL_ENABLED'):
+            return None
+        from scrapy.utils.reactor import is_asyncio_reactor_installed
+        if not is_asyncio_reactor_installed():
+            logger.warning("EXTRACTION_POOL_ENABLED requires the asyncio reactor; extracting in-process")
+            return None
+        return cls(settings.getint('EXTRACTION_POOL_WORKERS') or None)
+
+    def start(self, adapter_state: Optional[Dict[str, Any]] = None) -> None:
+        """Start the workers; `adapter_state` is SiteAdapterRegistry.worker_state() of the crawler."""
+        # Workers are spawned, not forked: the parent runs an event loop,
+        # a browser and threads that must not be duplicated
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(adapter_state,),
+        )
+        logger.info(f"Extraction pool started with {self.max_workers} workers")
+
+    async def extract(self, url: str, body: bytes, encoding: str, probe: Optional[bool] = None,
+                      rendered: bool = True, listing: bool = False, detail: bool = False) -> PoolResult:
+        """Run `extract_items` in a worker; the event loop stays free while it runs."""
+        return await asyncio.wrap_future(self.executor.submit(extract_items, url, body, encoding, probe,
+                                                              rendered, listing, detail))
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,343 @@
+# Persistent cross-run URL frontier.
+#
+# Scrapy's dupefilter only lives for one run and compares URLs literally, so
+# the same vendor is fetched again under tracking parameters, fragments and
+# locale variants, and pages that turned out not to be vendor pages are
+# fetched again on every run. The frontier canonicalizes URLs with per-domain
+# rules and keeps a compact seen-set on disk: a Bloom filter answers "never
+# seen" without touching the database, and an exact SQLite table of 64-bit
+# URL hashes holds the status of everything the filter might have seen.
+
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import struct
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from LovableCopenhagenScraper import jsonio
+
+logger = logging.getLogger(__name__)
+
+# Query parameters of known ad, analytics and session tools, which never change
+# page content. Generic names such as ref, source or sid select content on some
+# sites; drop those per domain with drop_params.
+TRACKING_PARAMS = frozenset([
+    'gclid', 'gclsrc', 'dclid', 'fbclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', '_hsenc', '_hsmi', 'phpsessid', 'jsessionid',
+])
+TRACKING_PREFIXES = ('utm_', 'pk_', 'mtm_', 'hsa_')
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Frontier statuses
+SCHEDULED = 'scheduled'
+NOT_VENDOR = 'not_vendor'
+
+
+class CanonicalizationRules:
+    """
+    URL canonicalization, with per-domain rules on top of the defaults.
+
+    Defaults for every URL: lowercase scheme and host, drop default ports,
+    fragments and tracking parameters, sort the remaining query parameters.
+
+    Per-domain options (FRONTIER_CANONICALIZATION, keyed by domain; subdomains
+    inherit their parent domain's rules):
+        drop_params - further query parameters to drop
+        keep_params - if set, drop every parameter not listed; listed
+            parameters are kept even if they are tracking parameters
+        locales - locale path prefixes that serve the same page, e.g. ["/da/", "/en/"]
+        preferred_locale - the prefix every variant is rewritten to (default: first of locales)
+        lowercase_path - treat paths case-insensitively
+    """
+
+    def __init__(self, rules: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.rules = {domain.lower(): options for domain, options in (rules or {}).items()}
+
+    def _rules_for(self, host: str) -> Dict[str, Any]:
+        labels = host.split('.')
+        for i in range(len(labels) - 1):
+            options = self.rules.get('.'.join(labels[i:]))
+            if options is not None:
+                return options
+        return {}
+
+    def canonicalize(self, url: str) -> str:
+        """The URL to fetch: same page, without tracking noise or locale variants."""
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or '').lower()
+        if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+            host = f"{host}:{parts.port}"
+        rules = self._rules_for(host.split(':')[0])
+
+        drop = set(rules.get('drop_params', ()))
+        keep = set(rules['keep_params']) if rules.get('keep_params') else None
+        query = sorted(
+            (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if self._keeps_param(key, keep, drop)
+        )
+
+        path = parts.path or '/'
+        locales = rules.get('locales')
+        if locales:
+            preferred = rules.get('preferred_locale') or locales[0]
+            for prefix in locales:
+                if path.startswith(prefix) or path == prefix.rstrip('/'):
+                    path = preferred + path[len(prefix):]
+                    break
+        if rules.get('lowercase_path'):
+            path = path.lower()
+
+        return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+    @staticmethod
+    def _keeps_param(key: str, keep: Optional[set], drop: set) -> bool:
+        if key in drop:
+            return False
+        if keep is not None:
+            # An explicit keep list overrides the tracking defaults
+            return key in keep
+        lowered = key.lower()
+        return lowered not in TRACKING_PARAMS and not lowered.startswith(TRACKING_PREFIXES)
+
+    def key(self, url: str) -> str:
+        """Identity of a page for de-duplication (www. and trailing slashes ignored)."""
+        parts = urlsplit(self.canonicalize(url))
+        host = parts.netloc[4:] if parts.netloc.startswith('www.') else parts.netloc
+        path = parts.path.rstrip('/') or '/'
+        return f"{host}{path}?{parts.query}" if parts.query else f"{host}{path}"
+
+
+def url_hash(key: str) -> int:
+    """Signed 64-bit hash of a frontier key (SQLite INTEGER PRIMARY KEY range)."""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+
+class BloomFilter:
+    """
+    Bloom filter over 64-bit URL hashes, persisted as a single file.
+
+    Bit positions come from double hashing the two 32-bit halves of the hash,
+    so the filter can always be rebuilt from the exact store.
+    """
+
+    _HEADER = struct.Struct('>4sQQQ')
+    _MAGIC = b'BLM1'
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value: int) -> Iterable[int]:
+        value &= 0xFFFFFFFFFFFFFFFF
+        h1 = value & 0xFFFFFFFF
+        h2 = (value >> 32) | 1
+        size = self.size
+        return ((h1 + i * h2) % size for i in range(self.hashes))
+
+    def add(self, value: int) -> None:
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: int) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def to_bytes(self) -> bytes:
+        return self._HEADER.pack(self._MAGIC, self.size, self.hashes, self.count) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, capacity: int, error_rate: float) -> Optional['BloomFilter']:
+        """Restore a saved filter; None if it is corrupt or was sized differently."""
+        bloom = cls(capacity, error_rate)
+        if len(data) < cls._HEADER.size:
+            return None
+        magic, size, hashes, count = cls._HEADER.unpack_from(data)
+        body = data[cls._HEADER.size:]
+        if magic != cls._MAGIC or size != bloom.size or hashes != bloom.hashes or len(body) != len(bloom.bits):
+            return None
+        bloom.bits[:] = body
+        bloom.count = count
+        return bloom
+
+
+class Frontier:
+    """
+    Cross-run seen-set of canonical URLs.
+
+    should_schedule() admits a URL unless it was already scheduled in this
+    run, is marked as not a vendor page, or (when `revisit_after` is given)
+    was fetched less than `revisit_after` seconds ago. A not-vendor mark
+    keeps its reason and expires after `not_vendor_ttl` seconds, so the page
+    is fetched and judged again.
+
+    Settings:
+        FRONTIER_ENABLED - use the frontier (default True)
+        FRONTIER_PATH - exact store (default data/frontier.sqlite; the Bloom
+            filter is kept next to it as frontier.bloom)
+        FRONTIER_CANONICALIZATION - per-domain canonicalization rules
+        FRONTIER_REVISIT_SECS - minimum age before a vendor page is fetched
+            again in a later run
+        FRONTIER_NOT_VENDOR_REVISIT_SECS - how long a page marked as not a
+            vendor page is skipped
+        FRONTIER_BLOOM_CAPACITY / FRONTIER_BLOOM_ERROR_RATE - filter sizing
+    """
+
+    def __init__(self, path: Optional[str] = None, rules: Optional[CanonicalizationRules] = None,
+                 capacity: int = 1_000_000, error_rate: float = 0.001, commit_every: int = 500,
+                 not_vendor_ttl: float = 30 * 86400):
+        self.path = path
+        self.rules = rules or CanonicalizationRules()
+        self.not_vendor_ttl = not_vendor_ttl
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.commit_every = commit_every
+        self.run_id = uuid.uuid4().hex
+        self.connection: Optional[sqlite3.Connection] = None
+        self.bloom: Optional[BloomFilter] = None
+        self.counts = Counter()
+        self._uncommitted = 0
+
+    @property
+    def bloom_path(self) -> Optional[str]:
+        return os.path.splitext(self.path)[0] + '.bloom' if self.path else None
+
+    def open(self) -> None:
+        if self.connection is not None:
+            return
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.connection = sqlite3.connect(self.path or ':memory:')
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                hash INTEGER PRIMARY KEY,
+                status TEXT NOT NULL,
+                run_id TEXT,
+                last_fetched REAL,
+                url TEXT,
+                reason TEXT,
+                revisit_at REAL
+            )
+        """)
+        # Stores created before not-vendor marks expired
+        columns = {row[1] for row in self.connection.execute('PRAGMA table_info(frontier)')}
+        for column, kind in (('reason', 'TEXT'), ('revisit_at', 'REAL')):
+            if column not in columns:
+                self.connection.execute(f'ALTER TABLE frontier ADD COLUMN {column} {kind}')
+        self.connection.commit()
+        self._load_bloom()
+
+    def _load_bloom(self) -> None:
+        rows = self.connection.execute('SELECT COUNT(*) FROM frontier').fetchone()[0]
+        capacity = self.capacity
+        while rows > capacity:
+            capacity *= 2
+        if self.bloom_path and os.path.exists(self.bloom_path):
+            with open(self.bloom_path, 'rb') as f:
+                self.bloom = BloomFilter.from_bytes(f.read(), capacity, self.error_rate)
+            if self.bloom is not None and self.bloom.count >= rows:
+                return
+        # Missing, stale or resized: rebuild from the exact store
+        self.bloom = BloomFilter(capacity, self.error_rate)
+        for (value,) in self.connection.execute('SELECT hash FROM frontier'):
+            self.bloom.add(value)
+        if rows:
+            logger.info(f"Rebuilt frontier Bloom filter from {rows} stored URLs")
+
+    def close(self) -> None:
+        if self.connection is None:
+            return
+        self.connection.commit()
+        self.connection.close()
+        self.connection = None
+        if self.bloom_path:
+            jsonio.atomic_write(self.bloom_path, self.bloom.to_bytes())
+
+    def canonicalize(self, url: str) -> str:
+        return self.rules.canonicalize(url)
+
+    def should_schedule(self, url: str, revisit_after: Optional[float] = None) -> bool:
+        """Admit a URL for fetching (and remember it), or reject it with a reason counted in `counts`."""
+        self.open()
+        value = url_hash(self.rules.key(url))
+        if value not in self.bloom:
+            # Definitely never seen: no database lookup needed
+            self._insert(value)
+            return True
+
+        row = self.connection.execute(
+            'SELECT status, run_id, last_fetched, revisit_at FROM frontier WHERE hash = ?', (value,)
+        ).fetchone()
+        if row is None:
+            self.counts['bloom_false_positive'] += 1
+            self._insert(value)
+            return True
+        status, run_id, last_fetched, revisit_at = row
+        if status == NOT_VENDOR:
+            if revisit_at and time.time() < revisit_at:
+                self.counts['skipped_not_vendor'] += 1
+                return False
+            # The mark has expired (marks without an expiry predate expiring marks)
+            self.counts['revisited_not_vendor'] += 1
+        elif run_id == self.run_id:
+            self.counts['skipped_duplicate'] += 1
+            return False
+        elif revisit_after and last_fetched and time.time() - last_fetched < revisit_after:
+            self.counts['skipped_recent'] += 1
+            return False
+        self.connection.execute(
+            'UPDATE frontier SET status = ?, run_id = ? WHERE hash = ?', (SCHEDULED, self.run_id, value)
+        )
+        self._written()
+        self.counts['scheduled'] += 1
+        return True
+
+    def _insert(self, value: int) -> None:
+        self.connection.execute(
+            'INSERT OR IGNORE INTO frontier (hash, status, run_id) VALUES (?, ?, ?)',
+            (value, SCHEDULED, self.run_id),
+        )
+        self.bloom.add(value)
+        self._written()
+        self.counts['scheduled'] += 1
+
+    def fetched(self, url: str) -> None:
+        """Record that a URL was downloaded."""
+        self.open()
+        self.connection.execute(
+            'UPDATE frontier SET last_fetched = ? WHERE hash = ?', (time.time(), url_hash(self.rules.key(url)))
+        )
+        self._written()
+
+    def mark_not_vendor(self, url: str, reason: str) -> None:
+        """Skip this URL (and every variant of it) for `not_vendor_ttl` seconds, remembering why."""
+        self.open()
+        value = url_hash(self.rules.key(url))
+        self.connection.execute("""
+            INSERT INTO frontier (hash, status, run_id, url, reason, revisit_at) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (hash) DO UPDATE SET status = excluded.status, url = excluded.url,
+                reason = excluded.reason, revisit_at = excluded.revisit_at
+        """, (value, NOT_VENDOR, self.run_id, url, reason, time.time() + self.not_vendor_ttl))
+        if value not in self.bloom:
+            self.bloom.add(value)
+        self._written()
+        self.counts['marked_not_vendor'] += 1
+
+    def _written(self) -> None:
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.connection.commit()
+            self._uncommitted = 0
@@ -0,0 +1,281 @@
+# Offline geocoding of vendor addresses.
+#
+# VendorMap used to geocode every address in the browser (one Nominatim call
+# per vendor on every map render). GeocodingPipeline resolves address_full
+# once at crawl time from a gazetteer shipped with the scraper and fills
+# `coordinates`:
+#
+#   gazetteer/postal_codes.csv   postal code (or code range) -> name, centroid
+#   gazetteer/streets.csv        street or place name + postal code -> centroid
+#
+# An address is matched as precisely as the gazetteer allows, and the result
+# records how precise it is:
+#
+#   street          street and postal code (or street in the same postal area)  0.9 / 0.75
+#   street          street without a postal code, known in one postal code      0.7
+#   postal_code     centroid of the postal code                                  0.6
+#   postal_district centroid of a code range (e.g. 1000-1499 København K)        0.4
+#   locality        centroid of a town or district named in the address          0.3
+#
+# The shipped gazetteer only covers Copenhagen and its surroundings, with the
+# inner-city code ranges as single rows and the streets vendors have been
+# seen on; GEOCODING_GAZETTEER_DIR points at fuller files of the same format.
+#
+# Results, including addresses that could not be resolved, are kept in a
+# SQLite cache together with a digest of the gazetteer, so they are recomputed
+# only when the gazetteer changes. Cache rows with precision 'manual' are
+# never recomputed: coordinates corrected by hand survive gazetteer updates.
+# No network access is needed.
+
+import csv
+import hashlib
+import io
+import logging
+import os
+import pkgutil
+import re
+import sqlite3
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_FILES = ('postal_codes.csv', 'streets.csv')
+
+CONFIDENCE = {
+    'street': 0.9,
+    'street_area': 0.75,
+    'street_unique': 0.7,
+    'postal_code': 0.6,
+    'postal_district': 0.4,
+    'locality': 0.3,
+}
+
+# English and transliterated place names found on vendor sites
+LOCALITY_ALIASES = {'copenhagen': 'kobenhavn', 'cph': 'kobenhavn', 'elsinore': 'helsingor'}
+
+ABBREVIATIONS = {'gl': 'gammel', 'skt': 'sankt', 'kbh': 'kobenhavn'}
+
+COUNTRY_NAMES = {'denmark', 'danmark', 'dk'}
+
+_POSTCODE = re.compile(r'\b(?:dk-?)?(\d{4})\b', re.IGNORECASE)
+_HOUSE_NUMBER = re.compile(r'\s+\d.*$')
+_DISTRICT_SUFFIX = re.compile(r'\s+(?:k|v|c|o|n|s|nv|sv)$')
+
+
+def fold(text: str) -> str:
+    """
+    Matching key of a name: lower case, no accents or punctuation, and Danish
+    letters folded so that 'Nørregade', 'Noerregade' and 'Norregade' agree.
+    """
+    text = text.casefold().replace('ø', 'o').replace('æ', 'a').replace('å', 'a')
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = text.replace('aa', 'a').replace('oe', 'o').replace('ae', 'a')
+    words = re.sub(r'[^a-z0-9]+', ' ', text).split()
+    return ' '.join(ABBREVIATIONS.get(word, word) for word in words)
+
+
+def parse_address(address: str) -> Tuple[Optional[str], List[str], List[str]]:
+    """
+    (street, postal code candidates, locality names) of a free-text address
+    such as 'Vester Søgade 6, 1601 Copenhagen V, Denmark'.
+    """
+    address = re.sub(r'\([^)]*\)', ' ', address)
+    segments = [s.strip() for s in address.split(',') if s.strip()]
+    segments = [s for s in segments if fold(s) not in COUNTRY_NAMES]
+    street = None
+    postcodes: List[str] = []
+    localities: List[str] = []
+    for position, segment in enumerate(segments):
+        codes = _POSTCODE.findall(segment)
+        if codes and (position > 0 or len(segments) == 1):
+            postcodes.extend(codes)
+            rest = _POSTCODE.sub(' ', segment).strip()
+            if rest:
+                localities.append(rest)
+        elif street is None and position == 0:
+            street = _HOUSE_NUMBER.sub('', segment).strip() or None
+        elif not re.search(r'\d', segment):
+            localities.append(segment)
+    return street, postcodes, localities
+
+
+def _locality_key(name: str) -> str:
+    """Folded locality name with an English or transliterated town name replaced ('Copenhagen V')."""
+    town, _, rest = fold(name).partition(' ')
+    return ' '.join(filter(None, [LOCALITY_ALIASES.get(town, town), rest]))
+
+
+class Gazetteer:
+    """Postal codes and streets loaded from the CSV files of a gazetteer directory."""
+
+    def __init__(self, postal_rows: List[Dict[str, str]], street_rows: List[Dict[str, str]], digest: str = ''):
+        self.digest = digest
+        self.postal_codes: Dict[int, Tuple[str, float, float]] = {}
+        self.postal_ranges: List[Tuple[int, int, str, float, float]] = []
+        self.localities: Dict[str, Tuple[float, float]] = {}
+        for row in postal_rows:
+            first, last = int(row['first']), int(row['last'] or row['first'])
+            entry = (row['name'], float(row['lat']), float(row['lng']))
+            if first == last:
+                self.postal_codes[first] = entry
+            else:
+                self.postal_ranges.append((first, last) + entry)
+            name = fold(row['name'])
+            self.localities.setdefault(name, entry[1:])
+            # 'København K' also names the town 'København'
+            self.localities.setdefault(_DISTRICT_SUFFIX.sub('', name), entry[1:])
+        self.streets: Dict[str, Dict[int, Tuple[float, float]]] = {}
+        for row in street_rows:
+            self.streets.setdefault(fold(row['name']), {})[int(row['postcode'])] = (
+                float(row['lat']), float(row['lng']))
+
+    @classmethod
+    def load(cls, directory: Optional[str] = None) -> 'Gazetteer':
+        """The gazetteer in `directory`, or the one shipped in the package."""
+        contents = []
+        for name in GAZETTEER_FILES:
+            if directory:
+                with open(os.path.join(directory, name), 'rb') as f:
+                    contents.append(f.read())
+            else:
+                contents.append(pkgutil.get_data(__package__, f'gazetteer/{name}'))
+        digest = hashlib.blake2b(b'\0'.join(contents), digest_size=8).hexdigest()
+        postal_rows, street_rows = (list(csv.DictReader(io.StringIO(data.decode('utf-8')))) for data in contents)
+        return cls(postal_rows, street_rows, digest)
+
+    def area(self, code: int) -> Optional[Tuple[int, int]]:
+        """The code, or code range, a postal code belongs to."""
+        if code in self.postal_codes:
+            return code, code
+        for first, last, *_ in self.postal_ranges:
+            if first <= code <= last:
+                return first, last
+        return None
+
+    def _postal(self, code: int) -> Optional[Tuple[float, float, str]]:
+        if code in self.postal_codes:
+            _, lat, lng = self.postal_codes[code]
+            return lat, lng, 'postal_code'
+        for first, last, _, lat, lng in self.postal_ranges:
+            if first <= code <= last:
+                return lat, lng, 'postal_district'
+        return None
+
+    def resolve(self, address: str) -> Optional[Dict[str, Any]]:
+        """{'lat', 'lng', 'confidence', 'precision'} of an address, or None if nothing matched."""
+        street, postcodes, localities = parse_address(address)
+        codes = [int(code) for code in postcodes if self.area(int(code))]
+        candidates = self.streets.get(fold(street), {}) if street else {}
+        # A known place may be named after the street ('Terminal 3, Kastrup Airport, 2770 Kastrup')
+        if not candidates:
+            for locality in localities:
+                candidates = self.streets.get(fold(locality), {})
+                if candidates:
+                    break
+
+        match = None
+        if candidates and codes:
+            code = codes[0]
+            if code in candidates:
+                match = candidates[code] + ('street',)
+            else:
+                area = self.area(code)
+                for candidate_code, point in candidates.items():
+                    if self.area(candidate_code) == area:
+                        match = point + ('street_area',)
+                        break
+        elif candidates and len(candidates) == 1:
+            match = next(iter(candidates.values())) + ('street_unique',)
+        if match is None and codes:
+            match = self._postal(codes[0])
+        if match is None:
+            for locality in localities + ([street] if street else []):
+                name = _locality_key(locality)
+                point = self.localities.get(name) or self.localities.get(_DISTRICT_SUFFIX.sub('', name))
+                if point:
+                    match = point + ('locality',)
+                    break
+        if match is None:
+            return None
+
+        lat, lng, kind = match
+        return {
+            'lat': round(lat, 5),
+            'lng': round(lng, 5),
+            'confidence': CONFIDENCE[kind],
+            'precision': kind if kind in ('postal_code', 'postal_district', 'locality') else 'street',
+        }
+
+
+class GeocodeCache:
+    """
+    SQLite cache of geocoding results keyed by the normalized address.
+
+    Rows remember the gazetteer digest they were computed with; a row from
+    another gazetteer is a miss (except 'manual' rows). Writes are committed
+    every `commit_every` results and on close.
+    """
+
+    def __init__(self, path: str, digest: str, commit_every: int = 100):
+        self.path = path
+        self.digest = digest
+        self.commit_every = commit_every
+        self.pending = 0
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def open(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS geocodes (
+                address TEXT PRIMARY KEY,
+                gazetteer TEXT NOT NULL,
+                lat REAL,
+                lng REAL,
+                confidence REAL,
+                precision TEXT,
+                updated_at REAL NOT NULL
+            )
+        """)
+
+    @staticmethod
+    def key(address: str) -> str:
+        return ' '.join(address.casefold().split())
+
+    def get(self, address: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """(hit, result); a cached miss is (True, None)."""
+        row = self.connection.execute(
+            'SELECT gazetteer, lat, lng, confidence, precision FROM geocodes WHERE address = ?',
+            (self.key(address),)).fetchone()
+        if row is None or (row[0] != self.digest and row[4] != 'manual'):
+            return False, None
+        if row[1] is None:
+            return True, None
+        # A hand-corrected row without a confidence is fully trusted
+        confidence = 1.0 if row[3] is None else row[3]
+        return True, {'lat': row[1], 'lng': row[2], 'confidence': confidence, 'precision': row[4]}
+
+    def put(self, address: str, result: Optional[Dict[str, Any]]) -> None:
+        result = result or {}
+        self.connection.execute(
+            'INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (self.key(address), self.digest, result.get('lat'), result.get('lng'),
+             result.get('confidence'), result.get('precision'), time.time()))
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.commit()
+
+    def commit(self) -> None:
+        if self.connection is not None and self.pending:
+            self.connection.commit()
+            self.pending = 0
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.commit()
+            self.connection.close()
+            self.connection = None
@@ -0,0 +1,254 @@
+# Compressed, content-addressed HTTP cache storage and an offline replay mode.
+#
+# Scrapy's FilesystemCacheStorage keeps one uncompressed directory per request,
+# so identical bodies served under several URLs are stored several times. This
+# storage keeps every distinct body once, zlib-compressed and named by its
+# SHA-1, plus a compact SQLite index that maps request fingerprints to
+# (status, headers, body hash). Entries are evicted by age and total size.
+#
+# With HTTPCACHE_REPLAY enabled the crawl is served entirely from the cache and
+# never touches the network, which makes selector work and profiling runs
+# repeatable at disk speed.
+
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from typing import Optional
+
+from scrapy.downloadermiddlewares.httpcache import HttpCacheMiddleware
+from scrapy.exceptions import NotConfigured
+from scrapy.extensions.httpcache import DummyPolicy
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.misc import load_object
+from scrapy.utils.project import data_path
+
+logger = logging.getLogger(__name__)
+
+
+class CompressedCacheStorage:
+    """
+    HTTPCACHE_STORAGE backend with compressed, de-duplicated bodies.
+
+    Layout under HTTPCACHE_DIR/<spider name>/:
+        index.sqlite       request fingerprint -> response metadata + body hash
+        bodies/ab/<sha1>   zlib-compressed response bodies, one file per content
+
+    Settings:
+        HTTPCACHE_EXPIRATION_SECS - entries older than this are ignored and
+            evicted (0 = never expire)
+        HTTPCACHE_MAX_SIZE_MB - compressed size budget; the oldest entries are
+            evicted beyond it (0 = unlimited)
+        HTTPCACHE_COMPRESSION_LEVEL - zlib level (default 6)
+        HTTPCACHE_REPLAY - never expire or evict (entries are only read)
+    """
+
+    def __init__(self, settings):
+        self.cachedir = data_path(settings['HTTPCACHE_DIR'])
+        self.replay = settings.getbool('HTTPCACHE_REPLAY')
+        self.expiration_secs = 0 if self.replay else settings.getint('HTTPCACHE_EXPIRATION_SECS')
+        self.max_bytes = settings.getint('HTTPCACHE_MAX_SIZE_MB', 0) * 1024 * 1024
+        self.compression_level = settings.getint('HTTPCACHE_COMPRESSION_LEVEL', 6)
+        self.connection: Optional[sqlite3.Connection] = None
+        self.spider_dir = None
+        self.total_bytes = 0
+
+    def open_spider(self, spider):
+        self._fingerprinter = spider.crawler.request_fingerprinter
+        self.spider_dir = os.path.join(self.cachedir, spider.name)
+        os.makedirs(os.path.join(self.spider_dir, 'bodies'), exist_ok=True)
+
+        self.connection = sqlite3.connect(os.path.join(self.spider_dir, 'index.sqlite'))
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                fingerprint TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                response_url TEXT NOT NULL,
+                headers BLOB NOT NULL,
+                body_hash TEXT NOT NULL,
+                timestamp REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_timestamp ON responses (timestamp);
+            CREATE INDEX IF NOT EXISTS responses_body_hash ON responses (body_hash);
+            CREATE TABLE IF NOT EXISTS bodies (
+                hash TEXT PRIMARY KEY,
+                stored_size INTEGER NOT NULL,
+                raw_size INTEGER NOT NULL
+            );
+        """)
+        self.connection.commit()
+        if not self.replay:
+            self.evict()
+        self.total_bytes = self._stored_bytes()
+        logger.debug(f"Using compressed cache storage in {self.spider_dir}")
+
+    def close_spider(self, spider):
+        if self.connection is None:
+            return
+        if not self.replay:
+            self.evict()
+        stats = self.connection.execute(
+            'SELECT COUNT(*), COALESCE(SUM(stored_size), 0), COALESCE(SUM(raw_size), 0) FROM bodies'
+        ).fetchone()
+        entries = self.connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        logger.info(f"HTTP cache: {entries} responses, {stats[0]} distinct bodies, "
+                    f"{stats[1] / 1024 / 1024:.1f} MB stored ({stats[2] / 1024 / 1024:.1f} MB uncompressed)")
+        self.connection.commit()
+        self.connection.close()
+        self.connection = None
+
+    def retrieve_response(self, spider, request):
+        """Return response if present in cache, or None otherwise."""
+        row = self.connection.execute(
+            'SELECT status, response_url, headers, body_hash, timestamp FROM responses WHERE fingerprint = ?',
+            (self._fingerprint(request),),
+        ).fetchone()
+        if row is None:
+            return None  # not cached
+        status, url, raw_headers, body_hash, timestamp = row
+        if self.expiration_secs > 0 and time.time() - timestamp > self.expiration_secs:
+            return None  # expired
+
+        try:
+            with open(self._body_path(body_hash), 'rb') as f:
+                body = zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            logger.warning(f"Cached body {body_hash} for {request.url} is missing or corrupt")
+            return None
+
+        headers = Headers(_headers_from_raw(raw_headers))
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        request.meta['cache_timestamp'] = timestamp
+        return respcls(url=url, headers=headers, status=status, body=body)
+
+    def store_response(self, spider, request, response):
+        """Store the given response in the cache, writing the body only if it is new."""
+        body_hash = hashlib.sha1(response.body).hexdigest()
+        known = self.connection.execute('SELECT 1 FROM bodies WHERE hash = ?', (body_hash,)).fetchone()
+        if not known:
+            compressed = zlib.compress(response.body, self.compression_level)
+            path = self._body_path(body_hash)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+            self.connection.execute(
+                'INSERT INTO bodies (hash, stored_size, raw_size) VALUES (?, ?, ?)',
+                (body_hash, len(compressed), len(response.body)),
+            )
+            self.total_bytes += len(compressed)
+
+        self.connection.execute("""
+            INSERT OR REPLACE INTO responses
+                (fingerprint, url, status, response_url, headers, body_hash, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            self._fingerprint(request), request.url, response.status, response.url,
+            _headers_to_raw(response.headers), body_hash, time.time(),
+        ))
+        self.connection.commit()
+
+        if self.max_bytes and self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the oldest ones beyond the size budget, then orphaned bodies."""
+        if self.expiration_secs > 0:
+            self.connection.execute('DELETE FROM responses WHERE timestamp < ?',
+                                    (time.time() - self.expiration_secs,))
+
+        if self.max_bytes:
+            # Walk entries newest first and keep them while the budget allows
+            budget = self.max_bytes
+            kept_bodies = set()
+            evicted = []
+            rows = self.connection.execute("""
+                SELECT r.fingerprint, r.body_hash, b.stored_size
+                FROM responses r JOIN bodies b ON b.hash = r.body_hash
+                ORDER BY r.timestamp DESC
+            """).fetchall()
+            for fingerprint, body_hash, size in rows:
+                if body_hash in kept_bodies:
+                    continue
+                if size <= budget:
+                    budget -= size
+                    kept_bodies.add(body_hash)
+                else:
+                    evicted.append((fingerprint,))
+            self.connection.executemany('DELETE FROM responses WHERE fingerprint = ?', evicted)
+
+        orphans = self.connection.execute("""
+            SELECT hash FROM bodies
+            WHERE NOT EXISTS (SELECT 1 FROM responses WHERE responses.body_hash = bodies.hash)
+        """).fetchall()
+        for (body_hash,) in orphans:
+            try:
+                os.remove(self._body_path(body_hash))
+            except FileNotFoundError:
+                pass
+        self.connection.executemany('DELETE FROM bodies WHERE hash = ?', orphans)
+        self.connection.commit()
+        self.total_bytes = self._stored_bytes()
+
+    def _stored_bytes(self) -> int:
+        return self.connection.execute('SELECT COALESCE(SUM(stored_size), 0) FROM bodies').fetchone()[0]
+
+    def _fingerprint(self, request) -> str:
+        return self._fingerprinter.fingerprint(request).hex()
+
+    def _body_path(self, body_hash: str) -> str:
+        return os.path.join(self.spider_dir, 'bodies', body_hash[:2], body_hash)
+
+
+class ReplayAwareHttpCacheMiddleware(HttpCacheMiddleware):
+    """
+    HttpCacheMiddleware with an offline replay mode.
+
+    With HTTPCACHE_REPLAY = True the cache is enabled regardless of
+    HTTPCACHE_ENABLED, every cached response is served as fresh (DummyPolicy)
+    and requests that are not in the cache are dropped instead of downloaded.
+    Cached responses are returned before the downloader's per-slot delays, so
+    a replayed crawl runs at disk speed.
+    """
+
+    def __init__(self, settings, stats):
+        self.replay = settings.getbool('HTTPCACHE_REPLAY')
+        if not (self.replay or settings.getbool('HTTPCACHE_ENABLED')):
+            raise NotConfigured
+        if self.replay:
+            self.policy = DummyPolicy(settings)
+        else:
+            self.policy = load_object(settings['HTTPCACHE_POLICY'])(settings)
+        self.storage = load_object(settings['HTTPCACHE_STORAGE'])(settings)
+        self.ignore_missing = self.replay or settings.getbool('HTTPCACHE_IGNORE_MISSING')
+        self.stats = stats
+
+    def spider_opened(self, spider):
+        super().spider_opened(spider)
+        if self.replay:
+            spider.logger.info("HTTP cache replay mode: serving from cache only, network disabled")
+
+
+def _headers_to_raw(headers) -> bytes:
+    lines = []
+    for key, values in headers.items():
+        for value in values:
+            lines.append(key + b': ' + value)
+    return b'\r\n'.join(lines)
+
+
+def _headers_from_raw(raw: bytes) -> dict:
+    headers = {}
+    for line in raw.split(b'\r\n'):
+        if not line:
+            continue
+        key, _, value = line.partition(b': ')
+        headers.setdefault(key, []).append(value)
+    return headers
@@ -0,0 +1,269 @@
+# Crawl instrumentation extension.
+#
+# Scrapy's core stats say how many requests and items a crawl produced, but
+# not where its time and bandwidth went. This extension times every spider
+# callback and parse_* extraction method (wall and CPU time histograms),
+# records download time of Playwright and plain requests separately, and
+# keeps per-domain counts of responses, bytes, items and dropped items. At
+# close the metrics are written as JSON and in the Prometheus text format
+# (for the node exporter's textfile collector or a Pushgateway).
+
+import functools
+import inspect
+import logging
+import os
+import time
+import types
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from LovableCopenhagenScraper import jsonio
+from LovableCopenhagenScraper.rendering import url_domain
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+DEFAULT_CALLBACKS = [
+    'parse', 'parse_vendor',
+    'parse_venue', 'parse_catering', 'parse_transport', 'parse_activities', 'parse_av_equipment',
+]
+
+METRIC_PREFIX = 'copenhagen_scraper'
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative buckets, as exported to Prometheus)."""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self) -> List[int]:
+        total, result = 0, []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'max': round(self.max, 6),
+            'buckets': {str(bound): n for bound, n in zip(self.buckets, self.cumulative())},
+        }
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class CrawlInstrumentation:
+    """
+    Extension recording where a crawl spends its time and bandwidth.
+
+    Callbacks are timed by wrapping the spider's methods when the spider
+    opens: the time of a call, and for generators the time of every step of
+    the iteration, is accumulated per invocation. Nested methods are timed
+    separately (parse_vendor includes the parse_venue it calls). Coroutine
+    callbacks (extraction pool) only get a wall time; their CPU time is spent
+    in the worker process.
+
+    Settings:
+        INSTRUMENTATION_ENABLED - turn the extension on/off (default True)
+        INSTRUMENTATION_CALLBACKS - spider methods to time
+        INSTRUMENTATION_JSON_PATH - JSON dump (default data/crawl_metrics.json)
+        INSTRUMENTATION_PROMETHEUS_PATH - Prometheus text file (default data/crawl_metrics.prom)
+    """
+
+    def __init__(self, callbacks: Sequence[str], json_path: Optional[str], prometheus_path: Optional[str],
+                 stats=None):
+        self.callbacks = list(callbacks)
+        self.json_path = json_path
+        self.prometheus_path = prometheus_path
+        self.stats = stats
+        self.wall: Dict[str, Histogram] = defaultdict(Histogram)
+        self.cpu: Dict[str, Histogram] = defaultdict(Histogram)
+        self.download: Dict[str, Histogram] = defaultdict(Histogram)
+        self.domains: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {'responses': 0, 'bytes': 0, 'items': 0, 'dropped': 0}
+        )
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('INSTRUMENTATION_ENABLED', True):
+            raise NotConfigured
+        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+        ext = cls(
+            settings.getlist('INSTRUMENTATION_CALLBACKS') or DEFAULT_CALLBACKS,
+            settings.get('INSTRUMENTATION_JSON_PATH') or os.path.join(data_dir, 'crawl_metrics.json'),
+            settings.get('INSTRUMENTATION_PROMETHEUS_PATH') or os.path.join(data_dir, 'crawl_metrics.prom'),
+            crawler.stats,
+        )
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(ext.response_received, signal=signals.response_received)
+        crawler.signals.connect(ext.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(ext.item_dropped, signal=signals.item_dropped)
+        return ext
+
+    # Callback timing
+
+    def spider_opened(self, spider):
+        for name in self.callbacks:
+            method = getattr(spider, name, None)
+            if inspect.ismethod(method):
+                # Still a bound method of the spider, so requests keep serializing by name
+                setattr(spider, name, types.MethodType(self._timed(name, method.__func__), spider))
+
+    def _timed(self, name: str, func):
+        @functools.wraps(func)
+        def wrapper(spider, *args, **kwargs):
+            started, started_cpu = time.perf_counter(), time.thread_time()
+            result = func(spider, *args, **kwargs)
+            wall, cpu = time.perf_counter() - started, time.thread_time() - started_cpu
+            if inspect.isgenerator(result):
+                return self._timed_iteration(name, result, wall, cpu)
+            if inspect.iscoroutine(result):
+                return self._timed_coroutine(name, result, wall)
+            self.observe(name, wall, cpu)
+            return result
+        return wrapper
+
+    def _timed_iteration(self, name: str, iterator, wall: float, cpu: float):
+        try:
+            while True:
+                started, started_cpu = time.perf_counter(), time.thread_time()
+                try:
+                    value = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    wall += time.perf_counter() - started
+                    cpu += time.thread_time() - started_cpu
+                yield value
+        finally:
+            self.observe(name, wall, cpu)
+
+    async def _timed_coroutine(self, name: str, coroutine, wall: float):
+        started = time.perf_counter()
+        try:
+            return await coroutine
+        finally:
+            self.observe(name, wall + time.perf_counter() - started, None)
+
+    def observe(self, name: str, wall: float, cpu: Optional[float]) -> None:
+        self.wall[name].observe(wall)
+        if cpu is not None:
+            self.cpu[name].observe(cpu)
+
+    # Downloads and items
+
+    def response_received(self, response, request, spider):
+        mode = 'playwright' if request.meta.get('playwright') else 'plain'
+        latency = request.meta.get('download_latency')
+        if latency is not None:
+            self.download[mode].observe(latency)
+        domain = self.domains[url_domain(response.url)]
+        domain['responses'] += 1
+        domain['bytes'] += len(response.body)
+
+    def item_scraped(self, item, response, spider):
+        if response is not None:
+            self.domains[url_domain(response.url)]['items'] += 1
+
+    def item_dropped(self, item, response, exception, spider):
+        # ValidationPipeline is the only pipeline that drops items
+        if response is not None:
+            self.domains[url_domain(response.url)]['dropped'] += 1
+
+    # Output
+
+    def snapshot(self) -> Dict[str, Any]:
+        total_bytes = sum(d['bytes'] for d in self.domains.values())
+        total_items = sum(d['items'] for d in self.domains.values())
+        domains = {}
+        for name, d in sorted(self.domains.items()):
+            domains[name] = dict(d)
+            domains[name]['items_per_response'] = round(d['items'] / d['responses'], 4) if d['responses'] else None
+            domains[name]['bytes_per_item'] = round(d['bytes'] / d['items']) if d['items'] else None
+        return {
+            'callbacks': {
+                name: {'wall_seconds': self.wall[name].to_dict(),
+                       'cpu_seconds': self.cpu[name].to_dict() if name in self.cpu else None}
+                for name in sorted(self.wall)
+            },
+            'download_seconds': {mode: h.to_dict() for mode, h in sorted(self.download.items())},
+            'bytes_per_item': round(total_bytes / total_items) if total_items else None,
+            'domains': domains,
+        }
+
+    def prometheus(self) -> str:
+        lines: List[str] = []
+
+        def histograms(metric: str, help_text: str, label: str, values: Dict[str, Histogram]):
+            if not values:
+                return
+            lines.append(f'# HELP {METRIC_PREFIX}_{metric} {help_text}')
+            lines.append(f'# TYPE {METRIC_PREFIX}_{metric} histogram')
+            for key, h in sorted(values.items()):
+                labels = f'{label}="{_label(key)}"'
+                for bound, n in zip(h.buckets, h.cumulative()):
+                    lines.append(f'{METRIC_PREFIX}_{metric}_bucket{{{labels},le="{bound}"}} {n}')
+                lines.append(f'{METRIC_PREFIX}_{metric}_bucket{{{labels},le="+Inf"}} {h.count}')
+                lines.append(f'{METRIC_PREFIX}_{metric}_sum{{{labels}}} {h.sum:.6f}')
+                lines.append(f'{METRIC_PREFIX}_{metric}_count{{{labels}}} {h.count}')
+
+        def per_domain(metric: str, kind: str, help_text: str, value):
+            lines.append(f'# HELP {METRIC_PREFIX}_{metric} {help_text}')
+            lines.append(f'# TYPE {METRIC_PREFIX}_{metric} {kind}')
+            for domain, d in sorted(self.domains.items()):
+                v = value(d)
+                if v is not None:
+                    lines.append(f'{METRIC_PREFIX}_{metric}{{domain="{_label(domain)}"}} {v:g}')
+
+        histograms('callback_wall_seconds', 'Wall time per callback invocation.', 'callback', self.wall)
+        histograms('callback_cpu_seconds', 'CPU time per callback invocation.', 'callback', self.cpu)
+        histograms('download_seconds', 'Download time by fetch mode.', 'mode', self.download)
+        if self.domains:
+            per_domain('responses_total', 'counter', 'Responses received per domain.', lambda d: d['responses'])
+            per_domain('response_bytes_total', 'counter', 'Response body bytes per domain.', lambda d: d['bytes'])
+            per_domain('items_total', 'counter', 'Items scraped per domain.', lambda d: d['items'])
+            per_domain('items_dropped_total', 'counter', 'Items dropped by validation per domain.',
+                       lambda d: d['dropped'])
+            per_domain('bytes_per_item', 'gauge', 'Response bytes downloaded per scraped item.',
+                       lambda d: d['bytes'] / d['items'] if d['items'] else None)
+        return '\n'.join(lines) + '\n'
+
+    def spider_closed(self, spider, reason):
+        snapshot = self.snapshot()
+        if self.stats is not None and snapshot['bytes_per_item'] is not None:
+            self.stats.set_value('instrumentation/bytes_per_item', snapshot['bytes_per_item'])
+        for path, data in ((self.json_path, jsonio.dumps(snapshot, indent=True)),
+                           (self.prometheus_path, self.prometheus().encode('utf-8'))):
+            if path:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                jsonio.atomic_write(path, data)
+        logger.info(f"Crawl metrics written to {self.json_path} and {self.prometheus_path}")
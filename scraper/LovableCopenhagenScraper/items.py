@@ -88,7 +88,7 @@ class VenueItem(scrapy.Item):
         input_processor=MapCompose(str.strip),
         output_processor=TakeFirst()
     )
-    coordinates = scrapy.Field()  # {'lat': float, 'lng': float}
+    coordinates = scrapy.Field()  # {'lat', 'lng', 'confidence', 'precision'}, see geocoding.py
     
     # Media
     images = scrapy.Field(
@@ -173,6 +173,7 @@ class CateringItem(scrapy.Item):
         input_processor=MapCompose(str.strip),
         output_processor=TakeFirst()
     )
+    coordinates = scrapy.Field()  # {'lat', 'lng', 'confidence', 'precision'}, see geocoding.py
     
     # Media
     images = scrapy.Field(
@@ -259,6 +260,7 @@ class TransportItem(scrapy.Item):
         input_processor=MapCompose(str.strip),
         output_processor=TakeFirst()
     )
+    coordinates = scrapy.Field()  # {'lat', 'lng', 'confidence', 'precision'}, see geocoding.py
     
     # Media
     images = scrapy.Field(
@@ -349,6 +351,7 @@ class ActivitiesItem(scrapy.Item):
         input_processor=MapCompose(str.strip),
         output_processor=TakeFirst()
     )
+    coordinates = scrapy.Field()  # {'lat', 'lng', 'confidence', 'precision'}, see geocoding.py
     
     # Media
     images = scrapy.Field(
@@ -433,6 +436,7 @@ class AVEquipmentItem(scrapy.Item):
         input_processor=MapCompose(str.strip),
         output_processor=TakeFirst()
     )
+    coordinates = scrapy.Field()  # {'lat', 'lng', 'confidence', 'precision'}, see geocoding.py
     
     # Media
     images = scrapy.Field(
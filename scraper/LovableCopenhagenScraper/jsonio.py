@@ -0,0 +1,72 @@
+# Fast JSON serialization and atomic file writes shared by the pipelines.
+#
+# orjson is used when it is installed; the standard library json module is
+# the fallback. All helpers work with UTF-8 encoded bytes.
+
+import json
+import os
+import tempfile
+from typing import Any, Iterable, Iterator
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+
+def dumps(obj: Any, indent: bool = False, sort_keys: bool = False) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes (non-ASCII characters are kept as-is)."""
+    if orjson is not None:
+        option = (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, option=option)
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False, sort_keys=sort_keys).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, sort_keys=sort_keys, separators=(',', ':')).encode('utf-8')
+
+
+def dumps_array(items: Iterable[Any]) -> Iterator[bytes]:
+    """
+    Serialize an iterable as an indented JSON array, one chunk per element.
+
+    The output is byte-for-byte what dumps(list(items), indent=True) produces,
+    without holding the whole list in memory.
+    """
+    first = True
+    for item in items:
+        chunk = dumps(item, indent=True).replace(b'\n', b'\n  ')
+        yield (b'[\n  ' if first else b',\n  ') + chunk
+        first = False
+    yield b'[]' if first else b'\n]'
+
+
+def loads(data) -> Any:
+    """Parse JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def atomic_write(path: str, data) -> None:
+    """
+    Write data (bytes, or an iterable of byte chunks) to path atomically.
+
+    The bytes are written to a temporary file in the same directory and then
+    renamed over the target, so readers never observe a partially written file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if isinstance(data, (bytes, bytearray)):
+                f.write(data)
+            else:
+                f.writelines(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,154 @@
+# Keyword vocabularies and a single-pass multi-keyword matcher.
+#
+# All vocabularies used for vendor detection and tag filling are compiled
+# into one Aho-Corasick automaton when the spider starts. A page is scanned
+# once and the matcher reports which keywords of each category occur, so the
+# cost per page scales with the page length rather than the vocabulary size.
+
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+try:
+    import ahocorasick  # pyahocorasick (C implementation)
+except ImportError:  # pragma: no cover - pure-Python fallback below
+    ahocorasick = None
+
+
+# Categories prefixed with 'url:' are matched against the lowercased URL,
+# 'page:' categories against the lowercased page text. The remaining
+# categories fill item tags; their keyword order is the order tags are listed in.
+KEYWORD_VOCABULARIES: Dict[str, List[str]] = {
+    # Vendor type detection - URL patterns
+    'url:catering': ['catering', 'cater', 'food', 'restaurant'],
+    'url:transport': ['transport', 'taxi', 'bus', 'limousine', 'chauffeur'],
+    'url:activities': ['activity', 'team-building', 'entertainment', 'eventyr', 'teambuilding'],
+    'url:av-equipment': ['av', 'sound', 'light', 'equipment', 'rental', 'projector'],
+    'url:venue': ['venue', 'meeting', 'conference', 'hall', 'room'],
+
+    # Vendor type detection - page content
+    'page:catering': ['catering', 'menu', 'cuisine', 'buffet'],
+    'page:transport': ['transport', 'vehicle', 'chauffeur', 'pickup'],
+    'page:activities': ['team building', 'activity', 'workshop', 'experience'],
+    'page:av-equipment': ['sound system', 'projector', 'microphone', 'av equipment'],
+
+    # Venues
+    'event_types': ['Conference', 'Gala', 'Dinner', 'Product Launch', 'Seminar', 'Workshop', 'Networking', 'Exhibition'],
+    'in_house_av': ['yes', 'available', 'included', 'in-house', 'ja', 'medfølger'],
+    'parking': ['parking', 'parkeringsplads'],
+    'wifi': ['wifi', 'wi-fi'],
+    'accessibility': ['accessible', 'tilgængelig', 'wheelchair'],
+
+    # Catering
+    'cuisine': ['italian', 'french', 'asian', 'danish', 'vegetarian', 'vegan', 'mediterranean'],
+    'service': ['buffet', 'plated', 'cocktail', 'canapes', 'breakfast', 'lunch', 'dinner'],
+
+    # Transport
+    'vehicle': ['bus', 'limousine', 'minivan', 'car', 'van', 'coach'],
+
+    # Activities
+    'activity': ['team-building', 'cooking', 'escape-room', 'workshop', 'networking', 'sports'],
+
+    # AV equipment
+    'equipment': ['projector', 'sound system', 'microphone', 'screen', 'speaker', 'lighting'],
+    'delivery': ['delivery', 'levering'],
+    'setup': ['setup', 'opsætning'],
+    'technical_support': ['support', 'teknisk'],
+}
+
+# Order in which vendor types are tried during detection
+VENDOR_TYPE_ORDER = ['catering', 'transport', 'activities', 'av-equipment', 'venue']
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over several keyword vocabularies.
+
+    Keywords are matched case-insensitively as substrings (the same semantics
+    as `keyword.lower() in text`), so callers pass already lowercased text.
+    `scan()` walks the text once and returns, per category, the set of
+    keywords (in their original spelling) that occur in it.
+
+    Uses pyahocorasick when installed and a pure-Python automaton otherwise.
+    """
+
+    def __init__(self, vocabularies: Dict[str, Iterable[str]]):
+        self.vocabularies: Dict[str, List[str]] = {
+            category: list(words) for category, words in vocabularies.items()
+        }
+
+        # One automaton key per distinct lowercased keyword; the payload lists
+        # every (category, keyword) pair that key belongs to.
+        outputs: Dict[str, List[Tuple[str, str]]] = {}
+        for category, words in self.vocabularies.items():
+            for word in words:
+                outputs.setdefault(word.lower(), []).append((category, word))
+        self._outputs = {key: tuple(pairs) for key, pairs in outputs.items()}
+
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for key, pairs in self._outputs.items():
+                self._automaton.add_word(key, pairs)
+            self._automaton.make_automaton()
+        else:
+            self._automaton = None
+            self._build_fallback()
+
+    def scan(self, text: str) -> Dict[str, Set[str]]:
+        """Scan lowercased text once and return the keywords found per category."""
+        hits: Dict[str, Set[str]] = {}
+        if not text:
+            return hits
+        for pairs in self._iter_matches(text):
+            for category, word in pairs:
+                hits.setdefault(category, set()).add(word)
+        return hits
+
+    def ordered(self, hits: Dict[str, Set[str]], category: str) -> List[str]:
+        """Return the keywords of a category that were hit, in vocabulary order."""
+        found = hits.get(category)
+        if not found:
+            return []
+        return [word for word in self.vocabularies[category] if word in found]
+
+    def _iter_matches(self, text: str):
+        if self._automaton is not None:
+            for _, pairs in self._automaton.iter(text):
+                yield pairs
+            return
+
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                yield from out[state]
+
+    def _build_fallback(self) -> None:
+        """Build goto/fail/output tables for the pure-Python automaton."""
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[Tuple[Tuple[str, str], ...]]] = [[]]
+        for key, pairs in self._outputs.items():
+            state = 0
+            for char in key:
+                if char not in goto[state]:
+                    goto.append({})
+                    out.append([])
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            out[state].append(pairs)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in goto[state].items():
+                queue.append(child)
+                link = fail[state]
+                while link and char not in goto[link]:
+                    link = fail[link]
+                fail[child] = goto[link].get(char, 0) if goto[link].get(char, 0) != child else 0
+                out[child] = out[child] + out[fail[child]]
+
+        self._goto, self._fail, self._out = goto, fail, out
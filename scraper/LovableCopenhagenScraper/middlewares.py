@@ -3,11 +3,19 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import os
+import time
+
 from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured, StopDownload
+from scrapy.utils.httpobj import urlparse_cached
 
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
 
+from LovableCopenhagenScraper.rendering import RenderProfiles, url_domain
+from LovableCopenhagenScraper.revalidation import ValidatorStore
+
 
 class LovableCopenhagenScraperSpiderMiddleware:
     # Not all methods need to be defined. If a method is not defined,
@@ -56,49 +64,246 @@ class LovableCopenhagenScraperSpiderMiddleware:
         spider.logger.info("Spider opened: %s" % spider.name)
 
 
-class LovableCopenhagenScraperDownloaderMiddleware:
-    # Not all methods need to be defined. If a method is not defined,
-    # scrapy acts as if the downloader middleware does not modify the
-    # passed objects.
+class IncrementalCrawlMiddleware:
+    """
+    Downloader middleware for incremental recrawls.
+
+    Remembers the ETag / Last-Modified headers of every vendor page that yielded
+    an item, together with that item. When the page is requested again (requests
+    flagged with meta['revalidate']), If-None-Match / If-Modified-Since are sent;
+    a 304 Not Modified response reaches the spider with the stored item in
+    meta['stored_item'], so parse_vendor can re-yield it without extraction.
+
+    Playwright requests are never revalidated - a browser navigation cannot make
+    use of a 304.
+
+    Settings:
+        INCREMENTAL_CRAWL_ENABLED - turn the middleware on/off (default True)
+        INCREMENTAL_STORE_PATH - validator store (default data/http_validators.sqlite)
+    """
+
+    def __init__(self, store: ValidatorStore, stats=None):
+        self.store = store
+        self.stats = stats
 
     @classmethod
     def from_crawler(cls, crawler):
-        # This method is used by Scrapy to create your spiders.
-        s = cls()
+        if not crawler.settings.getbool('INCREMENTAL_CRAWL_ENABLED', True):
+            raise NotConfigured
+        path = crawler.settings.get('INCREMENTAL_STORE_PATH') or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'http_validators.sqlite'
+        )
+        s = cls(ValidatorStore(path), crawler.stats)
         crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(s.item_scraped, signal=signals.item_scraped)
         return s
 
+    def _revalidates(self, request) -> bool:
+        return request.meta.get('revalidate') and not request.meta.get('playwright')
+
     def process_request(self, request, spider):
-        # Called for each request that goes through the downloader
-        # middleware.
-
-        # Must either:
-        # - return None: continue processing this request
-        # - or return a Response object
-        # - or return a Request object
-        # - or raise IgnoreRequest: process_exception() methods of
-        #   installed downloader middleware will be called
+        if not self._revalidates(request):
+            return None
+
+        entry = self.store.get(request.url)
+        if not entry or not entry['item'] or not (entry['etag'] or entry['last_modified']):
+            return None
+
+        if entry['etag']:
+            request.headers.setdefault('If-None-Match', entry['etag'])
+        if entry['last_modified']:
+            request.headers.setdefault('If-Modified-Since', entry['last_modified'])
+        request.meta['handle_httpstatus_list'] = list(request.meta.get('handle_httpstatus_list', [])) + [304]
+        request.meta['stored_item'] = entry['item']
+        self.stats.inc_value('incremental/revalidated')
         return None
 
     def process_response(self, request, response, spider):
-        # Called with the response returned from the downloader.
+        if not self._revalidates(request):
+            return response
 
-        # Must either;
-        # - return a Response object
-        # - return a Request object
-        # - or raise IgnoreRequest
-        return response
+        if response.status == 304 and 'stored_item' in request.meta:
+            self.stats.inc_value('incremental/not_modified')
+            return response
 
-    def process_exception(self, request, exception, spider):
-        # Called when a download handler or a process_request()
-        # (from other downloader middleware) raises an exception.
+        # Fresh content: whatever was stored for this URL is outdated now
+        request.meta.pop('stored_item', None)
+        if response.status == 200:
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            self.store.set_validators(
+                response.url,
+                etag.decode('latin-1') if etag else None,
+                last_modified.decode('latin-1') if last_modified else None,
+            )
+            if 'If-None-Match' in request.headers or 'If-Modified-Since' in request.headers:
+                self.stats.inc_value('incremental/modified')
+        return response
 
-        # Must either:
-        # - return None: continue processing this exception
-        # - return a Response object: stops process_exception() chain
-        # - return a Request object: stops process_exception() chain
-        pass
+    def item_scraped(self, item, response, spider):
+        if response is not None and self._revalidates(response.request) and response.status in (200, 304):
+            self.store.set_item(response.url, ItemAdapter(item).asdict())
 
     def spider_opened(self, spider):
-        spider.logger.info("Spider opened: %s" % spider.name)
+        self.store.open()
+        spider.logger.info("Incremental crawl enabled, validator store: %s" % self.store.path)
+
+    def spider_closed(self, spider):
+        self.store.close()
+
+
+class RenderProfileMiddleware:
+    """
+    Downloader middleware that applies per-domain rendering profiles to
+    Playwright requests and records render-time stats.
+
+    Every request with meta['playwright'] gets the browser context, route
+    interception (aborted resource types / third-party URLs) and wait target
+    of its domain's RenderProfile, unless the request already sets
+    playwright_page_methods itself. meta['render_target'] = 'listing' selects
+    the listing wait selector.
 
+    Stats (render/...): pages, time_ms_total, time_ms_max, per-domain
+    time_ms/<domain> and pages/<domain>, wait_timeouts, blocked_requests.
+
+    Settings:
+        RENDER_PROFILE_DEFAULTS - options applied to every domain
+        RENDER_PROFILES - per-domain overrides, keyed by domain
+        RENDER_CONTEXT_POOL_SIZE - number of pooled browser contexts
+    """
+
+    def __init__(self, profiles: RenderProfiles, stats=None):
+        self.profiles = profiles
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(RenderProfiles.from_settings(crawler.settings, crawler.stats), crawler.stats)
+
+    def process_request(self, request, spider):
+        if not request.meta.get('playwright') or 'playwright_page_methods' in request.meta:
+            return None
+        profile = self.profiles.for_url(request.url)
+        for key, value in profile.meta(listing=request.meta.get('render_target') == 'listing').items():
+            request.meta.setdefault(key, value)
+        request.meta['render_profile'] = profile.domain
+        return None
+
+    def process_response(self, request, response, spider):
+        started = request.meta.pop('render_started', None)
+        if started is None:
+            return response
+
+        elapsed_ms = int((time.monotonic() - started) * 1000)
+        domain = request.meta.get('render_profile')
+        self.stats.inc_value('render/pages')
+        self.stats.inc_value('render/time_ms_total', elapsed_ms)
+        self.stats.max_value('render/time_ms_max', elapsed_ms)
+        self.stats.inc_value(f'render/pages/{domain}')
+        self.stats.inc_value(f'render/time_ms/{domain}', elapsed_ms)
+        if any(method.result is False for method in request.meta.get('playwright_page_methods', ())):
+            self.stats.inc_value('render/wait_timeouts')
+            spider.logger.debug(f"Rendered {request.url} without its wait target after {elapsed_ms} ms")
+        return response
+
+
+class ResponseBudgetMiddleware:
+    """
+    Downloader middleware enforcing a body size budget per domain and
+    dropping non-HTML responses before they reach the spider.
+
+    Plain requests get meta['download_maxsize'] from their domain's budget, so
+    Scrapy cancels an oversized download while it streams, and a download
+    whose Content-Type is not HTML is stopped as soon as its headers arrive.
+    Playwright responses are checked after rendering, before any parsing.
+    Requests that set meta['download_maxsize'] themselves keep it.
+
+    Only requests the spider parses are filtered: robots.txt, requests with
+    meta['dont_obey_robotstxt'] and requests without a callback (Scrapy's
+    own, such as RobotsTxtMiddleware's) pass through untouched, so robots
+    rules served as text/plain are still read and honoured.
+
+    Stats (budget/...): non_html, oversized, and per-domain
+    non_html/<domain>, oversized/<domain>.
+
+    Settings:
+        RESPONSE_MAX_SIZE - default body budget in bytes (0 = unlimited)
+        RESPONSE_MAX_SIZE_PER_DOMAIN - per-domain budgets, keyed by domain
+            (subdomains inherit their parent domain's budget)
+        RESPONSE_ALLOWED_CONTENT_TYPES - accepted content types (a missing
+            Content-Type header is accepted)
+    """
+
+    def __init__(self, max_size: int, per_domain: dict, allowed_types, stats=None):
+        self.max_size = max_size
+        self.per_domain = {domain.lower(): size for domain, size in per_domain.items()}
+        self.allowed_types = tuple(t.lower() for t in allowed_types)
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        s = cls(
+            settings.getint('RESPONSE_MAX_SIZE', 0),
+            settings.getdict('RESPONSE_MAX_SIZE_PER_DOMAIN'),
+            settings.getlist('RESPONSE_ALLOWED_CONTENT_TYPES') or ['text/html', 'application/xhtml+xml'],
+            crawler.stats,
+        )
+        crawler.signals.connect(s.headers_received, signal=signals.headers_received)
+        return s
+
+    def budget(self, url: str) -> int:
+        labels = url_domain(url).split('.')
+        for i in range(len(labels) - 1):
+            size = self.per_domain.get('.'.join(labels[i:]))
+            if size is not None:
+                return int(size)
+        return self.max_size
+
+    def _is_html(self, headers) -> bool:
+        content_type = headers.get('Content-Type')
+        if not content_type:
+            return True
+        return content_type.decode('latin-1').split(';')[0].strip().lower() in self.allowed_types
+
+    def _count(self, reason: str, url: str) -> None:
+        self.stats.inc_value(f'budget/{reason}')
+        self.stats.inc_value(f'budget/{reason}/{url_domain(url)}')
+
+    @staticmethod
+    def applies(request) -> bool:
+        """Whether a request is one the spider will parse."""
+        if request.callback is None or request.meta.get('dont_obey_robotstxt'):
+            return False
+        return not urlparse_cached(request).path.endswith('/robots.txt')
+
+    def process_request(self, request, spider):
+        if not self.applies(request):
+            return None
+        if not request.meta.get('playwright'):
+            budget = self.budget(request.url)
+            if budget:
+                request.meta.setdefault('download_maxsize', budget)
+        return None
+
+    def headers_received(self, headers, body_length, request, spider):
+        if self.applies(request) and not self._is_html(headers):
+            request.meta['budget_stopped'] = 'non_html'
+            raise StopDownload(fail=False)
+
+    def process_response(self, request, response, spider):
+        if not self.applies(request):
+            return response
+        reason = request.meta.pop('budget_stopped', None)
+        if reason is None and response.status == 200:
+            if not self._is_html(response.headers):
+                reason = 'non_html'
+            else:
+                budget = request.meta.get('download_maxsize') or self.budget(request.url)
+                if budget and len(response.body) > budget:
+                    reason = 'oversized'
+        if reason is not None:
+            self._count(reason, request.url)
+            raise IgnoreRequest(f"Response {reason.replace('_', '-')}: {request.url}")
+        return response
@@ -0,0 +1,172 @@
+# Partitioned vendor output.
+#
+# vendors.json holds every vendor type, so a screen that only needs catering
+# still downloads and parses the whole catalogue. StoragePipeline also writes
+# one file per vendor_type - optionally one per source domain within each
+# type - and a small manifest with the count and hashes of every partition:
+#
+#   partitions/manifest.json
+#   partitions/catering.json               (PARTITIONS_BY_DOMAIN = False)
+#   partitions/catering/example.dk.json    (PARTITIONS_BY_DOMAIN = True)
+#
+# A partition's fingerprint is computed from the keys and content hashes the
+# vendor index already keeps, so the partitions that changed are found with
+# one scan of the index without loading any item. Only those are rewritten;
+# partitions that became empty are removed.
+
+import hashlib
+import logging
+import os
+import re
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from LovableCopenhagenScraper import jsonio
+from LovableCopenhagenScraper.rendering import url_domain
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+UNKNOWN = 'unknown'
+
+
+def _safe(name: str) -> str:
+    return re.sub(r'[^a-z0-9._-]', '_', name.lower()) or UNKNOWN
+
+
+class PartitionWriter:
+    """
+    Writes vendor partitions and their manifest to one or more directories.
+
+    Settings:
+        PARTITIONS_ENABLED - write partitions (default True)
+        PARTITIONS_BY_DOMAIN - one file per vendor type and source domain (default False)
+        PARTITIONS_DIR - directory name inside data/ and public/ (default 'partitions')
+    """
+
+    def __init__(self, output_dirs: Sequence[str], by_domain: bool = False, dirname: str = 'partitions'):
+        self.directories = [os.path.join(directory, dirname) for directory in output_dirs]
+        self.by_domain = by_domain
+        self.counts = {'written': 0, 'unchanged': 0, 'removed': 0}
+
+    @classmethod
+    def from_settings(cls, settings, output_dirs: Sequence[str]) -> Optional['PartitionWriter']:
+        if not settings.getbool('PARTITIONS_ENABLED', True):
+            return None
+        return cls(output_dirs, settings.getbool('PARTITIONS_BY_DOMAIN', False),
+                   settings.get('PARTITIONS_DIR', 'partitions'))
+
+    def partition_of(self, key: str, vendor_type: Optional[str]) -> Tuple[str, Optional[str]]:
+        """(partition name, domain) of an indexed vendor."""
+        name = _safe(vendor_type or UNKNOWN)
+        if not self.by_domain:
+            return name, None
+        domain = UNKNOWN if key.startswith('hash:') else url_domain(key) or UNKNOWN
+        return f"{name}/{_safe(domain)}", domain
+
+    def _scan(self, index) -> 'OrderedDict[str, Dict[str, Any]]':
+        """Fingerprint and count of every partition, from the index's keys and content hashes."""
+        partitions: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        for key, vendor_type, digest in index.iter_hashes():
+            name, domain = self.partition_of(key, vendor_type)
+            partition = partitions.get(name)
+            if partition is None:
+                partition = partitions[name] = {
+                    'vendor_type': vendor_type, 'domain': domain, 'count': 0,
+                    'hash': hashlib.blake2b(digest_size=16),
+                }
+            partition['count'] += 1
+            partition['hash'].update(f"{key}\0{digest}\n".encode('utf-8'))
+        for partition in partitions.values():
+            partition['fingerprint'] = partition.pop('hash').hexdigest()
+        return partitions
+
+    @staticmethod
+    def _load_manifest(directory: str) -> Dict[str, Any]:
+        path = os.path.join(directory, MANIFEST_NAME)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'rb') as f:
+                return jsonio.loads(f.read()).get('partitions', {})
+        except (ValueError, IOError, AttributeError) as e:
+            logger.warning(f"Could not read partition manifest {path}: {e}. Rewriting all partitions.")
+            return {}
+
+    def _items(self, index, vendor_type: Optional[str]) -> Iterator[Dict[str, Any]]:
+        if vendor_type is not None:
+            return index.iter_items(vendor_type)
+        return (item for item in index.iter_items() if item.get('vendor_type') is None)
+
+    def write(self, index) -> Dict[str, Any]:
+        """Rewrite the partitions that changed since the last manifest; returns the new manifest."""
+        current = self._scan(index)
+        previous = {directory: self._load_manifest(directory) for directory in self.directories}
+
+        # A partition is rewritten in every directory where its fingerprint differs or its file is gone
+        stale: Dict[str, List[str]] = {}
+        for name, partition in current.items():
+            for directory in self.directories:
+                entry = previous[directory].get(name)
+                if (entry is None or entry.get('fingerprint') != partition['fingerprint']
+                        or not os.path.exists(os.path.join(directory, entry.get('path', '')))):
+                    stale.setdefault(name, []).append(directory)
+
+        # Load the items of stale partitions, one index query per vendor type
+        contents: Dict[str, List[Dict[str, Any]]] = {name: [] for name in stale}
+        for vendor_type in {current[name]['vendor_type'] for name in stale}:
+            for item in self._items(index, vendor_type):
+                name, _ = self.partition_of(item.get('url_source') or 'hash:', vendor_type)
+                if name in contents:
+                    contents[name].append(item)
+
+        manifest_partitions: Dict[str, Dict[str, Any]] = {}
+        for name, partition in current.items():
+            path = f"{name}.json"
+            if name in stale:
+                data = jsonio.dumps(contents[name])
+                entry = {'bytes': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+                for directory in stale[name]:
+                    jsonio.atomic_write(os.path.join(directory, path), data)
+                self.counts['written'] += 1
+            else:
+                entry = {key: previous[self.directories[0]][name][key] for key in ('bytes', 'sha256')}
+                self.counts['unchanged'] += 1
+            manifest_partitions[name] = {
+                'path': path,
+                'vendor_type': partition['vendor_type'],
+                **({'domain': partition['domain']} if self.by_domain else {}),
+                'count': partition['count'],
+                **entry,
+                'fingerprint': partition['fingerprint'],
+            }
+
+        manifest = {
+            'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'by_domain': self.by_domain,
+            'count': sum(p['count'] for p in current.values()),
+            'partitions': manifest_partitions,
+        }
+        for directory in self.directories:
+            for name, entry in previous[directory].items():
+                if name not in current:
+                    self._remove(directory, entry.get('path', f"{name}.json"))
+            if stale or set(previous[directory]) != set(current):
+                jsonio.atomic_write(os.path.join(directory, MANIFEST_NAME), jsonio.dumps(manifest, indent=True))
+
+        logger.info(f"Partitions: {len(stale)} of {len(current)} rewritten"
+                    f"{' (by domain)' if self.by_domain else ''}")
+        return manifest
+
+    def _remove(self, directory: str, path: str) -> None:
+        full_path = os.path.join(directory, path)
+        if os.path.exists(full_path):
+            os.remove(full_path)
+            self.counts['removed'] += 1
+        parent = os.path.dirname(full_path)
+        if parent != directory:
+            try:
+                os.rmdir(parent)
+            except OSError:
+                pass
@@ -4,13 +4,22 @@
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 
 import re
-import json
 import os
-import shutil
+import time
 import logging
 from itemadapter import ItemAdapter
-from typing import Dict, Any, Optional, List
-from scrapy.exceptions import DropItem
+from typing import Dict, Any, Optional
+from scrapy.exceptions import DropItem, NotConfigured
+
+from LovableCopenhagenScraper import jsonio
+from LovableCopenhagenScraper.exports import ArtifactExporter
+from LovableCopenhagenScraper.geocoding import GeocodeCache, Gazetteer
+from LovableCopenhagenScraper.partitions import PartitionWriter
+from LovableCopenhagenScraper.records import VendorRecord, to_record
+from LovableCopenhagenScraper.snapshots import SnapshotVersioner
+from LovableCopenhagenScraper.storage_backends import BatchWriter, WriterThread, backend_from_settings
+from LovableCopenhagenScraper.validation import rejection_reason
+from LovableCopenhagenScraper.vendor_index import ADDED, UPDATED, UNCHANGED, VendorIndex
 
 logger = logging.getLogger(__name__)
 
@@ -25,31 +34,20 @@ class ValidationPipeline:
     def process_item(self, item, spider):
         adapter = ItemAdapter(item)
         
-        # Validate required fields - name is always required
+        # Name is always required; venues also need an address in the Copenhagen area
+        # (the same rules the spider checks before building an item)
         name = adapter.get('name')
-        if not name or not name.strip():
-            logger.warning(f"Item dropped: Missing 'name' field. URL: {adapter.get('url_source')}")
-            raise DropItem(f"Missing required field: name")
-        
-        # For venues, address is required. For other types, it's optional but preferred
         vendor_type = adapter.get('vendor_type', 'venue')
         address_full = adapter.get('address_full')
         
-        if vendor_type == 'venue':
-            if not address_full or not address_full.strip():
-                logger.warning(f"Venue dropped: Missing 'address_full' field. URL: {adapter.get('url_source')}")
-                raise DropItem(f"Missing required field: address_full for venue")
-            
-            # Validate that venue address contains Copenhagen or Denmark
-            address_lower = address_full.lower()
-            if 'copenhagen' not in address_lower and 'denmark' not in address_lower and 'københavn' not in address_lower:
-                logger.warning(f"Venue dropped: Address does not appear to be in Copenhagen area. "
-                             f"Address: {address_full}, URL: {adapter.get('url_source')}")
-                raise DropItem(f"Address does not appear to be in Copenhagen area: {address_full}")
-        else:
-            # For other vendor types, address is optional but log if missing
-            if not address_full or not address_full.strip():
-                logger.info(f"Vendor {vendor_type} has no address (optional): {name}")
+        reason = rejection_reason(vendor_type, name, address_full)
+        if reason:
+            logger.warning(f"Item dropped: {reason}. URL: {adapter.get('url_source')}")
+            raise DropItem(reason)
+        
+        # For other vendor types, address is optional but log if missing
+        if not address_full or not address_full.strip():
+            logger.info(f"Vendor {vendor_type} has no address (optional): {name}")
         
         return item
 
@@ -58,6 +56,8 @@ class CleaningPipeline:
     """
     Pipeline to clean and standardize extracted data.
     Focuses on price normalization and data formatting.
+    Returns the cleaned item as a compact typed VendorRecord (see records.py)
+    with capacity, price and rating parsed into numbers.
     """
     
     def process_item(self, item, spider):
@@ -86,7 +86,7 @@ class CleaningPipeline:
                 event_types = [e.strip() for e in re.split(r'[,;|]', event_types) if e.strip()]
             adapter['event_types'] = event_types
         
-        return item
+        return to_record(item)
     
     def _clean_price(self, price_str: str) -> str:
         """
@@ -164,189 +164,421 @@ class CleaningPipeline:
         return capacity_str.strip()
 
 
+class GeocodingPipeline:
+    """
+    Pipeline to resolve address_full to coordinates offline, from the gazetteer
+    shipped with the scraper and a persistent result cache (see geocoding.py).
+    Fills `coordinates` with lat, lng, a confidence between 0 and 1 and the
+    precision of the match; items that already have coordinates are kept.
+    """
+    
+    def __init__(self, gazetteer: Gazetteer, cache_path: Optional[str] = None):
+        scraper_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.gazetteer = gazetteer
+        self.cache = GeocodeCache(cache_path or os.path.join(scraper_dir, 'data', 'geocode_cache.sqlite'),
+                                  gazetteer.digest)
+        # Results of this run by normalized address (vendors often share an address)
+        self.results: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.counts: Dict[str, int] = {}
+        self.stats = None
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('GEOCODING_ENABLED', True):
+            raise NotConfigured('GEOCODING_ENABLED is False')
+        cache_path = settings.get('GEOCODING_CACHE_PATH')
+        if not cache_path and settings.get('STORAGE_DATA_DIR'):
+            cache_path = os.path.join(settings.get('STORAGE_DATA_DIR'), 'geocode_cache.sqlite')
+        pipeline = cls(Gazetteer.load(settings.get('GEOCODING_GAZETTEER_DIR')), cache_path)
+        pipeline.stats = crawler.stats
+        return pipeline
+    
+    def open_spider(self, spider):
+        self.cache.open()
+    
+    def close_spider(self, spider):
+        self.cache.close()
+        summary = ', '.join(f"{count} {status}" for status, count in sorted(self.counts.items()))
+        logger.info(f"Geocoding: {summary or 'no addresses'}")
+        if self.stats:
+            for status, count in self.counts.items():
+                self.stats.set_value(f'geocoding/{status}', count)
+    
+    def _count(self, status: str):
+        self.counts[status] = self.counts.get(status, 0) + 1
+    
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        address = adapter.get('address_full')
+        existing = adapter.get('coordinates')
+        if not address or (isinstance(existing, dict) and existing.get('lat') is not None):
+            return item
+        
+        key = GeocodeCache.key(address)
+        if key in self.results:
+            result = self.results[key]
+            self._count('cache_hits')
+        else:
+            hit, result = self.cache.get(address)
+            if hit:
+                self._count('cache_hits')
+            else:
+                result = self.gazetteer.resolve(address)
+                self.cache.put(address, result)
+            self.results[key] = result
+        
+        if result is None:
+            self._count('unresolved')
+            logger.debug(f"Could not geocode address: {address}")
+            return item
+        try:
+            adapter['coordinates'] = dict(result)
+        except KeyError:
+            # Items without a coordinates field are passed through unchanged
+            return item
+        self._count(result['precision'])
+        return item
+
+
 class StoragePipeline:
     """
     Pipeline for storing cleaned data to a JSON file.
-    Collects all items during scraping and writes them to a JSON file when the spider closes.
-    Also supports PostgreSQL and MongoDB connections (optional).
+    Vendors are kept in a persistent SQLite index keyed by url_source with a
+    content hash per vendor: unchanged re-crawled vendors are skipped without any
+    write and changed vendors are updated in place. Every added or updated item is
+    also appended to a JSON Lines log, which makes index writes durable between
+    commits. The log is periodically compacted - every STORAGE_COMPACT_EVERY_ITEMS
+    items, every STORAGE_COMPACT_EVERY_SECONDS seconds and when the spider closes -
+    which commits the index and publishes data/vendors.json (and its
+    public/vendors.json copy) from it.
+    Added and updated vendors are also mirrored, in batches, into a database
+    backend (STORAGE_BACKEND: SQLite by default, PostgreSQL or MongoDB).
+    With STORAGE_WRITER_THREAD (the default) all of this runs on a dedicated
+    writer thread: process_item only hands a copy of the item to a bounded queue
+    (STORAGE_QUEUE_SIZE) and returns a Deferred that fires once it is queued,
+    which holds the item back while the queue is full.
+    At close, if the snapshot changed during the run, the frontend export
+    artifacts (minified, columnar and precompressed copies plus a manifest
+    with content hashes, see exports.py) are written next to both snapshots,
+    the per-vendor-type partitions that changed are rewritten (see
+    partitions.py) and a run that changed the catalogue is recorded as a new
+    version with a delta against the previous one (see snapshots.py).
     """
     
-    def __init__(self):
-        # JSON file storage
-        self.items: List[Dict[str, Any]] = []
-        self.json_file_path = None
-        
-        # Database connection placeholders (optional)
-        self.db_connection = None
-        self.db_type = None  # 'postgresql' or 'mongodb'
+    def __init__(self, data_dir: Optional[str] = None, public_dir: Optional[str] = None,
+                 index_path: Optional[str] = None,
+                 compact_every_items: int = 500, compact_every_seconds: float = 300,
+                 threaded: bool = True, queue_size: int = 1000):
+        # Get the project root directory (scraper/LovableCopenhagenScraper -> scraper -> root)
+        scraper_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        project_root = os.path.dirname(scraper_dir)
+        self.data_dir = data_dir or os.path.join(scraper_dir, 'data')
+        self.public_dir = public_dir or os.path.join(project_root, 'public')
+        
+        # JSON file storage - stores all vendor types
+        self.json_file_path = os.path.join(self.data_dir, 'vendors.json')
+        self.log_file_path = os.path.join(self.data_dir, 'vendors.jl')
+        self.public_vendors_path = os.path.join(self.public_dir, 'vendors.json')
+        self.log_file = None
+        
+        # Keyed vendor index
+        self.index = VendorIndex(index_path or os.path.join(self.data_dir, 'vendor_index.sqlite'))
+        self.counts = {ADDED: 0, UPDATED: 0, UNCHANGED: 0}
+        self.stats = None
+        
+        # Compaction schedule (0 disables the periodic trigger)
+        self.compact_every_items = compact_every_items
+        self.compact_every_seconds = compact_every_seconds
+        self.pending_items = 0
+        # Items logged since the last compaction attempt (successful or not)
+        self.items_since_compaction = 0
+        self.last_compaction = time.monotonic()
+        
+        # Batched database backend (set up from the STORAGE_BACKEND settings)
+        self.writer: Optional[BatchWriter] = None
+        
+        # Writer thread (started in open_spider)
+        self.threaded = threaded
+        self.queue_size = queue_size
+        self.thread: Optional[WriterThread] = None
+        
+        # Export artifacts (set up from the EXPORT_* settings), written at close
+        # if a compaction rewrote the snapshot during the run
+        self.exporter: Optional[ArtifactExporter] = None
+        self.snapshot_changed = False
+        self.partitions: Optional[PartitionWriter] = None
+        self.versions: Optional[SnapshotVersioner] = None
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        pipeline = cls(
+            data_dir=settings.get('STORAGE_DATA_DIR'),
+            public_dir=settings.get('STORAGE_PUBLIC_DIR'),
+            index_path=settings.get('STORAGE_INDEX_PATH'),
+            compact_every_items=settings.getint('STORAGE_COMPACT_EVERY_ITEMS', 500),
+            compact_every_seconds=settings.getfloat('STORAGE_COMPACT_EVERY_SECONDS', 300),
+            threaded=settings.getbool('STORAGE_WRITER_THREAD', True),
+            queue_size=settings.getint('STORAGE_QUEUE_SIZE', 1000),
+        )
+        pipeline.stats = crawler.stats
+        pipeline.exporter = ArtifactExporter.from_settings(settings, [pipeline.data_dir, pipeline.public_dir])
+        pipeline.partitions = PartitionWriter.from_settings(settings, [pipeline.data_dir, pipeline.public_dir])
+        pipeline.versions = SnapshotVersioner.from_settings(settings, [pipeline.data_dir, pipeline.public_dir])
+        backend = backend_from_settings(settings, pipeline.data_dir)
+        if backend is not None:
+            pipeline.writer = BatchWriter(
+                backend,
+                batch_size=settings.getint('STORAGE_BATCH_SIZE', 500),
+                flush_interval=settings.getfloat('STORAGE_FLUSH_SECONDS', 5),
+                stats=crawler.stats,
+            )
+        return pipeline
     
     def open_spider(self, spider):
         """
         Initialize storage when spider opens.
-        Sets up JSON file path and optionally database connection.
+        With the writer thread, storage is opened on the thread and the returned
+        Deferred fires once it is ready.
+        """
+        if self.threaded:
+            self.thread = WriterThread(self._store, setup=self._open_storage, teardown=self._close_storage,
+                                       idle=self._idle, queue_size=self.queue_size)
+            self.thread.start()
+            return self.thread.opened
+        self._open_storage()
+    
+    def _open_storage(self):
+        """
+        Open the vendor index (seeding it from an existing vendors.json), replay
+        items left in the log by an interrupted run, open the log for appending
+        and open the database backend.
         """
-        # Determine JSON file path (relative to scraper directory)
-        # Get the project root directory (scraper/LovableCopenhagenScraper)
-        project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         # Create data directory if it doesn't exist
-        data_dir = os.path.join(project_dir, 'data')
-        os.makedirs(data_dir, exist_ok=True)
+        os.makedirs(self.data_dir, exist_ok=True)
         
-        # Set JSON file path - stores all vendor types
-        self.json_file_path = os.path.join(data_dir, 'vendors.json')
+        if self.writer:
+            self.writer.open()
+        self.index.open()
+        if len(self.index) == 0:
+            self._seed_index()
         
-        # Load existing vendors if file exists (to avoid duplicates)
-        if os.path.exists(self.json_file_path):
-            try:
-                with open(self.json_file_path, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-                    if isinstance(existing_data, list):
-                        self.items = existing_data
-                        logger.info(f"Loaded {len(self.items)} existing vendors from {self.json_file_path}")
-                    else:
-                        self.items = []
-            except (json.JSONDecodeError, IOError) as e:
-                logger.warning(f"Could not load existing JSON file: {e}. Starting fresh.")
-                self.items = []
-        else:
-            self.items = []
-        
-        logger.info(f"StoragePipeline initialized. JSON file: {self.json_file_path}")
-        
-        # Optional: Database connection setup (uncomment if needed)
-        # Example PostgreSQL connection:
-        # import psycopg2
-        # self.db_connection = psycopg2.connect(
-        #     host="localhost",
-        #     database="event_copilot",
-        #     user="your_user",
-        #     password="your_password"
-        # )
-        # self.db_type = 'postgresql'
-        
-        # Example MongoDB connection:
-        # from pymongo import MongoClient
-        # self.db_connection = MongoClient('mongodb://localhost:27017/')
-        # self.db = self.db_connection['event_copilot']
-        # self.collection = self.db['venues']
-        # self.db_type = 'mongodb'
+        # A non-empty log means the previous run stopped before compacting
+        if os.path.exists(self.log_file_path) and os.path.getsize(self.log_file_path) > 0:
+            logger.info(f"Recovering items from unfinished log {self.log_file_path}")
+            replayed = 0
+            with open(self.log_file_path, 'rb') as f:
+                for line in f:
+                    try:
+                        item_dict = jsonio.loads(line)
+                        self.index.upsert(item_dict)
+                        if self.writer:
+                            self.writer.add(item_dict)
+                        replayed += 1
+                    except ValueError:
+                        # A torn last line from a crash
+                        logger.warning(f"Skipping corrupt line in {self.log_file_path}")
+            self.pending_items = replayed
+            self.compact()
+        
+        self.log_file = open(self.log_file_path, 'ab')
+        self.last_compaction = time.monotonic()
+        logger.info(f"StoragePipeline initialized. JSON file: {self.json_file_path}, "
+                    f"index: {self.index.path} ({len(self.index)} vendors)")
+    
+    def _seed_index(self):
+        """Import an existing vendors.json into an empty index (first occurrence wins)."""
+        if not os.path.exists(self.json_file_path):
+            return
+        try:
+            with open(self.json_file_path, 'rb') as f:
+                existing_data = jsonio.loads(f.read())
+        except (ValueError, IOError) as e:
+            logger.warning(f"Could not load existing JSON file: {e}. Starting fresh.")
+            return
+        if isinstance(existing_data, list):
+            seeded = sum(1 for item in existing_data if self.index.insert_if_missing(item))
+            self.index.commit()
+            logger.info(f"Seeded vendor index with {seeded} existing vendors from {self.json_file_path}")
     
     def close_spider(self, spider):
         """
-        Write all collected items to JSON file when spider closes.
-        Also closes database connection if configured.
+        Compact the log into the JSON snapshot when spider closes and report
+        how many vendors were added, updated and unchanged in this run.
+        With the writer thread, the queue is drained first and the returned
+        Deferred fires once storage is closed.
         """
-        # Write items to JSON file
-        if self.json_file_path:
+        if self.thread:
+            d = self.thread.stop()
+            d.addCallback(lambda _: self._report())
+            return d
+        self._close_storage()
+        self._report()
+    
+    def _close_storage(self):
+        """
+        Compact, write the exports and partitions, record the version, close
+        the index and flush and close the database backend.
+        """
+        if self.log_file:
+            self.log_file.close()
+            self.log_file = None
+        self.compact()
+        if self.exporter and (self.snapshot_changed or not self.exporter.manifest_exists()):
+            try:
+                self.exporter.export(self.index.iter_items())
+            except Exception as e:
+                logger.error(f"Error writing export artifacts: {e}")
+        if self.partitions:
             try:
-                # Remove duplicates based on url_source
-                seen_urls = set()
-                unique_items = []
-                for item in self.items:
-                    url = item.get('url_source')
-                    if url and url not in seen_urls:
-                        seen_urls.add(url)
-                        unique_items.append(item)
-                    elif not url:
-                        # Keep items without URL (shouldn't happen, but just in case)
-                        unique_items.append(item)
-                
-                # Write to JSON file with pretty formatting
-                with open(self.json_file_path, 'w', encoding='utf-8') as f:
-                    json.dump(unique_items, f, indent=2, ensure_ascii=False)
-                
-                # Also copy to public directory for React app (if it exists)
-                # Get project root (3 levels up from pipelines.py: pipelines.py -> LovableCopenhagenScraper -> scraper -> root)
-                project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-                public_vendors_path = os.path.join(project_root, 'public', 'vendors.json')
-                
-                try:
-                    # Create public directory if it doesn't exist
-                    public_dir = os.path.dirname(public_vendors_path)
-                    os.makedirs(public_dir, exist_ok=True)
-                    
-                    # Copy the file
-                    shutil.copy2(self.json_file_path, public_vendors_path)
-                    logger.info(f"Also copied vendors.json to {public_vendors_path} for React app")
-                except Exception as e:
-                    logger.warning(f"Could not copy vendors.json to public directory: {e}")
-                
-                # Count by vendor type for logging
-                vendor_counts = {}
-                for item in unique_items:
+                self.partitions.write(self.index)
+            except Exception as e:
+                logger.error(f"Error writing partitions: {e}")
+        if self.versions:
+            try:
+                self.versions.record(self.index)
+            except Exception as e:
+                logger.error(f"Error recording snapshot version: {e}")
+        self.index.close()
+        if self.writer:
+            self.writer.close()
+    
+    def _report(self):
+        logger.info(f"Storage summary: {self.counts[ADDED]} added, {self.counts[UPDATED]} updated, "
+                    f"{self.counts[UNCHANGED]} unchanged")
+        if not self.stats:
+            return
+        for status, count in self.counts.items():
+            self.stats.set_value(f'storage/{status}', count)
+        if self.partitions:
+            for status, count in self.partitions.counts.items():
+                self.stats.set_value(f'partitions/{status}', count)
+        if self.versions and self.versions.version is not None:
+            self.stats.set_value('versions/latest', self.versions.version)
+            for status, count in self.versions.counts.items():
+                self.stats.set_value(f'versions/{status}', count)
+        if self.thread:
+            latency = self.thread.latency
+            self.stats.set_value('storage/queue_max_depth', self.thread.max_depth)
+            self.stats.set_value('storage/backpressure_waits', self.thread.backpressure_waits)
+            if latency.count:
+                self.stats.set_value('storage/write_latency_mean', round(latency.sum / latency.count, 6))
+                self.stats.set_value('storage/write_latency_max', round(latency.max, 6))
+            if self.thread.failed:
+                self.stats.set_value('storage/writer_errors', self.thread.failed)
+    
+    def compact(self):
+        """
+        Commit the index and publish it to data/vendors.json and public/vendors.json.
+        
+        The snapshot is streamed from the index in first-seen order and both files
+        are replaced atomically. Nothing is rewritten when no vendor was added or
+        updated since the last compaction. The log is truncated only after the
+        snapshot is on disk and the database backend has accepted every buffered
+        item, so an interruption or a backend outage at any point can be
+        recovered on the next compaction or run.
+        """
+        self.index.commit()
+        # The log is about to be truncated: nothing it holds may still be waiting for the backend
+        flushed = self.writer.flush() if self.writer else True
+        
+        if self.pending_items or not os.path.exists(self.json_file_path):
+            # Count by vendor type for logging while streaming the snapshot out
+            vendor_counts = {}
+            
+            def counted(items):
+                for item in items:
                     vtype = item.get('vendor_type', 'unknown')
                     vendor_counts[vtype] = vendor_counts.get(vtype, 0) + 1
-                
-                logger.info(f"Successfully wrote {len(unique_items)} vendors to {self.json_file_path}")
-                logger.info(f"Vendor breakdown: {vendor_counts}")
-            except Exception as e:
+                    yield item
+            
+            try:
+                jsonio.atomic_write(self.json_file_path, jsonio.dumps_array(counted(self.index.iter_items())))
+            except (OSError, ValueError) as e:
+                # The log and pending count are kept, so the next scheduled
+                # compaction (or run) writes these items again
                 logger.error(f"Error writing to JSON file: {e}")
+                self.items_since_compaction = 0
+                self.last_compaction = time.monotonic()
+                return
+            self.snapshot_changed = True
+            
+            # Also publish to public directory for React app
+            try:
+                jsonio.atomic_write(self.public_vendors_path, jsonio.dumps_array(self.index.iter_items()))
+                logger.info(f"Also published vendors.json to {self.public_vendors_path} for React app")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not copy vendors.json to public directory: {e}")
+            
+            logger.info(f"Compacted {self.pending_items} changed items: wrote "
+                        f"{sum(vendor_counts.values())} vendors to {self.json_file_path}")
+            logger.info(f"Vendor breakdown: {vendor_counts}")
         
-        # Close database connection if configured
-        if self.db_connection and self.db_type == 'postgresql':
-            self.db_connection.close()
-            logger.info("PostgreSQL connection closed.")
-        elif self.db_connection and self.db_type == 'mongodb':
-            self.db_connection.close()
-            logger.info("MongoDB connection closed.")
+        # Everything in the log is now committed and published (and in the backend)
+        if not flushed:
+            logger.warning(f"Keeping {self.log_file_path} until {self.writer.backend.name} accepts the buffered items")
+        elif self.log_file:
+            self.log_file.truncate(0)
+        else:
+            open(self.log_file_path, 'wb').close()
+        self.pending_items = 0
+        self.items_since_compaction = 0
+        self.last_compaction = time.monotonic()
+    
+    def _compaction_due(self) -> bool:
+        if self.compact_every_items and self.items_since_compaction >= self.compact_every_items:
+            return True
+        if self.compact_every_seconds and time.monotonic() - self.last_compaction >= self.compact_every_seconds:
+            return True
+        return False
+    
+    def _idle(self):
+        """Run time-based compaction and backend flushes while no items arrive (writer thread)."""
+        if self.pending_items and self._compaction_due():
+            self.compact()
+        if self.writer and self.writer.due():
+            self.writer.flush()
     
     def process_item(self, item, spider):
         """
-        Store the item in memory (will be written to JSON on close).
-        Optionally also store in database if configured.
+        Store the item, or with the writer thread queue a copy of it and
+        return a Deferred that fires with the item once it is queued.
         """
-        adapter = ItemAdapter(item)
-        
         # Convert item to dictionary
-        item_dict = dict(adapter)
-        
-        # Add to items list for JSON storage
-        self.items.append(item_dict)
+        item_dict = item.to_dict() if isinstance(item, VendorRecord) else dict(ItemAdapter(item))
+        if self.thread:
+            return self.thread.submit(item_dict, item)
+        self._store(item_dict)
+        return item
+    
+    def _store(self, item_dict: Dict[str, Any]):
+        """
+        Upsert the item into the vendor index and, if it is new or changed,
+        append it to the JSON Lines log (compacted into the snapshot later)
+        and queue it for the database backend.
+        """
         vendor_type = item_dict.get('vendor_type', 'unknown')
-        logger.info(f"Collected {vendor_type} vendor for JSON storage: {item_dict['name']}")
         
-        # Optional: Also store in database if configured
-        # PostgreSQL storage example
-        if self.db_type == 'postgresql' and self.db_connection:
-            try:
-                cursor = self.db_connection.cursor()
-                cursor.execute("""
-                    INSERT INTO venues (name, address_full, capacity_min_max, event_types, 
-                                      in_house_av, base_package_price, url_source)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (url_source) DO UPDATE SET
-                        name = EXCLUDED.name,
-                        address_full = EXCLUDED.address_full,
-                        capacity_min_max = EXCLUDED.capacity_min_max,
-                        event_types = EXCLUDED.event_types,
-                        in_house_av = EXCLUDED.in_house_av,
-                        base_package_price = EXCLUDED.base_package_price
-                """, (
-                    item_dict['name'],
-                    item_dict['address_full'],
-                    item_dict.get('capacity_min_max'),
-                    item_dict.get('event_types', []),
-                    item_dict.get('in_house_av', False),
-                    item_dict.get('base_package_price'),
-                    item_dict['url_source']
-                ))
-                self.db_connection.commit()
-                logger.info(f"Stored venue in PostgreSQL: {item_dict['name']}")
-            except Exception as e:
-                logger.error(f"Error storing item in PostgreSQL: {e}")
-                self.db_connection.rollback()
+        # Upsert into the index; unchanged vendors need no further writes
+        status = self.index.upsert(item_dict)
+        self.counts[status] += 1
+        if status == UNCHANGED:
+            logger.debug(f"Unchanged {vendor_type} vendor skipped: {item_dict['name']}")
+            return
         
-        # MongoDB storage example
-        elif self.db_type == 'mongodb' and self.db_connection:
-            try:
-                self.collection.update_one(
-                    {'url_source': item_dict['url_source']},
-                    {'$set': item_dict},
-                    upsert=True
-                )
-                logger.info(f"Stored venue in MongoDB: {item_dict['name']}")
-            except Exception as e:
-                logger.error(f"Error storing item in MongoDB: {e}")
+        # Append to the log; flushed per item so a crash loses nothing already processed
+        self.log_file.write(jsonio.dumps(item_dict) + b'\n')
+        self.log_file.flush()
+        self.pending_items += 1
+        self.items_since_compaction += 1
+        logger.info(f"Stored {status} {vendor_type} vendor: {item_dict['name']}")
         
-        return item
+        # Mirror into the database backend (written in batches), before a
+        # compaction truncates the log
+        if self.writer:
+            self.writer.add(item_dict)
+        
+        if self._compaction_due():
+            self.compact()
 
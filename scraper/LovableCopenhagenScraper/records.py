@@ -0,0 +1,263 @@
+# Compact typed vendor records.
+#
+# The spider yields dict-backed scrapy Items whose numbers are free text
+# ("50 - 500", "From 8500 DKK"). CleaningPipeline turns every cleaned item
+# into a VendorRecord: one __slots__ class per vendor kind (no per-instance
+# dict) with the item's fields plus typed fields parsed once -
+#
+#   capacity_min / capacity_max   int (venue capacity, catering max capacity,
+#                                 activity participants, seats per vehicle)
+#   price_amount / price_currency float and ISO code of the first price field
+#   rating                        float
+#
+# so consumers can filter and sort without parsing strings again. Records are
+# registered with itemadapter, so Scrapy and ItemAdapter-based code handle
+# them like any other item; `to_dict()` gives the set fields in field order
+# (the shape written to vendors.json).
+
+import re
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional, Tuple, Type
+
+from itemadapter import ItemAdapter
+from itemadapter.adapter import AdapterInterface
+
+from LovableCopenhagenScraper.items import (
+    ActivitiesItem,
+    AVEquipmentItem,
+    CateringItem,
+    TransportItem,
+    VenueItem,
+)
+
+TYPED_FIELDS = ('capacity_min', 'capacity_max', 'price_amount', 'price_currency')
+
+# Price fields in the order their value becomes price_amount
+PRICE_FIELDS = ('base_package_price', 'price_per_person', 'price_per_hour', 'price_per_day', 'price_per_event')
+
+# Where each vendor kind keeps its capacity: (min field, max field); a single
+# range field ("50 - 500" or "200") is given as the max field
+CAPACITY_FIELDS = {
+    'venue': (None, 'capacity_min_max'),
+    'catering': (None, 'max_capacity'),
+    'transport': (None, 'capacity_per_vehicle'),
+    'activities': ('min_participants', 'max_participants'),
+}
+
+CURRENCIES = {'dkk': 'DKK', 'kr': 'DKK', 'eur': 'EUR', '€': 'EUR', 'usd': 'USD', '$': 'USD'}
+DEFAULT_CURRENCY = 'DKK'
+
+# A number with optional thousands groups ("8.500", "1 250,00") or decimals
+_NUMBER = re.compile(r'\d{1,3}(?:[.,\s]\d{3})+(?:[.,]\d{1,2})?(?!\d)|\d+(?:[.,]\d+)?')
+_CURRENCY = re.compile(r'\b(dkk|kr|eur|usd)\b|([€$])', re.IGNORECASE)
+# A whole number, with optional thousands groups ("1.200")
+_INTEGER = re.compile(r'\d{1,3}(?:[.,]\d{3})+(?!\d)|\d+')
+
+
+def parse_number(text: str) -> Optional[float]:
+    """First number in a price-like string; '8.500' and '1,250.00' are read with thousands separators."""
+    match = _NUMBER.search(text)
+    if not match:
+        return None
+    number = match.group(0)
+    grouped = re.fullmatch(r'(\d{1,3}(?:[.,\s]\d{3})+)(?:([.,])(\d{1,2}))?', number)
+    if grouped:
+        integer = re.sub(r'[.,\s]', '', grouped.group(1))
+        return float(f"{integer}.{grouped.group(3)}" if grouped.group(3) else integer)
+    return float(number.replace(',', '.'))
+
+
+def parse_price(value: Any) -> Tuple[Optional[float], Optional[str]]:
+    """(amount, currency) of a price string such as 'From 8500 DKK'; currency defaults to DKK."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value), DEFAULT_CURRENCY
+    if not isinstance(value, str):
+        return None, None
+    amount = parse_number(value)
+    if amount is None:
+        return None, None
+    match = _CURRENCY.search(value)
+    currency = CURRENCIES[(match.group(1) or match.group(2)).lower()] if match else DEFAULT_CURRENCY
+    return amount, currency
+
+
+def parse_capacity(value: Any) -> Tuple[Optional[int], Optional[int]]:
+    """(min, max) of '50 - 500'; a single number is the maximum."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return None, value
+    if not isinstance(value, str):
+        return None, None
+    numbers = [int(re.sub(r'[.,]', '', n)) for n in _INTEGER.findall(value)]
+    if len(numbers) >= 2:
+        return min(numbers[0], numbers[-1]), max(numbers[0], numbers[-1])
+    if numbers:
+        return None, numbers[0]
+    return None, None
+
+
+def parse_rating(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        match = re.search(r'\d+(?:[.,]\d+)?', value)
+        if match:
+            return float(match.group(0).replace(',', '.'))
+    return None
+
+
+def _item_values(item: Any) -> Dict[str, Any]:
+    # scrapy Items are mappings of their set fields; copying them directly
+    # is much cheaper than a per-field ItemAdapter lookup
+    if isinstance(item, dict):
+        return item
+    if isinstance(item, Mapping):
+        return dict(item)
+    return dict(ItemAdapter(item))
+
+
+class VendorRecord:
+    """
+    Base of the per-kind records. Unset fields are None and left out of
+    `to_dict()`; `get` and item-style access work on field names.
+    """
+
+    __slots__ = ()
+    fields: Tuple[str, ...] = ()
+    vendor_kind: Optional[str] = None
+
+    def __init__(self, **values):
+        for name in self.fields:
+            setattr(self, name, values.get(name))
+
+    @classmethod
+    def from_item(cls, item: Any) -> 'VendorRecord':
+        """Build a record from an item or mapping and parse its typed fields."""
+        values = _item_values(item)
+        record = cls.__new__(cls)
+        for name in cls.fields:
+            setattr(record, name, values.get(name))
+        if record.vendor_type is not None:
+            record.vendor_type = sys.intern(record.vendor_type)
+        record.parse()
+        return record
+
+    def parse(self) -> None:
+        """Fill the typed fields from the text fields."""
+        min_field, max_field = CAPACITY_FIELDS.get(self.vendor_kind, (None, None))
+        if max_field:
+            low, high = parse_capacity(getattr(self, max_field))
+            if min_field:
+                low = parse_capacity(getattr(self, min_field))[1]
+            self.capacity_min, self.capacity_max = low, high
+        for name in PRICE_FIELDS:
+            value = getattr(self, name, None)
+            if value:
+                amount, currency = parse_price(value)
+                if amount is not None:
+                    self.price_amount, self.price_currency = amount, sys.intern(currency)
+                    break
+        self.rating = parse_rating(self.rating)
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {}
+        for name in self.fields:
+            value = getattr(self, name)
+            if value is not None:
+                result[name] = value
+        return result
+
+    def copy(self) -> 'VendorRecord':
+        record = self.__class__.__new__(self.__class__)
+        for name in self.fields:
+            setattr(record, name, getattr(self, name))
+        return record
+
+    def get(self, name: str, default: Any = None) -> Any:
+        value = getattr(self, name, None) if name in self.fields else None
+        return default if value is None else value
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self.fields or getattr(self, name) is None:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __setitem__(self, name: str, value: Any) -> None:
+        if name not in self.fields:
+            raise KeyError(f"{self.__class__.__name__} does not support field: {name}")
+        setattr(self, name, value)
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name in self.fields if getattr(self, name) is not None)
+
+    def __eq__(self, other) -> bool:
+        return type(other) is type(self) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.to_dict()!r})"
+
+
+def _record_class(name: str, item_class: Type, vendor_kind: str) -> Type[VendorRecord]:
+    fields = tuple(item_class.fields) + tuple(f for f in TYPED_FIELDS if f not in item_class.fields)
+    return type(name, (VendorRecord,), {
+        '__slots__': fields,
+        '__doc__': f"Compact typed record of a {vendor_kind} vendor ({item_class.__name__} fields plus typed fields).",
+        '__module__': __name__,
+        'fields': fields,
+        'vendor_kind': vendor_kind,
+    })
+
+
+VenueRecord = _record_class('VenueRecord', VenueItem, 'venue')
+CateringRecord = _record_class('CateringRecord', CateringItem, 'catering')
+TransportRecord = _record_class('TransportRecord', TransportItem, 'transport')
+ActivitiesRecord = _record_class('ActivitiesRecord', ActivitiesItem, 'activities')
+AVEquipmentRecord = _record_class('AVEquipmentRecord', AVEquipmentItem, 'av-equipment')
+
+RECORD_CLASSES: Dict[str, Type[VendorRecord]] = {
+    cls.vendor_kind: cls
+    for cls in (VenueRecord, CateringRecord, TransportRecord, ActivitiesRecord, AVEquipmentRecord)
+}
+
+
+def to_record(item: Any) -> VendorRecord:
+    """The record of an item, by its vendor_type (venue if unknown)."""
+    if isinstance(item, VendorRecord):
+        return item
+    values = _item_values(item)
+    return RECORD_CLASSES.get(values.get('vendor_type'), VenueRecord).from_item(values)
+
+
+class VendorRecordAdapter(AdapterInterface):
+    """itemadapter support for VendorRecord (set fields only, like scrapy Items)."""
+
+    @classmethod
+    def is_item_class(cls, item_class: type) -> bool:
+        return issubclass(item_class, VendorRecord)
+
+    @classmethod
+    def get_field_names_from_class(cls, item_class: type):
+        return list(item_class.fields)
+
+    def field_names(self):
+        return list(self.item.fields)
+
+    def __getitem__(self, field_name: str) -> Any:
+        return self.item[field_name]
+
+    def __setitem__(self, field_name: str, value: Any) -> None:
+        self.item[field_name] = value
+
+    def __delitem__(self, field_name: str) -> None:
+        self.item[field_name]
+        setattr(self.item, field_name, None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.item)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.item)
+
+
+if VendorRecordAdapter not in ItemAdapter.ADAPTER_CLASSES:
+    ItemAdapter.ADAPTER_CLASSES.appendleft(VendorRecordAdapter)
@@ -0,0 +1,290 @@
+# Adaptive JavaScript rendering decisions.
+#
+# Every URL is fetched with a plain HTTP request first. If the response lacks
+# the signals a vendor or listing page should have, the spider re-requests it
+# through Playwright. The outcome is recorded per domain and per URL pattern,
+# and persisted between runs, so pages that only work when rendered go
+# straight to Playwright next time while everything else stays a cheap plain
+# fetch.
+#
+# Rendering profiles decide how a page is rendered once it goes to Playwright:
+# which resource types and third-party URLs are aborted, which pooled browser
+# context it runs in and which selector marks it as ready (instead of waiting
+# for networkidle). Profiles are configured per domain.
+
+import logging
+import os
+import re
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from scrapy_playwright.page import PageMethod
+
+from LovableCopenhagenScraper import jsonio
+
+logger = logging.getLogger(__name__)
+
+# Signals that a detail page carries vendor content
+DETAIL_SIGNALS_XPATH = (
+    'boolean(//h1[normalize-space()]'
+    ' | //address'
+    ' | //*[@itemprop="address" or @itemprop="streetAddress"]'
+    ' | //script[@type="application/ld+json"])'
+)
+
+# Signals that a listing page links to vendor pages
+LISTING_SIGNALS_XPATH = (
+    'boolean(//a[contains(concat(" ", normalize-space(@class), " "), " venue-link ")]'
+    ' | //*[contains(concat(" ", normalize-space(@class), " "), " listing-item ")]//a'
+    ' | //*[contains(concat(" ", normalize-space(@class), " "), " vendor-link ")]'
+    ' | //a[contains(@href, "/venue/") or contains(@href, "/catering/")'
+    ' or contains(@href, "/transport/") or contains(@href, "/activity/")])'
+)
+
+# CSS equivalents of the signals above, used as Playwright wait targets
+DETAIL_WAIT_SELECTOR = 'h1, address, [itemprop="address"], [itemprop="streetAddress"], script[type="application/ld+json"]'
+LISTING_WAIT_SELECTOR = (
+    '.venue-link, .listing-item a, .vendor-link, '
+    'a[href*="/venue/"], a[href*="/catering/"], a[href*="/transport/"], a[href*="/activity/"], '
+    + DETAIL_WAIT_SELECTOR
+)
+
+# Resource types and third-party URLs aborted by default: none of them carry
+# vendor data, and they account for most of the bandwidth and Chromium memory
+DEFAULT_BLOCKED_RESOURCE_TYPES = ['image', 'media', 'font']
+DEFAULT_BLOCKED_URL_PATTERNS = [
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'facebook.net',
+    'connect.facebook', 'hotjar.com', 'clarity.ms', 'cookiebot.com', 'youtube.com/embed',
+    'player.vimeo.com', 'maps.googleapis.com',
+]
+
+_ID_SEGMENT_RE = re.compile(r'^[\d\W_]+$|\d{3,}')
+
+PLAIN_OK = 'plain_ok'
+RENDER_NEEDED = 'render_needed'
+
+
+def has_vendor_signals(response, listing: bool = False) -> bool:
+    """Return True if the response looks like a usable detail (or listing) page."""
+    if not hasattr(response, 'xpath'):
+        return False
+    if listing and response.xpath(LISTING_SIGNALS_XPATH).get() == '1':
+        return True
+    return response.xpath(DETAIL_SIGNALS_XPATH).get() == '1'
+
+
+def url_pattern(url: str) -> str:
+    """
+    Generalize a URL to its page template: the host plus every path segment
+    but the last, with id-like segments replaced by '*'.
+
+    https://www.venuu.com/dk/en/venue/12345-grand-hall -> venuu.com/dk/en/venue/*
+    """
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    segments = [segment for segment in parts.path.split('/') if segment]
+    parents = ['*' if _ID_SEGMENT_RE.search(segment) else segment.lower() for segment in segments[:-1]]
+    return '/'.join([host] + parents + ['*'])
+
+
+def url_domain(url: str) -> str:
+    host = urlsplit(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class RenderDecisionEngine:
+    """
+    Learns whether pages need JavaScript rendering.
+
+    Evidence is counted per URL pattern and per domain:
+    - plain_ok: a plain fetch had the expected signals, or rendering did not
+      add them either
+    - render_needed: a plain fetch lacked the signals and the rendered page had them
+
+    A URL is rendered up front when its pattern (or, for patterns without
+    enough observations, its domain) has more render_needed than plain_ok
+    evidence. Decisions are kept in a JSON file between runs.
+    """
+
+    def __init__(self, path: Optional[str] = None, min_observations: int = 2):
+        self.path = path
+        self.min_observations = min_observations
+        self.patterns: Dict[str, Dict[str, int]] = {}
+        self.domains: Dict[str, Dict[str, int]] = {}
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                data = jsonio.loads(f.read())
+            self.patterns = data.get('patterns', {})
+            self.domains = data.get('domains', {})
+            logger.info(f"Loaded render decisions for {len(self.domains)} domains from {self.path}")
+        except (ValueError, IOError) as e:
+            logger.warning(f"Could not load render decisions: {e}. Starting fresh.")
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        jsonio.atomic_write(self.path, jsonio.dumps(
+            {'domains': self.domains, 'patterns': self.patterns}, indent=True, sort_keys=True
+        ))
+
+    def should_render(self, url: str) -> bool:
+        counts = self.patterns.get(url_pattern(url))
+        if not counts or sum(counts.values()) < self.min_observations:
+            counts = self.domains.get(url_domain(url))
+        if not counts:
+            return False
+        return counts.get(RENDER_NEEDED, 0) > counts.get(PLAIN_OK, 0)
+
+    def record(self, url: str, rendered: bool, has_signals: bool, escalated: bool = False) -> None:
+        """
+        Record the outcome of a fetch.
+
+        A plain fetch without signals records nothing yet - the spider escalates
+        it and the rendered outcome decides. Rendered pages only count as
+        render_needed when they were escalated from a failed plain fetch.
+        """
+        if not rendered:
+            outcome = PLAIN_OK if has_signals else None
+        elif not has_signals:
+            outcome = PLAIN_OK  # rendering did not help either
+        else:
+            outcome = RENDER_NEEDED if escalated else None
+        if outcome is None:
+            return
+        for table, key in ((self.patterns, url_pattern(url)), (self.domains, url_domain(url))):
+            counts = table.setdefault(key, {PLAIN_OK: 0, RENDER_NEEDED: 0})
+            counts[outcome] += 1
+
+
+async def wait_for_target(page, selector: str, timeout: int) -> bool:
+    """
+    Wait until a selector is attached to the page. Returns False on timeout
+    instead of failing the request, so whatever has rendered is still parsed
+    (and the render gate records the missing signals).
+    """
+    try:
+        await page.wait_for_selector(selector, state='attached', timeout=timeout)
+        return True
+    except Exception as e:
+        logger.debug(f"Wait target '{selector}' not found on {page.url}: {e}")
+        return False
+
+
+class RenderProfile:
+    """
+    How pages of one domain are rendered by Playwright.
+
+    Options (all optional, see RENDER_PROFILE_DEFAULTS in settings.py):
+        block_resource_types - Playwright resource types to abort
+        block_url_patterns - substrings of request URLs to abort (trackers, embeds)
+        wait_selector - selector that marks a detail page as rendered
+        listing_wait_selector - selector that marks a listing page as rendered
+        wait_timeout - milliseconds to wait for the selector
+        wait_until - navigation event to wait for before the selector
+        context - browser context name (default: one of the pooled contexts)
+    """
+
+    def __init__(self, domain: str, options: Dict[str, Any], context: str, stats=None):
+        self.domain = domain
+        self.block_resource_types = frozenset(options.get('block_resource_types') or ())
+        self.block_url_patterns = tuple(options.get('block_url_patterns') or ())
+        self.wait_selector = options.get('wait_selector') or DETAIL_WAIT_SELECTOR
+        self.listing_wait_selector = options.get('listing_wait_selector') or LISTING_WAIT_SELECTOR
+        self.wait_timeout = int(options.get('wait_timeout', 10000))
+        self.wait_until = options.get('wait_until', 'domcontentloaded')
+        self.context = options.get('context') or context
+        self.stats = stats
+
+    def meta(self, listing: bool = False) -> Dict[str, Any]:
+        """scrapy-playwright request meta for this profile."""
+        selector = self.listing_wait_selector if listing else self.wait_selector
+        return {
+            'playwright_context': self.context,
+            'playwright_page_init_callback': self.init_page,
+            'playwright_page_goto_kwargs': {'wait_until': self.wait_until},
+            'playwright_page_methods': [PageMethod(wait_for_target, selector, self.wait_timeout)],
+        }
+
+    async def init_page(self, page, request) -> None:
+        request.meta['render_started'] = time.monotonic()
+        if self.block_resource_types or self.block_url_patterns:
+            await page.route('**', self._route)
+
+    async def _route(self, route) -> None:
+        resource_type = route.request.resource_type
+        url = route.request.url
+        if resource_type in self.block_resource_types:
+            blocked = resource_type
+        elif any(pattern in url for pattern in self.block_url_patterns):
+            blocked = 'third_party'
+        else:
+            # Hand the request on to scrapy-playwright's own route handler
+            await route.fallback()
+            return
+        await route.abort()
+        if self.stats is not None:
+            self.stats.inc_value('render/blocked_requests')
+            self.stats.inc_value(f'render/blocked_requests/{blocked}')
+
+
+class RenderProfiles:
+    """
+    Per-domain RenderProfile registry.
+
+    A domain's profile is RENDER_PROFILE_DEFAULTS overlaid with the entry for
+    the domain (or its closest parent domain) in RENDER_PROFILES. Domains
+    without their own context are spread over RENDER_CONTEXT_POOL_SIZE pooled
+    browser contexts by a stable hash, so a site always reuses the same context
+    (and its cookies) and the number of open contexts stays bounded.
+    """
+
+    def __init__(self, defaults: Dict[str, Any], profiles: Dict[str, Dict[str, Any]],
+                 pool_size: int = 4, stats=None):
+        self.defaults = defaults
+        self.profiles = {domain.lower(): options for domain, options in profiles.items()}
+        self.pool_size = max(1, pool_size)
+        self.stats = stats
+        self._cache: Dict[str, RenderProfile] = {}
+
+    @classmethod
+    def from_settings(cls, settings, stats=None):
+        defaults = {
+            'block_resource_types': DEFAULT_BLOCKED_RESOURCE_TYPES,
+            'block_url_patterns': DEFAULT_BLOCKED_URL_PATTERNS,
+        }
+        defaults.update(settings.getdict('RENDER_PROFILE_DEFAULTS'))
+        return cls(
+            defaults,
+            settings.getdict('RENDER_PROFILES'),
+            settings.getint('RENDER_CONTEXT_POOL_SIZE', 4),
+            stats,
+        )
+
+    def context_names(self) -> List[str]:
+        return [f'render-{n}' for n in range(self.pool_size)]
+
+    def for_url(self, url: str) -> RenderProfile:
+        domain = url_domain(url)
+        profile = self._cache.get(domain)
+        if profile is None:
+            options = dict(self.defaults)
+            options.update(self._lookup(domain))
+            context = f'render-{zlib.crc32(domain.encode()) % self.pool_size}'
+            profile = self._cache[domain] = RenderProfile(domain, options, context, self.stats)
+        return profile
+
+    def _lookup(self, domain: str) -> Dict[str, Any]:
+        labels = domain.split('.')
+        for i in range(len(labels) - 1):
+            options = self.profiles.get('.'.join(labels[i:]))
+            if options is not None:
+                return options
+        return {}
@@ -0,0 +1,86 @@
+# Persistent HTTP validator store for incremental recrawls.
+#
+# For every vendor page that produced an item, the ETag / Last-Modified
+# response headers are kept together with the scraped item. On the next run
+# IncrementalCrawlMiddleware sends them back as If-None-Match /
+# If-Modified-Since; a 304 answer lets the spider reuse the stored item
+# instead of downloading, rendering and parsing the page again.
+
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+
+from LovableCopenhagenScraper import jsonio
+
+
+class ValidatorStore:
+    """SQLite table of url -> (etag, last_modified, item)."""
+
+    def __init__(self, path: str, commit_every: int = 100):
+        self.path = path
+        self.commit_every = commit_every
+        self.connection: Optional[sqlite3.Connection] = None
+        self._uncommitted = 0
+
+    def open(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS validators (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                item BLOB,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.connection.commit()
+
+    def close(self) -> None:
+        if self.connection:
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        row = self.connection.execute(
+            'SELECT etag, last_modified, item FROM validators WHERE url = ?', (url,)
+        ).fetchone()
+        if not row:
+            return None
+        return {
+            'etag': row[0],
+            'last_modified': row[1],
+            'item': jsonio.loads(row[2]) if row[2] else None,
+        }
+
+    def set_validators(self, url: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """
+        Record the validators of a fresh 200 response. The previously stored item
+        is cleared until the new response yields one again.
+        """
+        self.connection.execute("""
+            INSERT INTO validators (url, etag, last_modified, item, updated_at) VALUES (?, ?, ?, NULL, ?)
+            ON CONFLICT (url) DO UPDATE SET
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                item = NULL,
+                updated_at = excluded.updated_at
+        """, (url, etag, last_modified, time.time()))
+        self._written()
+
+    def set_item(self, url: str, item: Dict[str, Any]) -> None:
+        """Attach the scraped item to a URL whose validators were recorded."""
+        self.connection.execute(
+            'UPDATE validators SET item = ?, updated_at = ? WHERE url = ?',
+            (jsonio.dumps(item), time.time(), url),
+        )
+        self._written()
+
+    def _written(self) -> None:
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.connection.commit()
+            self._uncommitted = 0
@@ -0,0 +1,104 @@
+# Request priorities and per-vendor-type quotas.
+#
+# With every request at the default priority, pagination competes with the
+# detail pages it discovers, and one large venue directory fills the
+# scheduler before the catering and AV sources get a turn. The policy ranks
+# detail pages above listings, lowers the priority of each further listing
+# page of a site, and gives every vendor type a quota of detail pages: a
+# type's detail pages drop in priority as it fills its quota, so smaller
+# sources are interleaved, and are no longer scheduled once it is full.
+
+from collections import Counter
+from typing import Dict, Optional
+
+from LovableCopenhagenScraper.keywords import VENDOR_TYPE_ORDER
+
+DEFAULT_QUOTAS = {
+    'venue': 500,
+    'catering': 200,
+    'transport': 100,
+    'activities': 150,
+    'av-equipment': 100,
+}
+
+
+class SchedulingPolicy:
+    """
+    Priorities for listing and detail requests, and detail quotas per vendor type.
+
+    Detail pages get `detail_priority`, minus up to `fair_share_spread` as
+    their vendor type fills its quota. Listing pages get `listing_priority`
+    minus `depth_step` per pagination level. A quota of 0 or None means
+    unlimited.
+
+    Settings:
+        SCHEDULING_DETAIL_PRIORITY / SCHEDULING_LISTING_PRIORITY
+        SCHEDULING_DEPTH_STEP - priority lost per listing page followed
+        SCHEDULING_FAIR_SHARE_SPREAD - priority lost by a type that reached its quota
+        VENDOR_TYPE_QUOTAS - detail pages per vendor type and run
+    """
+
+    def __init__(self, quotas: Optional[Dict[str, Optional[int]]] = None, detail_priority: int = 100,
+                 listing_priority: int = 50, depth_step: int = 10, fair_share_spread: int = 40, stats=None):
+        self.quotas = dict(DEFAULT_QUOTAS if quotas is None else quotas)
+        self.detail_priority = detail_priority
+        self.listing_priority = listing_priority
+        self.depth_step = depth_step
+        self.fair_share_spread = fair_share_spread
+        self.stats = stats
+        self.scheduled = Counter()
+        self.delivered = Counter()
+        self.over_quota = Counter()
+
+    @classmethod
+    def from_settings(cls, settings, stats=None) -> 'SchedulingPolicy':
+        quotas = dict(DEFAULT_QUOTAS)
+        quotas.update(settings.getdict('VENDOR_TYPE_QUOTAS'))
+        return cls(
+            quotas=quotas,
+            detail_priority=settings.getint('SCHEDULING_DETAIL_PRIORITY', 100),
+            listing_priority=settings.getint('SCHEDULING_LISTING_PRIORITY', 50),
+            depth_step=settings.getint('SCHEDULING_DEPTH_STEP', 10),
+            fair_share_spread=settings.getint('SCHEDULING_FAIR_SHARE_SPREAD', 40),
+            stats=stats,
+        )
+
+    def listing_priority_for(self, depth: int) -> int:
+        return self.listing_priority - depth * self.depth_step
+
+    def quota_full(self, vendor_type: str) -> bool:
+        quota = self.quotas.get(vendor_type)
+        return bool(quota) and self.scheduled[vendor_type] >= quota
+
+    def admit_detail(self, vendor_type: str) -> bool:
+        """Whether a detail page of `vendor_type` may still be scheduled (refusals are counted)."""
+        if self.quota_full(vendor_type):
+            self.over_quota[vendor_type] += 1
+            self._inc(f'scheduling/over_quota/{vendor_type}')
+            return False
+        return True
+
+    def schedule_detail(self, vendor_type: str) -> int:
+        """Count a scheduled detail request of `vendor_type` and return its priority."""
+        quota = self.quotas.get(vendor_type)
+        filled = self.scheduled[vendor_type] / quota if quota else 0.0
+        self.scheduled[vendor_type] += 1
+        self._inc(f'scheduling/scheduled/{vendor_type}')
+        return self.detail_priority - int(self.fair_share_spread * filled)
+
+    def item_delivered(self, vendor_type: Optional[str]) -> None:
+        self.delivered[vendor_type or 'unknown'] += 1
+        self._inc(f"scheduling/delivered/{vendor_type or 'unknown'}")
+
+    def _inc(self, key: str) -> None:
+        if self.stats is not None:
+            self.stats.inc_value(key)
+
+    def report(self) -> str:
+        lines = [f"{'vendor type':<14}{'quota':>8}{'scheduled':>11}{'delivered':>11}{'over quota':>12}"]
+        for vendor_type in sorted(set(VENDOR_TYPE_ORDER) | set(self.scheduled) | set(self.delivered),
+                                  key=lambda t: (t not in self.quotas, t)):
+            quota = self.quotas.get(vendor_type) or '-'
+            lines.append(f"{vendor_type:<14}{quota:>8}{self.scheduled[vendor_type]:>11}"
+                         f"{self.delivered[vendor_type]:>11}{self.over_quota[vendor_type]:>12}")
+        return '\n'.join(lines)
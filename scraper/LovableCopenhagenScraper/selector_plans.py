@@ -0,0 +1,301 @@
+# Precompiled selector plans per vendor type.
+#
+# Every field the spider extracts has a fallback chain of CSS/XPath selectors.
+# Evaluating those chains through response.css()/response.xpath() translates
+# each CSS selector and compiles each XPath expression again on every call, and
+# wraps every match in a Selector object. A plan is declared once per vendor
+# type, compiled at spider startup into lxml XPath objects and evaluated
+# directly against the response's parsed tree, stopping at the first selector
+# that produces a value.
+#
+# Class and attribute selectors are the expensive part of a chain: each one
+# tests an attribute of every element in the page. The class names and
+# attributes a CSS selector requires are known at compile time, so the page's
+# class names (and the values of each attribute a plan tests) are collected
+# once per tree, and selectors that need something the page does not have are
+# skipped without being evaluated.
+
+from functools import cached_property
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from cssselect import parser as css_parser
+from lxml import etree
+from parsel.csstranslator import HTMLTranslator
+
+# Field modes
+FIRST = 'first'          # first value of the first selector that produces a non-empty one
+FIRST_ALL = 'first_all'  # all values of the first selector that matches anything
+ALL = 'all'              # all values of every selector, in chain order
+
+# Fallback chains per vendor type: field -> (mode, selectors). Selectors are
+# CSS (with parsel's ::text / ::attr() pseudo-elements) unless they start
+# with '/' or '(', in which case they are XPath.
+SELECTOR_PLANS: Dict[str, Dict[str, Tuple[str, Sequence[str]]]] = {
+    'venue': {
+        'name': (FIRST, [
+            'h1.venue-name::text',
+            'h1::text',
+            '//h1[contains(@class, "venue") or contains(@class, "title")]/text()',
+            'title::text',
+        ]),
+        'address_full': (FIRST, [
+            'div.address::text', 'span.address::text', '[itemprop="address"]::text',
+            '.venue-address::text', 'address::text', '[itemprop="streetAddress"]::text',
+        ]),
+        'description': (FIRST, [
+            'meta[name="description"]::attr(content)',
+            '.description::text',
+            '.venue-description::text',
+            '//*[contains(@class, "description")]//text()',
+        ]),
+        'capacity': (FIRST, [
+            '.capacity::text',
+            '//*[contains(text(), "capacity")]/following-sibling::text()',
+            '//*[contains(@class, "capacity")]//text()',
+        ]),
+        'rooms': (FIRST, [
+            '//*[contains(text(), "room") or contains(text(), "lokale")]/text()',
+        ]),
+        'event_types': (ALL, [
+            '.event-types li::text', '.event-types span::text', '[data-event-type]::text', '.tags::text',
+        ]),
+        'price': (FIRST, [
+            '.price::text', '.package-price::text', '[itemprop="price"]::text', '.starting-price::text',
+        ]),
+        'amenities': (ALL, [
+            '.amenities li::text', '.amenities span::text', '.features li::text',
+        ]),
+        'phone': (FIRST, ['[itemprop="telephone"]::text']),
+        'email': (FIRST, ['[itemprop="email"]::text']),
+        'website': (FIRST, ['[itemprop="url"]::attr(content)']),
+        'images': (FIRST_ALL, ['img::attr(src)']),
+        'rating': (FIRST, ['[itemprop="ratingValue"]::text', '.rating::text']),
+    },
+    'catering': {
+        'name': (FIRST, ['h1::text', 'title::text']),
+        'address_full': (FIRST, ['[itemprop="address"]::text', 'address::text', '.address::text']),
+        'description': (FIRST, ['meta[name="description"]::attr(content)']),
+        'images': (FIRST_ALL, ['img::attr(src)']),
+    },
+    'transport': {
+        'name': (FIRST, ['h1::text', 'title::text']),
+        'address_full': (FIRST, ['address::text', '.address::text']),
+    },
+    'activities': {
+        'name': (FIRST, ['h1::text', 'title::text']),
+        'address_full': (FIRST, ['address::text']),
+    },
+    'av-equipment': {
+        'name': (FIRST, ['h1::text', 'title::text']),
+        'address_full': (FIRST, ['address::text']),
+    },
+    'listing': {
+        'vendor_links': (FIRST_ALL, [
+            'a.venue-link::attr(href)',
+            '.listing-item a::attr(href)',
+            '.vendor-link::attr(href)',
+            'a[href*="/venue/"]::attr(href)',
+            'a[href*="/catering/"]::attr(href)',
+            'a[href*="/transport/"]::attr(href)',
+            'a[href*="/activity/"]::attr(href)',
+            '//a[contains(@href, "/venue/") or contains(@href, "/catering/") or contains(@href, "/transport/") '
+            'or contains(@href, "/activity/")]/@href',
+        ]),
+        'next_page': (FIRST, [
+            'a.next-page::attr(href)',
+            'a[rel="next"]::attr(href)',
+            '//a[contains(text(), "Next") or contains(text(), "næste")]/@href',
+        ]),
+    },
+}
+
+_translator = HTMLTranslator()
+_attribute_xpaths: Dict[str, etree.XPath] = {}
+
+
+def _requirements(css: str) -> Tuple[FrozenSet[str], Tuple[Tuple[str, str, Optional[str]], ...]]:
+    """
+    What the page must contain for a CSS selector to match anything:
+    class names, and (attribute, operator, value) tests where the operator is
+    'exists', '=' or '*='.
+    """
+    parsed = css_parser.parse(css)
+    if len(parsed) != 1:
+        return frozenset(), ()  # selector groups match if any member does
+    classes = set()
+    attributes = []
+    stack = [parsed[0].parsed_tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, css_parser.Class):
+            classes.add(node.class_name)
+        elif isinstance(node, css_parser.Attrib) and not node.namespace:
+            value = getattr(node.value, 'value', node.value)
+            operator = node.operator if node.operator in ('exists', '=', '*=') else 'exists'
+            attributes.append((node.attrib, operator, value if operator != 'exists' else None))
+        if isinstance(node, css_parser.CombinedSelector):
+            stack.extend((node.selector, node.subselector))
+        elif not isinstance(node, css_parser.Element) and hasattr(node, 'selector'):
+            # Classes inside :not(...) (Negation.subselector) are not required
+            stack.append(node.selector)
+    return frozenset(classes), tuple(attributes)
+
+
+class Tree:
+    """A parsed page plus facts about it shared by all selectors of a plan."""
+
+    def __init__(self, root):
+        self.root = root
+        self._attributes: Dict[str, FrozenSet[str]] = {}
+
+    @cached_property
+    def classes(self) -> FrozenSet[str]:
+        return frozenset(' '.join(self.attribute_values('class')).split())
+
+    def attribute_values(self, name: str) -> FrozenSet[str]:
+        """Every value the attribute takes anywhere in the page."""
+        values = self._attributes.get(name)
+        if values is None:
+            xpath = _attribute_xpaths.get(name)
+            if xpath is None:
+                xpath = _attribute_xpaths[name] = etree.XPath(f'//@{name}', smart_strings=False)
+            values = self._attributes[name] = frozenset(xpath(self.root))
+        return values
+
+    def satisfies(self, classes: FrozenSet[str], attributes) -> bool:
+        if classes and not classes <= self.classes:
+            return False
+        for name, operator, value in attributes:
+            values = self.attribute_values(name)
+            if operator == 'exists':
+                if not values:
+                    return False
+            elif operator == '=':
+                if value not in values:
+                    return False
+            elif not any(value in candidate for candidate in values):
+                return False
+        return True
+
+
+def _to_text(value: Any) -> str:
+    """Convert an XPath result to the string parsel's .get() would return."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, etree._Element):
+        return etree.tostring(value, method='html', encoding='unicode', with_tail=False)
+    return str(value)
+
+
+class CompiledSelector:
+    """One selector of a chain, compiled to an lxml XPath object."""
+
+    __slots__ = ('source', 'xpath', 'required_classes', 'required_attributes')
+
+    def __init__(self, source: str):
+        self.source = source
+        if source.startswith(('/', '(')):
+            expression = source
+            self.required_classes, self.required_attributes = frozenset(), ()
+        else:
+            expression = _translator.css_to_xpath(source)
+            self.required_classes, self.required_attributes = _requirements(source)
+        self.xpath = etree.XPath(expression, smart_strings=False)
+
+    def values(self, tree: Tree) -> List[str]:
+        if (self.required_classes or self.required_attributes) and \
+                not tree.satisfies(self.required_classes, self.required_attributes):
+            return []
+        return [_to_text(value) for value in self.xpath(tree.root)]
+
+
+class FieldPlan:
+    """
+    A field's compiled fallback chain and how its results are combined.
+
+    `fallback` holds selectors that are only tried when the chain produces
+    nothing (used by site adapters for selectors pruned on a domain).
+    """
+
+    __slots__ = ('name', 'mode', 'selectors', 'fallback')
+
+    def __init__(self, name: str, mode: str, selectors: List[CompiledSelector],
+                 fallback: Sequence[CompiledSelector] = ()):
+        self.name = name
+        self.mode = mode
+        self.selectors = selectors
+        self.fallback = fallback
+
+    def evaluate(self, tree: Tree, hits: Optional[Dict[str, int]] = None) -> Any:
+        """
+        Evaluate the chain on a parsed tree, stopping as soon as the mode allows.
+        If `hits` is given, every selector that produced the value is counted in it.
+        """
+        value = self._evaluate(self.selectors, tree, hits)
+        if not value and self.fallback:
+            value = self._evaluate(self.fallback, tree, hits)
+        return value
+
+    def _evaluate(self, selectors: Sequence[CompiledSelector], tree: Tree, hits: Optional[Dict[str, int]]) -> Any:
+        if self.mode == ALL:
+            values = []
+            for selector in selectors:
+                found = selector.values(tree)
+                if found:
+                    values.extend(found)
+                    if hits is not None:
+                        hits[selector.source] = hits.get(selector.source, 0) + 1
+            return values
+
+        for selector in selectors:
+            values = selector.values(tree)
+            if self.mode == FIRST_ALL:
+                if not values:
+                    continue
+                value = values
+            elif values and values[0]:
+                value = values[0]
+            else:
+                continue
+            if hits is not None:
+                hits[selector.source] = hits.get(selector.source, 0) + 1
+            return value
+        return [] if self.mode == FIRST_ALL else None
+
+
+class SelectorPlan:
+    """Compiled field plans of one vendor type."""
+
+    def __init__(self, name: str, fields: Dict[str, FieldPlan]):
+        self.name = name
+        self.fields = fields
+
+    def get(self, tree, field: str, hits: Optional[Dict[str, int]] = None) -> Any:
+        """Evaluate one field; `tree` is a Tree or an lxml root element."""
+        if not isinstance(tree, Tree):
+            tree = Tree(tree)
+        return self.fields[field].evaluate(tree, hits)
+
+    def extract(self, tree, hits: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, Any]:
+        """
+        Evaluate every field of the plan against one parsed tree. If `hits` is
+        given, winning selectors are counted in hits[field].
+        """
+        if not isinstance(tree, Tree):
+            tree = Tree(tree)
+        if hits is None:
+            return {name: plan.evaluate(tree) for name, plan in self.fields.items()}
+        return {name: plan.evaluate(tree, hits.setdefault(name, {})) for name, plan in self.fields.items()}
+
+
+def compile_plans(declarations: Optional[Dict[str, Dict[str, Tuple[str, Sequence[str]]]]] = None
+                  ) -> Dict[str, SelectorPlan]:
+    """Compile selector plan declarations (default: SELECTOR_PLANS)."""
+    declarations = SELECTOR_PLANS if declarations is None else declarations
+    return {
+        plan_name: SelectorPlan(plan_name, {
+            field: FieldPlan(field, mode, [CompiledSelector(source) for source in sources])
+            for field, (mode, sources) in fields.items()
+        })
+        for plan_name, fields in declarations.items()
+    }
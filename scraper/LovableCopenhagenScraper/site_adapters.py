@@ -0,0 +1,240 @@
+# Per-domain site adapters built from selector hit statistics.
+#
+# Every site only ever matches one or two selectors of a generic fallback
+# chain, yet the chain is tried in its declared order on every page. The
+# registry records which selector produced each field on each domain, keeps
+# those counts between runs, and at startup derives per-domain selector plans:
+# the usual winner is tried first and selectors that never hit on the domain
+# are pruned. Sites can also get their own selectors through SITE_ADAPTERS.
+
+import copy
+import logging
+import os
+import weakref
+from typing import Any, Dict, List, Optional, Sequence
+
+from LovableCopenhagenScraper import jsonio
+from LovableCopenhagenScraper.rendering import url_domain
+from LovableCopenhagenScraper.selector_plans import CompiledSelector, FieldPlan, SelectorPlan, Tree
+
+logger = logging.getLogger(__name__)
+
+
+class LazyFields:
+    """
+    Fields of one plan on one page, evaluated on first access.
+
+    Only the fields that are actually read are evaluated (and counted in the
+    site adapter statistics), so a page rejected on its required fields
+    costs just those selectors.
+    """
+
+    __slots__ = ('plan', 'tree', 'counts', 'values')
+
+    def __init__(self, plan: SelectorPlan, tree: Tree, counts: Dict[str, Dict[str, Any]]):
+        self.plan = plan
+        self.tree = tree
+        self.counts = counts
+        self.values: Dict[str, Any] = {}
+
+    def __getitem__(self, field: str) -> Any:
+        try:
+            return self.values[field]
+        except KeyError:
+            pass
+        pages = self.counts['pages']
+        pages[field] = pages.get(field, 0) + 1
+        value = self.values[field] = self.plan.fields[field].evaluate(
+            self.tree, self.counts['hits'].setdefault(field, {})
+        )
+        return value
+
+
+class SiteAdapterRegistry:
+    """
+    Per-domain selector plans, ordered and pruned by recorded hit counts.
+
+    Counts are kept per domain, plan and field:
+        {domain: {plan: {"pages": {field: n}, "hits": {field: {selector: n}}}}}
+
+    Once a field has been evaluated on `min_pages` pages of a domain, its chain
+    is reordered by hits (ties keep the declared order). After `prune_after`
+    pages, selectors without a single hit move to a fallback that is only tried
+    when the remaining chain finds nothing; a field that never produced a value
+    on the domain keeps its whole chain as the fallback, so a value appearing
+    later is still found. Every `probe_every`-th page of a
+    domain runs the full generic plan, so a site redesign is picked up on the
+    next startup.
+
+    Adapters are derived from the counts at load time only; counts recorded
+    during a run take effect on the next run.
+
+    Lookups take the response: its domain page number (and with it the probe
+    decision) is assigned on the first lookup and reused by every later one,
+    so a listing that reads several fields counts as one page. Extraction
+    pool workers get the registry through `worker_state()`, take the probe
+    decision made by the crawler, and send the counts they record back to be
+    `merge()`d, so pool and in-process extraction use the same plans.
+    """
+
+    def __init__(self, plans: Dict[str, SelectorPlan], path: Optional[str] = None,
+                 overrides: Optional[Dict[str, Dict[str, Dict[str, Sequence[str]]]]] = None,
+                 min_pages: int = 5, prune_after: int = 20, probe_every: int = 25):
+        self.plans = plans
+        self.path = path
+        self.overrides = overrides or {}
+        self.min_pages = min_pages
+        self.prune_after = prune_after
+        self.probe_every = probe_every
+        self.counts: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]] = {}
+        self.adapters: Dict[str, Dict[str, SelectorPlan]] = {}
+        self.pruned = 0
+        self._page_counter: Dict[str, int] = {}
+        # Probe decision of every response seen, made once per response
+        self._probes: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+        self._compiled: Dict[str, CompiledSelector] = {}
+
+    def load(self) -> None:
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, 'rb') as f:
+                    self.counts = jsonio.loads(f.read())
+            except (ValueError, IOError) as e:
+                logger.warning(f"Could not load site adapter statistics: {e}. Starting fresh.")
+                self.counts = {}
+        self.build()
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        jsonio.atomic_write(self.path, jsonio.dumps(self.counts, indent=True, sort_keys=True))
+
+    def worker_state(self) -> Dict[str, Any]:
+        """Configuration and loaded counts, to rebuild the same adapters in a worker process."""
+        return {
+            'overrides': self.overrides,
+            'min_pages': self.min_pages,
+            'prune_after': self.prune_after,
+            'probe_every': self.probe_every,
+            'counts': self.counts,
+        }
+
+    @classmethod
+    def from_worker_state(cls, plans: Dict[str, SelectorPlan], state: Dict[str, Any]) -> 'SiteAdapterRegistry':
+        """
+        A registry with the adapters of `worker_state()`; its counts start
+        empty, so `take_counts()` returns only what the worker recorded.
+        """
+        registry = cls(plans, overrides=state['overrides'], min_pages=state['min_pages'],
+                       prune_after=state['prune_after'], probe_every=state['probe_every'])
+        registry.counts = state['counts']
+        registry.build()
+        registry.counts = {}
+        return registry
+
+    def take_counts(self) -> Dict[str, Any]:
+        """The counts recorded since the last call, resetting them."""
+        counts, self.counts = self.counts, {}
+        return counts
+
+    def merge(self, counts: Dict[str, Any]) -> None:
+        """Add counts recorded elsewhere (an extraction pool worker)."""
+        for domain, plans in counts.items():
+            domain_counts = self.counts.setdefault(domain, {})
+            for name, recorded in plans.items():
+                own = domain_counts.get(name)
+                if own is None:
+                    domain_counts[name] = copy.deepcopy(recorded)
+                    continue
+                for field, n in recorded.get('pages', {}).items():
+                    own['pages'][field] = own['pages'].get(field, 0) + n
+                for field, selectors in recorded.get('hits', {}).items():
+                    own_hits = own['hits'].setdefault(field, {})
+                    for source, n in selectors.items():
+                        own_hits[source] = own_hits.get(source, 0) + n
+
+    def build(self) -> None:
+        """Derive per-domain plans from the recorded counts and the configured overrides."""
+        self.adapters = {}
+        self.pruned = 0
+        for domain in set(self.counts) | set(self.overrides):
+            self.adapters[domain] = {
+                name: self._domain_plan(domain, name, plan) for name, plan in self.plans.items()
+            }
+        if self.adapters:
+            logger.info(f"Site adapters for {len(self.adapters)} domains, "
+                        f"{self.pruned} selectors pruned")
+
+    def _domain_plan(self, domain: str, name: str, plan: SelectorPlan) -> SelectorPlan:
+        overrides = self.overrides.get(domain, {}).get(name, {})
+        counts = self.counts.get(domain, {}).get(name, {})
+        pages = counts.get('pages', {})
+        hits = counts.get('hits', {})
+
+        fields = {}
+        for field, generic in plan.fields.items():
+            extra = [self._compile(source) for source in overrides.get(field, ())]
+            chain = extra + [s for s in generic.selectors if s.source not in overrides.get(field, ())]
+            field_pages = pages.get(field, 0)
+            field_hits = hits.get(field, {})
+            fallback: List[CompiledSelector] = []
+
+            if field_pages >= self.min_pages:
+                # Most frequent winner first; sort is stable, so ties keep the declared order
+                chain.sort(key=lambda selector: -field_hits.get(selector.source, 0))
+            if field_pages >= self.prune_after:
+                kept = [s for s in chain if field_hits.get(s.source, 0) or s in extra]
+                fallback = [s for s in chain if s not in kept]
+                self.pruned += len(chain) - len(kept)
+                chain = kept
+            fields[field] = FieldPlan(field, generic.mode, chain, fallback)
+        return SelectorPlan(name, fields)
+
+    def _compile(self, source: str) -> CompiledSelector:
+        selector = self._compiled.get(source)
+        if selector is None:
+            selector = self._compiled[source] = CompiledSelector(source)
+        return selector
+
+    def probes(self, response, probe: Optional[bool] = None) -> bool:
+        """
+        Whether the response runs the full generic plans. Decided on the first
+        call for a response (the domain's page count goes up once), or set by
+        passing `probe` (a pool worker takes the decision made by the crawler).
+        """
+        if probe is not None:
+            self._probes[response] = probe
+            return probe
+        decision = self._probes.get(response)
+        if decision is None:
+            domain = url_domain(response.url)
+            page = self._page_counter[domain] = self._page_counter.get(domain, 0) + 1
+            decision = self._probes[response] = bool(self.probe_every and page % self.probe_every == 0)
+        return decision
+
+    def _plan_and_counts(self, response, name: str):
+        domain = url_domain(response.url)
+        counts = self.counts.setdefault(domain, {}).setdefault(name, {'pages': {}, 'hits': {}})
+        adapter = self.adapters.get(domain)
+        if self.probes(response) or adapter is None:
+            return self.plans[name], counts
+        return adapter[name], counts
+
+    def extract(self, response, name: str, root) -> Dict[str, Any]:
+        """Evaluate plan `name` for the response's domain, recording which selectors hit."""
+        plan, counts = self._plan_and_counts(response, name)
+        pages = counts['pages']
+        for field in plan.fields:
+            pages[field] = pages.get(field, 0) + 1
+        return plan.extract(Tree(root), counts['hits'])
+
+    def fields(self, response, name: str, root) -> LazyFields:
+        """Like extract(), but each field is only evaluated when it is read."""
+        plan, counts = self._plan_and_counts(response, name)
+        return LazyFields(plan, Tree(root), counts)
+
+    def get(self, response, name: str, root, field: str) -> Any:
+        """Evaluate a single field of plan `name` for the response's domain."""
+        plan, counts = self._plan_and_counts(response, name)
+        counts['pages'][field] = counts['pages'].get(field, 0) + 1
+        return plan.get(root, field, counts['hits'].setdefault(field, {}))
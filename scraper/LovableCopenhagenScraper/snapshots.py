@@ -0,0 +1,183 @@
+# Versioned snapshots and deltas between crawls.
+#
+# vendors.json is replaced by every run, so a downstream consumer has to
+# download and diff the whole catalogue to find what changed. At close,
+# StoragePipeline records every run that changed the catalogue as a new
+# version: a small delta against the previous version (added and changed
+# vendors, removed url_source keys) in data/versions and public/versions,
+# chained by a manifest:
+#
+#   versions/manifest.json    latest version, base and the chain of deltas
+#   versions/base-<v>.json    full snapshot at version v
+#   versions/delta-<v>.json   changes from version v-1 to v
+#
+# A consumer at version v applies the deltas after v (a few KB) instead of
+# fetching the full file; one older than the base starts again from the
+# base. After VERSIONS_COMPACT_AFTER deltas the latest version becomes the
+# new base and the older files are deleted. The content hash of every key
+# at the latest version is kept in data/versions/state.json (not published)
+# to compute the next delta.
+
+import hashlib
+import logging
+import os
+import shutil
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from LovableCopenhagenScraper import jsonio
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+STATE_NAME = 'state.json'
+
+
+def apply_delta(items: Iterable[Dict[str, Any]], delta: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Apply a delta to the vendor list of its parent version.
+
+    Changed vendors are replaced in place and added ones appended, which
+    keeps the first-seen order of vendors.json.
+    """
+    by_key = {item.get('url_source'): item for item in items}
+    for key in delta['removed']:
+        by_key.pop(key, None)
+    for item in delta['changed']:
+        by_key[item.get('url_source')] = item
+    for item in delta['added']:
+        by_key[item.get('url_source')] = item
+    return list(by_key.values())
+
+
+class SnapshotVersioner:
+    """
+    Maintains the version chain in one or more directories (the first one
+    also keeps the private state file).
+
+    Settings:
+        VERSIONS_ENABLED - record versions (default True)
+        VERSIONS_COMPACT_AFTER - deltas kept before a new base is written (default 10)
+        VERSIONS_DIR - directory name inside data/ and public/ (default 'versions')
+    """
+
+    def __init__(self, output_dirs: Sequence[str], compact_after: int = 10, dirname: str = 'versions'):
+        self.directories = [os.path.join(directory, dirname) for directory in output_dirs]
+        self.compact_after = max(1, compact_after)
+        self.counts = {'added': 0, 'changed': 0, 'removed': 0}
+        self.version: Optional[int] = None
+
+    @classmethod
+    def from_settings(cls, settings, output_dirs: Sequence[str]) -> Optional['SnapshotVersioner']:
+        if not settings.getbool('VERSIONS_ENABLED', True):
+            return None
+        return cls(output_dirs, settings.getint('VERSIONS_COMPACT_AFTER', 10), settings.get('VERSIONS_DIR', 'versions'))
+
+    def _read(self, name: str) -> Dict[str, Any]:
+        path = os.path.join(self.directories[0], name)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'rb') as f:
+                return jsonio.loads(f.read())
+        except (ValueError, IOError) as e:
+            logger.warning(f"Could not read {path}: {e}. Starting a new version chain.")
+            return {}
+
+    def _write(self, name: str, data: bytes) -> Dict[str, Any]:
+        for directory in self.directories:
+            jsonio.atomic_write(os.path.join(directory, name), data)
+        return {'path': name, 'bytes': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+
+    def record(self, index) -> Optional[int]:
+        """Record the index's current content as a new version if it changed; returns the version."""
+        manifest = self._read(MANIFEST_NAME)
+        state = self._read(STATE_NAME)
+        latest = manifest.get('latest', 0)
+        # Without the state of the latest version no delta can be computed: start a new base
+        chained = bool(manifest) and state.get('version') == latest
+        previous: Dict[str, str] = state.get('hashes', {}) if chained else {}
+
+        current: Dict[str, str] = {}
+        added: List[str] = []
+        changed: List[str] = []
+        for key, _, digest in index.iter_hashes():
+            current[key] = digest
+            old = previous.get(key)
+            if old is None:
+                added.append(key)
+            elif old != digest:
+                changed.append(key)
+        removed = [key for key in previous if key not in current]
+
+        if chained and not (added or changed or removed):
+            self._sync(manifest)
+            self.version = manifest['latest']
+            logger.info(f"Catalogue unchanged; still at version {self.version}")
+            return self.version
+
+        version = latest + 1
+        now = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        deltas: List[Dict[str, Any]] = manifest.get('deltas', [])
+        entry = {'version': version, 'parent': version - 1, 'created_at': now, 'count': len(current),
+                 'added': len(added), 'changed': len(changed), 'removed': len(removed)}
+
+        if not chained or len(deltas) + 1 >= self.compact_after:
+            # New base: the full snapshot at this version; older files are no longer referenced
+            base = self._write(f"base-{version}.json", jsonio.dumps(list(index.iter_items())))
+            base.update(version=version, created_at=now, count=len(current))
+            if chained:
+                # The delta that produced this base is still published for consumers one version behind
+                delta = self._write_delta(index, version, added, changed, removed)
+                deltas = [dict(entry, **delta)]
+            else:
+                deltas = []
+            if manifest:
+                self._prune(manifest, keep={base['path']} | {d['path'] for d in deltas})
+        else:
+            base = manifest['base']
+            deltas = deltas + [dict(entry, **self._write_delta(index, version, added, changed, removed))]
+
+        manifest = {'latest': version, 'updated_at': now, 'base': base, 'deltas': deltas}
+        self._write(MANIFEST_NAME, jsonio.dumps(manifest, indent=True))
+        jsonio.atomic_write(os.path.join(self.directories[0], STATE_NAME),
+                            jsonio.dumps({'version': version, 'hashes': current}))
+
+        self.counts = {'added': len(added), 'changed': len(changed), 'removed': len(removed)}
+        self.version = version
+        logger.info(f"Recorded version {version}: {len(added)} added, {len(changed)} changed, "
+                    f"{len(removed)} removed (base {base['version']}, {len(deltas)} deltas)")
+        return version
+
+    def _write_delta(self, index, version: int, added: List[str], changed: List[str],
+                     removed: List[str]) -> Dict[str, Any]:
+        delta = {
+            'version': version,
+            'parent': version - 1,
+            'added': [index.get(key) for key in added],
+            'changed': [index.get(key) for key in changed],
+            'removed': removed,
+        }
+        return self._write(f"delta-{version}.json", jsonio.dumps(delta))
+
+    def _prune(self, manifest: Dict[str, Any], keep: set) -> None:
+        """Delete the base and deltas of the previous chain that the new manifest no longer lists."""
+        old = ([manifest['base']] if manifest.get('base') else []) + manifest.get('deltas', [])
+        for entry in old:
+            if entry['path'] in keep:
+                continue
+            for directory in self.directories:
+                path = os.path.join(directory, entry['path'])
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _sync(self, manifest: Dict[str, Any]) -> None:
+        """Copy files listed in the manifest to directories that lack them (e.g. a cleaned public/)."""
+        source = self.directories[0]
+        names = [MANIFEST_NAME, manifest['base']['path']] + [d['path'] for d in manifest.get('deltas', [])]
+        for directory in self.directories[1:]:
+            for name in names:
+                target = os.path.join(directory, name)
+                if not os.path.exists(target) and os.path.exists(os.path.join(source, name)):
+                    os.makedirs(directory, exist_ok=True)
+                    shutil.copyfile(os.path.join(source, name), target)
@@ -1,10 +1,29 @@
 import scrapy
+from scrapy import signals
 from LovableCopenhagenScraper.items import (
     VenueItem, CateringItem, TransportItem, ActivitiesItem, AVEquipmentItem
 )
-from scrapy_playwright.page import PageMethod
+from LovableCopenhagenScraper.document import ResponseDocument
+from LovableCopenhagenScraper.extraction_pool import ExtractionPool
+from LovableCopenhagenScraper.frontier import CanonicalizationRules, Frontier
+from LovableCopenhagenScraper.keywords import KEYWORD_VOCABULARIES, VENDOR_TYPE_ORDER, KeywordMatcher
+from LovableCopenhagenScraper.rendering import RenderDecisionEngine, has_vendor_signals
+from LovableCopenhagenScraper.scheduling import SchedulingPolicy
+from LovableCopenhagenScraper.selector_plans import compile_plans
+from LovableCopenhagenScraper.site_adapters import SiteAdapterRegistry
+from LovableCopenhagenScraper.validation import rejection_reason
+import os
 import re
-import json
+from typing import Optional
+
+
+ITEM_CLASSES = {
+    'venue': VenueItem,
+    'catering': CateringItem,
+    'transport': TransportItem,
+    'activities': ActivitiesItem,
+    'av-equipment': AVEquipmentItem,
+}
 
 
 class CopenhagenEventVendorSpider(scrapy.Spider):
@@ -59,6 +78,28 @@ class CopenhagenEventVendorSpider(scrapy.Spider):
     def __init__(self, *args, **kwargs):
         super(CopenhagenEventVendorSpider, self).__init__(*args, **kwargs)
         
+        # One automaton for every keyword vocabulary, built once per spider
+        self.keyword_matcher = KeywordMatcher(KEYWORD_VOCABULARIES)
+        
+        # Field selector chains per vendor type, compiled to XPath once
+        self.selector_plans = compile_plans()
+        
+        # Per-domain ordering/pruning of those chains (statistics persisted when run by a crawler)
+        self.site_adapters = SiteAdapterRegistry(self.selector_plans)
+        
+        # Learned plain-vs-Playwright decisions (persisted when run by a crawler)
+        self.render_engine = RenderDecisionEngine()
+        
+        # Optional process pool for extraction (EXTRACTION_POOL_ENABLED)
+        self.extraction_pool: Optional[ExtractionPool] = None
+        
+        # Cross-run URL frontier (FRONTIER_ENABLED, only when run by a crawler)
+        self.frontier: Optional[Frontier] = None
+        self.frontier_revisit_secs = 0
+        
+        # Request priorities and per-vendor-type quotas
+        self.scheduling = SchedulingPolicy()
+        
         # Comprehensive start URLs for all vendor types
         default_start_urls = [
             # Venues
@@ -91,197 +132,330 @@ class CopenhagenEventVendorSpider(scrapy.Spider):
         else:
             self.start_urls = default_start_urls
     
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super(CopenhagenEventVendorSpider, cls).from_crawler(crawler, *args, **kwargs)
+        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data')
+        spider.render_engine.path = crawler.settings.get('RENDER_DECISIONS_PATH') or os.path.join(
+            data_dir, 'render_decisions.json'
+        )
+        spider.render_engine.load()
+        spider.site_adapters.path = crawler.settings.get('SITE_ADAPTERS_PATH') or os.path.join(data_dir, 'site_adapters.json')
+        spider.site_adapters.overrides = crawler.settings.getdict('SITE_ADAPTERS')
+        spider.site_adapters.min_pages = crawler.settings.getint('SITE_ADAPTER_MIN_PAGES', 5)
+        spider.site_adapters.prune_after = crawler.settings.getint('SITE_ADAPTER_PRUNE_AFTER', 20)
+        spider.site_adapters.probe_every = crawler.settings.getint('SITE_ADAPTER_PROBE_EVERY', 25)
+        spider.site_adapters.load()
+        spider.extraction_pool = ExtractionPool.from_settings(crawler.settings)
+        if spider.extraction_pool is not None:
+            spider.extraction_pool.start(spider.site_adapters.worker_state())
+        spider.scheduling = SchedulingPolicy.from_settings(crawler.settings, crawler.stats)
+        crawler.signals.connect(spider._item_scraped, signal=signals.item_scraped)
+        if crawler.settings.getbool('FRONTIER_ENABLED', True):
+            spider.frontier = Frontier(
+                path=crawler.settings.get('FRONTIER_PATH') or os.path.join(data_dir, 'frontier.sqlite'),
+                rules=CanonicalizationRules(crawler.settings.getdict('FRONTIER_CANONICALIZATION')),
+                capacity=crawler.settings.getint('FRONTIER_BLOOM_CAPACITY', 1_000_000),
+                error_rate=crawler.settings.getfloat('FRONTIER_BLOOM_ERROR_RATE', 0.001),
+                not_vendor_ttl=crawler.settings.getfloat('FRONTIER_NOT_VENDOR_REVISIT_SECS', 30 * 86400),
+            )
+            spider.frontier.open()
+            # Replays serve every page from the cache, so nothing is "too recent" there
+            if not crawler.settings.getbool('HTTPCACHE_REPLAY'):
+                spider.frontier_revisit_secs = crawler.settings.getfloat('FRONTIER_REVISIT_SECS', 72000)
+            crawler.signals.connect(spider._response_received, signal=signals.response_received)
+        return spider
+    
+    def closed(self, reason):
+        """Persist the learned rendering decisions, selector statistics and frontier, stop the extraction pool."""
+        self.logger.info(f"Vendor types scheduled and delivered:\n{self.scheduling.report()}")
+        self.render_engine.save()
+        self.site_adapters.save()
+        if self.extraction_pool is not None:
+            self.extraction_pool.shutdown()
+        if self.frontier is not None:
+            for key, value in self.frontier.counts.items():
+                self.crawler.stats.set_value(f'frontier/{key}', value)
+            self.frontier.close()
+    
+    def _response_received(self, response, request, spider):
+        """Record fetch times in the frontier (drives FRONTIER_REVISIT_SECS on later runs)."""
+        if spider is self and response.status in (200, 304):
+            self.frontier.fetched(request.url)
+    
+    def _item_scraped(self, item, response, spider):
+        if spider is self:
+            self.scheduling.item_delivered(item.get('vendor_type'))
+    
     def start_requests(self):
         """Generate initial requests with JS rendering check."""
         for url in self.start_urls:
-            if self._needs_javascript(url):
-                yield scrapy.Request(
-                    url=url,
-                    callback=self.parse,
-                    meta={
-                        'playwright': True,
-                        'playwright_page_methods': [
-                            PageMethod('wait_for_selector', 'body', timeout=10000),
-                            PageMethod('wait_for_load_state', 'networkidle'),
-                        ],
-                    }
-                )
-            else:
-                yield scrapy.Request(url=url, callback=self.parse)
+            # Start pages are always fetched; they only register in the frontier
+            if self.frontier is not None:
+                self.frontier.should_schedule(url)
+            yield self._request(url, self.parse, priority=self.scheduling.listing_priority_for(0),
+                                meta={'listing_depth': 0, 'vendor_type_hint': self._url_vendor_type(url)})
     
     def _needs_javascript(self, url: str) -> bool:
-        """Determine if URL requires JavaScript rendering."""
-        js_required_domains = [
-            "spacebase.com",
-            "venuu.com",
-            "bellagroup.dk",
-            "eventyr.dk",
-        ]
-        return any(domain in url for domain in js_required_domains)
+        """Determine if URL requires JavaScript rendering (learned per domain and URL pattern)."""
+        return self.render_engine.should_render(url)
+    
+    def _request(self, url: str, callback, render: Optional[bool] = None, meta: Optional[dict] = None, **kwargs):
+        """Build a request, routed through Playwright when the URL needs rendering."""
+        if self.frontier is not None:
+            url = self.frontier.canonicalize(url)
+        if render is None:
+            render = self._needs_javascript(url)
+        meta = dict(meta or {})
+        if render:
+            # Context, blocked resources and wait target come from the
+            # domain's rendering profile (RenderProfileMiddleware)
+            meta['playwright'] = True
+            meta['render_target'] = 'listing' if callback == self.parse else 'detail'
+        return scrapy.Request(url=url, callback=callback, meta=meta, **kwargs)
+    
+    def _admit(self, url: str, revisit_after: Optional[float] = None) -> bool:
+        """
+        Whether a discovered URL should be requested: False if the frontier
+        has already scheduled it this run, marked it as not a vendor page, or
+        (with `revisit_after`) fetched it too recently.
+        """
+        return self.frontier is None or self.frontier.should_schedule(url, revisit_after)
     
-    def _detect_vendor_type(self, url: str, response) -> str:
+    def _render_gate(self, response, callback, listing: bool = False):
+        """
+        Record the rendering outcome of a response. Returns a Playwright
+        re-request when a plain fetch lacks the expected vendor signals,
+        otherwise None.
+        """
+        return self._render_decision(response, callback, self._has_vendor_signals(response, listing))
+    
+    def _has_vendor_signals(self, response, listing: bool = False) -> bool:
+        """Whether the page has the DOM signals of a vendor (or listing) page."""
+        # JSON-LD counts as a signal; its script elements are gone from the pre-cleaned tree
+        return bool(self._document(response).json_ld) or has_vendor_signals(response, listing=listing)
+    
+    def _render_decision(self, response, callback, has_signals: bool):
+        """The render gate for signals already checked (by _has_vendor_signals, here or in a pool worker)."""
+        rendered = bool(response.meta.get('playwright'))
+        if not rendered and not has_signals:
+            self.logger.debug(f"No vendor signals in plain fetch, rendering: {response.url}")
+            meta = {key: response.meta[key] for key in ('listing_depth', 'vendor_type_hint') if key in response.meta}
+            meta['render_escalated'] = True
+            return self._request(response.url, callback, render=True, meta=meta,
+                                 priority=response.request.priority, dont_filter=True)
+        self.render_engine.record(response.url, rendered, has_signals,
+                                  escalated=response.meta.get('render_escalated', False))
+        return None
+    
+    def _detect_vendor_type(self, url: str, response, doc: Optional[ResponseDocument] = None) -> str:
         """Detect vendor type from URL or page content."""
-        url_lower = url.lower()
-        page_text = ' '.join(response.css('body *::text').getall()).lower()
-        
         # Check URL patterns
-        if any(keyword in url_lower for keyword in ['catering', 'cater', 'food', 'restaurant']):
-            return 'catering'
-        elif any(keyword in url_lower for keyword in ['transport', 'taxi', 'bus', 'limousine', 'chauffeur']):
-            return 'transport'
-        elif any(keyword in url_lower for keyword in ['activity', 'team-building', 'entertainment', 'eventyr', 'teambuilding']):
-            return 'activities'
-        elif any(keyword in url_lower for keyword in ['av', 'sound', 'light', 'equipment', 'rental', 'projector']):
-            return 'av-equipment'
-        elif any(keyword in url_lower for keyword in ['venue', 'meeting', 'conference', 'hall', 'room']):
-            return 'venue'
-        
-        # Check page content
-        if any(keyword in page_text for keyword in ['catering', 'menu', 'cuisine', 'buffet']):
-            return 'catering'
-        elif any(keyword in page_text for keyword in ['transport', 'vehicle', 'chauffeur', 'pickup']):
-            return 'transport'
-        elif any(keyword in page_text for keyword in ['team building', 'activity', 'workshop', 'experience']):
-            return 'activities'
-        elif any(keyword in page_text for keyword in ['sound system', 'projector', 'microphone', 'av equipment']):
-            return 'av-equipment'
+        vendor_type = self._url_vendor_type(url)
+        if vendor_type:
+            return vendor_type
+        
+        # Check page content (only scanned if the URL was inconclusive)
+        page_hits = (doc or self._document(response)).keyword_hits
+        for vendor_type in VENDOR_TYPE_ORDER:
+            if f'page:{vendor_type}' in page_hits:
+                return vendor_type
         
         # Default to venue
         return 'venue'
     
+    def _url_vendor_type(self, url: str) -> Optional[str]:
+        """Vendor type suggested by the URL alone, if any."""
+        url_hits = self.keyword_matcher.scan(url.lower())
+        for vendor_type in VENDOR_TYPE_ORDER:
+            if f'url:{vendor_type}' in url_hits:
+                return vendor_type
+        return None
+    
+    def _rebuild_item(self, data: Optional[dict]):
+        """Rebuild an item from its dict form (stored item or extraction pool result)."""
+        if not data:
+            return None
+        item_class = ITEM_CLASSES.get(data.get('vendor_type'), VenueItem)
+        return item_class(**{key: value for key, value in data.items() if key in item_class.fields})
+    
+    def _document(self, response) -> ResponseDocument:
+        """The shared, pre-cleaned document context of a response."""
+        return ResponseDocument.of(response, keyword_matcher=self.keyword_matcher)
+    
     def parse(self, response):
         """Parse listing pages or direct vendor pages."""
-        # Extract links from listing pages
-        vendor_links = (
-            response.css('a.venue-link::attr(href)').getall() or
-            response.css('.listing-item a::attr(href)').getall() or
-            response.css('.vendor-link::attr(href)').getall() or
-            response.css('a[href*="/venue/"]::attr(href)').getall() or
-            response.css('a[href*="/catering/"]::attr(href)').getall() or
-            response.css('a[href*="/transport/"]::attr(href)').getall() or
-            response.css('a[href*="/activity/"]::attr(href)').getall() or
-            response.xpath('//a[contains(@href, "/venue/") or contains(@href, "/catering/") or contains(@href, "/transport/") or contains(@href, "/activity/")]/@href').getall()
-        )
+        # Extract links from listing pages (on the pre-cleaned tree)
+        doc = self._document(response)
+        vendor_links = self.site_adapters.get(response, 'listing', doc.root, 'vendor_links')
         
         if vendor_links:
-            for link in set(vendor_links):
-                absolute_url = response.urljoin(link)
-                if self._needs_javascript(absolute_url):
-                    yield scrapy.Request(
-                        url=absolute_url,
-                        callback=self.parse_vendor,
-                        meta={
-                            'playwright': True,
-                            'playwright_page_methods': [
-                                PageMethod('wait_for_selector', 'body', timeout=10000),
-                                PageMethod('wait_for_load_state', 'networkidle'),
-                            ],
-                        }
-                    )
-                else:
-                    yield scrapy.Request(url=absolute_url, callback=self.parse_vendor)
-            
-            # Handle pagination
-            next_page = (
-                response.css('a.next-page::attr(href)').get() or
-                response.css('a[rel="next"]::attr(href)').get() or
-                response.xpath('//a[contains(text(), "Next") or contains(text(), "næste")]/@href').get()
-            )
-            if next_page:
-                absolute_next = response.urljoin(next_page)
-                if self._needs_javascript(absolute_next):
-                    yield scrapy.Request(
-                        url=absolute_next,
-                        callback=self.parse,
-                        meta={
-                            'playwright': True,
-                            'playwright_page_methods': [
-                                PageMethod('wait_for_selector', 'body', timeout=10000),
-                                PageMethod('wait_for_load_state', 'networkidle'),
-                            ],
-                        }
-                    )
-                else:
-                    yield scrapy.Request(url=absolute_next, callback=self.parse)
-        else:
-            # Direct vendor page
-            yield from self.parse_vendor(response)
+            return self._follow_listing(response, vendor_links)
+        
+        # Direct vendor page (rendered first if the plain HTML has no content)
+        return self._extract(response, self.parse, listing=True)
+    
+    def _follow_listing(self, response, vendor_links):
+        """Follow vendor links and pagination of a listing page."""
+        self.render_engine.record(response.url, bool(response.meta.get('playwright')), True,
+                                  escalated=response.meta.get('render_escalated', False))
+        hint = response.meta.get('vendor_type_hint')
+        for link in set(vendor_links):
+            url = response.urljoin(link)
+            vendor_type = self._url_vendor_type(url) or hint or 'venue'
+            if not self.scheduling.admit_detail(vendor_type):
+                continue
+            if not self._admit(url, revisit_after=self.frontier_revisit_secs):
+                continue
+            yield self._request(url, self.parse_vendor, priority=self.scheduling.schedule_detail(vendor_type),
+                                meta={'revalidate': True, 'vendor_type_hint': vendor_type})
+        
+        # Handle pagination (listings are re-read every run to discover new vendors);
+        # deeper pages of a site rank lower, and a listing whose type is full stops here
+        next_page = self.site_adapters.get(response, 'listing', response.selector.root, 'next_page')
+        if next_page and not (hint and self.scheduling.quota_full(hint)):
+            url = response.urljoin(next_page)
+            depth = response.meta.get('listing_depth', 0) + 1
+            if self._admit(url):
+                yield self._request(url, self.parse, priority=self.scheduling.listing_priority_for(depth),
+                                    meta={'listing_depth': depth, 'vendor_type_hint': hint})
     
     def parse_vendor(self, response):
         """Extract vendor data based on detected type."""
-        vendor_type = self._detect_vendor_type(response.url, response)
+        # Not modified since the last crawl: reuse the stored item
+        if response.status == 304:
+            item = self._rebuild_item(response.meta.get('stored_item'))
+            return [item] if item is not None else []
+        
+        return self._extract(response, self.parse_vendor, detail=True)
+    
+    def _extract(self, response, callback, listing: bool = False, detail: bool = False):
+        """
+        Pass the render gate (a Playwright re-request of a plain fetch without
+        vendor signals), then extract vendor items: in-process, or with the
+        extraction pool enabled both in a worker, so the reactor does no DOM
+        work for the page. A detail page that yields no item and shows no sign
+        of being a vendor page is marked as such in the frontier.
+        """
+        if self.extraction_pool is not None:
+            return self._extract_vendor_offloaded(response, callback, listing, detail)
+        escalation = self._render_gate(response, callback, listing=listing)
+        if escalation:
+            return [escalation]
+        items = list(self._extract_vendor(response))
+        if detail and not items and self.frontier is not None:
+            self._mark_not_vendor(response, self._not_vendor_reason(response))
+        return items
+    
+    async def _extract_vendor_offloaded(self, response, callback, listing: bool = False, detail: bool = False):
+        """Run the render gate checks and _extract_vendor in the extraction pool; the reactor keeps scheduling I/O."""
+        # The worker follows this process' probe decision and returns the selector counts it recorded
+        result = await self.extraction_pool.extract(
+            response.url, response.body, response.encoding, self.site_adapters.probes(response),
+            rendered=bool(response.meta.get('playwright')), listing=listing, detail=detail,
+        )
+        self.site_adapters.merge(result.counts)
+        escalation = self._render_decision(response, callback, result.has_signals)
+        if escalation:
+            return [escalation]
+        self.crawler.stats.inc_value('extraction_pool/pages')
+        if detail and not result.items:
+            self._mark_not_vendor(response, result.not_vendor_reason)
+        return [self._rebuild_item(data) for data in result.items]
+    
+    def _mark_not_vendor(self, response, reason: Optional[str]):
+        """
+        Mark a detail page without items in the frontier when it is not a
+        vendor page (`reason`, from _not_vendor_reason). Pages that look like
+        vendor pages were dropped on their fields (missing or non-CPH address,
+        extraction miss) and must be fetched again.
+        """
+        if self.frontier is None:
+            return
+        if reason is None:
+            self.logger.debug(f"Vendor page without items, kept in the frontier: {response.url}")
+            return
+        self.logger.debug(f"Not a vendor page ({reason}), skipped in future crawls: {response.url}")
+        self.frontier.mark_not_vendor(response.request.url if response.request else response.url, reason)
+    
+    def _not_vendor_reason(self, response) -> Optional[str]:
+        """Why a page is not a vendor page, or None if it has vendor signals or a vendor type."""
+        doc = self._document(response)
+        if doc.json_ld or has_vendor_signals(response):
+            return None
+        if self._url_vendor_type(response.url):
+            return None
+        page_hits = doc.keyword_hits
+        if any(f'page:{vendor_type}' in page_hits for vendor_type in VENDOR_TYPE_ORDER):
+            return None
+        return 'no vendor signals or vendor type keywords'
+    
+    def _extract_vendor(self, response):
+        """Detect the vendor type and run the matching parse_* extraction."""
+        doc = self._document(response)
+        vendor_type = self._detect_vendor_type(response.url, response, doc)
         
         if vendor_type == 'venue':
-            yield from self.parse_venue(response)
+            yield from self.parse_venue(response, doc)
         elif vendor_type == 'catering':
-            yield from self.parse_catering(response)
+            yield from self.parse_catering(response, doc)
         elif vendor_type == 'transport':
-            yield from self.parse_transport(response)
+            yield from self.parse_transport(response, doc)
         elif vendor_type == 'activities':
-            yield from self.parse_activities(response)
+            yield from self.parse_activities(response, doc)
         elif vendor_type == 'av-equipment':
-            yield from self.parse_av_equipment(response)
+            yield from self.parse_av_equipment(response, doc)
     
-    def parse_venue(self, response):
+    def _passes_validation(self, vendor_type: str, name: Optional[str], address_full: Optional[str], response) -> bool:
+        """
+        Check the required fields against the ValidationPipeline rules before
+        an item is built; pages that would be dropped are skipped here.
+        """
+        reason = rejection_reason(vendor_type, name, address_full)
+        if reason is None:
+            return True
+        self.logger.debug(f"Skipping {vendor_type} page: {reason}. URL: {response.url}")
+        crawler = getattr(self, 'crawler', None)
+        if crawler is not None:
+            crawler.stats.inc_value(f'validation/rejected_in_spider/{vendor_type}')
+        return False
+    
+    def parse_venue(self, response, doc: Optional[ResponseDocument] = None):
         """Extract comprehensive venue data."""
-        item = VenueItem()
-        item['vendor_type'] = 'venue'
-        item['url_source'] = response.url
+        doc = doc or self._document(response)
+        fields = self.site_adapters.fields(response, 'venue', doc.root)
         
-        # Name
-        item['name'] = (
-            response.css('h1.venue-name::text').get() or
-            response.css('h1::text').get() or
-            response.xpath('//h1[contains(@class, "venue") or contains(@class, "title")]/text()').get() or
-            response.css('title::text').get()
-        )
-        if item['name']:
-            item['name'] = item['name'].strip()
+        # Required fields first: nothing else is computed for venues that would be dropped
+        name = fields['name']
+        if name:
+            name = name.strip()
+        address_full = fields['address_full'].strip() if fields['address_full'] else None
         
-        # Address
-        address_selectors = [
-            'div.address::text', 'span.address::text', '[itemprop="address"]::text',
-            '.venue-address::text', 'address::text', '[itemprop="streetAddress"]::text'
-        ]
-        item['address_full'] = None
-        for selector in address_selectors:
-            addr = response.css(selector).get()
+        # Try JSON-LD
+        if not address_full:
+            addr = doc.json_ld_address()
             if addr:
-                item['address_full'] = addr.strip()
-                break
+                address_full = ', '.join([
+                    addr.get('streetAddress', ''),
+                    addr.get('addressLocality', ''),
+                    addr.get('postalCode', ''),
+                    addr.get('addressCountry', '')
+                ]).strip(', ')
         
-        # Try JSON-LD
-        if not item['address_full']:
-            json_ld = response.css('script[type="application/ld+json"]::text').get()
-            if json_ld:
-                try:
-                    data = json.loads(json_ld)
-                    if isinstance(data, dict):
-                        addr = data.get('address', {})
-                        if isinstance(addr, dict):
-                            item['address_full'] = ', '.join([
-                                addr.get('streetAddress', ''),
-                                addr.get('addressLocality', ''),
-                                addr.get('postalCode', ''),
-                                addr.get('addressCountry', '')
-                            ]).strip(', ')
-                except:
-                    pass
+        if not self._passes_validation('venue', name, address_full, response):
+            return
+        
+        item = VenueItem()
+        item['vendor_type'] = 'venue'
+        item['url_source'] = response.url
+        item['name'] = name
+        item['address_full'] = address_full
         
         # Description
-        item['description'] = (
-            response.css('meta[name="description"]::attr(content)').get() or
-            response.css('.description::text').get() or
-            response.css('.venue-description::text').get() or
-            response.xpath('//*[contains(@class, "description")]//text()').get()
-        )
+        item['description'] = fields['description']
         
         # Capacity
-        capacity_text = (
-            response.css('.capacity::text').get() or
-            response.xpath('//*[contains(text(), "capacity")]/following-sibling::text()').get() or
-            response.xpath('//*[contains(@class, "capacity")]//text()').get()
-        )
+        capacity_text = fields['capacity']
         if capacity_text:
             numbers = re.findall(r'\d+', capacity_text.replace(',', '').replace('.', ''))
             if len(numbers) >= 2:
@@ -290,233 +464,173 @@ class CopenhagenEventVendorSpider(scrapy.Spider):
                 item['capacity_min_max'] = numbers[0]
         
         # Number of rooms
-        rooms_text = response.xpath('//*[contains(text(), "room") or contains(text(), "lokale")]/text()').get()
+        rooms_text = fields['rooms']
         if rooms_text:
             rooms = re.findall(r'\d+', rooms_text)
             if rooms:
                 item['number_of_rooms'] = rooms[0]
         
         # Event types
-        event_types = []
-        for selector in ['.event-types li::text', '.event-types span::text', '[data-event-type]::text', '.tags::text']:
-            types = response.css(selector).getall()
-            if types:
-                event_types.extend([t.strip() for t in types if t.strip()])
-        
-        page_text = ' '.join(response.css('body *::text').getall()).lower()
-        event_keywords = ['Conference', 'Gala', 'Dinner', 'Product Launch', 'Seminar', 'Workshop', 'Networking', 'Exhibition']
-        for keyword in event_keywords:
-            if keyword.lower() in page_text and keyword not in event_types:
+        event_types = [t.strip() for t in fields['event_types'] if t.strip()]
+        
+        hits = doc.keyword_hits
+        for keyword in self.keyword_matcher.ordered(hits, 'event_types'):
+            if keyword not in event_types:
                 event_types.append(keyword)
         item['event_types'] = sorted(list(set(event_types))) if event_types else []
         
         # Pricing
-        price_selectors = ['.price::text', '.package-price::text', '[itemprop="price"]::text', '.starting-price::text']
-        item['base_package_price'] = None
-        for selector in price_selectors:
-            price = response.css(selector).get()
-            if price:
-                item['base_package_price'] = price.strip()
-                break
+        item['base_package_price'] = fields['price'].strip() if fields['price'] else None
         
         # A/V
-        av_text = ' '.join(response.css('body *::text').getall()).lower()
-        item['in_house_av'] = any(kw in av_text for kw in ['yes', 'available', 'included', 'in-house', 'ja', 'medfølger'])
+        item['in_house_av'] = 'in_house_av' in hits
         
         # Amenities
-        amenities = []
-        for selector in ['.amenities li::text', '.amenities span::text', '.features li::text']:
-            amens = response.css(selector).getall()
-            if amens:
-                amenities.extend([a.strip() for a in amens if a.strip()])
-        item['amenities'] = amenities
+        item['amenities'] = [a.strip() for a in fields['amenities'] if a.strip()]
         
         # Parking, WiFi, Accessibility
-        item['parking_available'] = 'parking' in av_text or 'parkeringsplads' in av_text
-        item['wifi_available'] = 'wifi' in av_text or 'wi-fi' in av_text
-        item['accessibility'] = 'accessible' in av_text or 'tilgængelig' in av_text or 'wheelchair' in av_text
+        item['parking_available'] = 'parking' in hits
+        item['wifi_available'] = 'wifi' in hits
+        item['accessibility'] = 'accessibility' in hits
         
         # Contact
-        item['phone'] = response.css('[itemprop="telephone"]::text').get() or re.search(r'\+?\d{2,3}[\s-]?\d{2,3}[\s-]?\d{2,4}[\s-]?\d{2,4}', response.text)
-        if item['phone'] and hasattr(item['phone'], 'group'):
-            item['phone'] = item['phone'].group(0)
-        item['email'] = response.css('[itemprop="email"]::text').get() or re.search(r'[\w\.-]+@[\w\.-]+\.\w+', response.text)
-        if item['email'] and hasattr(item['email'], 'group'):
-            item['email'] = item['email'].group(0)
-        item['website'] = response.css('[itemprop="url"]::attr(content)').get() or response.url
+        item['phone'] = fields['phone'] or doc.contacts.phone
+        item['email'] = fields['email'] or doc.contacts.email
+        item['website'] = fields['website'] or response.url
         
         # Images
-        item['images'] = response.css('img::attr(src)').getall()[:10]  # Limit to 10 images
-        item['images'] = [response.urljoin(img) for img in item['images'] if img]
+        item['images'] = [response.urljoin(img) for img in fields['images'][:10] if img]  # Limit to 10 images
         
         # Rating
-        rating_text = response.css('[itemprop="ratingValue"]::text').get() or response.css('.rating::text').get()
+        rating_text = fields['rating']
         if rating_text:
             rating_match = re.search(r'(\d+\.?\d*)', rating_text)
             if rating_match:
                 item['rating'] = float(rating_match.group(1))
         
-        if item['name'] and item['address_full']:
-            yield item
+        yield item
     
-    def parse_catering(self, response):
+    def _required_fields(self, response, doc: ResponseDocument, vendor_type: str):
+        """Lazy plan fields plus the stripped name and the address of a non-venue vendor page."""
+        fields = self.site_adapters.fields(response, vendor_type, doc.root)
+        name = fields['name']
+        if name:
+            name = name.strip()
+        return fields, name, fields['address_full']
+    
+    def parse_catering(self, response, doc: Optional[ResponseDocument] = None):
         """Extract catering service data."""
+        doc = doc or self._document(response)
+        fields, name, address_full = self._required_fields(response, doc, 'catering')
+        if not self._passes_validation('catering', name, address_full, response):
+            return
+        
         item = CateringItem()
         item['vendor_type'] = 'catering'
         item['url_source'] = response.url
-        
-        # Name
-        item['name'] = (
-            response.css('h1::text').get() or
-            response.css('title::text').get()
-        )
-        if item['name']:
-            item['name'] = item['name'].strip()
-        
-        # Address
-        item['address_full'] = (
-            response.css('[itemprop="address"]::text').get() or
-            response.css('address::text').get() or
-            response.css('.address::text').get()
-        )
+        item['name'] = name
+        item['address_full'] = address_full
         
         # Description
-        item['description'] = response.css('meta[name="description"]::attr(content)').get()
+        item['description'] = fields['description']
         
         # Cuisine types
-        page_text = ' '.join(response.css('body *::text').getall()).lower()
-        cuisine_keywords = ['italian', 'french', 'asian', 'danish', 'vegetarian', 'vegan', 'mediterranean']
-        item['cuisine_types'] = [c for c in cuisine_keywords if c in page_text]
+        hits = doc.keyword_hits
+        item['cuisine_types'] = self.keyword_matcher.ordered(hits, 'cuisine')
         
         # Service types
-        service_keywords = ['buffet', 'plated', 'cocktail', 'canapes', 'breakfast', 'lunch', 'dinner']
-        item['service_types'] = [s for s in service_keywords if s in page_text]
+        item['service_types'] = self.keyword_matcher.ordered(hits, 'service')
         
         # Pricing
-        price_match = re.search(r'(\d+)\s*(?:DKK|EUR|kr)', page_text, re.IGNORECASE)
-        if price_match:
-            item['price_per_person'] = f"{price_match.group(1)} DKK"
+        if doc.price:
+            item['price_per_person'] = f"{doc.price} DKK"
         
         # Contact
-        item['phone'] = re.search(r'\+?\d{2,3}[\s-]?\d{2,3}[\s-]?\d{2,4}[\s-]?\d{2,4}', response.text)
-        if item['phone']:
-            item['phone'] = item['phone'].group(0)
-        item['email'] = re.search(r'[\w\.-]+@[\w\.-]+\.\w+', response.text)
-        if item['email']:
-            item['email'] = item['email'].group(0)
+        item['phone'] = doc.contacts.phone
+        item['email'] = doc.contacts.email
         
         # Images
-        item['images'] = [response.urljoin(img) for img in response.css('img::attr(src)').getall()[:5]]
+        item['images'] = [response.urljoin(img) for img in fields['images'][:5]]
         
-        if item['name']:
-            yield item
+        yield item
     
-    def parse_transport(self, response):
+    def parse_transport(self, response, doc: Optional[ResponseDocument] = None):
         """Extract transportation service data."""
+        doc = doc or self._document(response)
+        fields, name, address_full = self._required_fields(response, doc, 'transport')
+        if not self._passes_validation('transport', name, address_full, response):
+            return
+        
         item = TransportItem()
         item['vendor_type'] = 'transport'
         item['url_source'] = response.url
-        
-        # Name
-        item['name'] = (
-            response.css('h1::text').get() or
-            response.css('title::text').get()
-        )
-        if item['name']:
-            item['name'] = item['name'].strip()
-        
-        # Address
-        item['address_full'] = response.css('address::text').get() or response.css('.address::text').get()
+        item['name'] = name
+        item['address_full'] = address_full
         
         # Vehicle types
-        page_text = ' '.join(response.css('body *::text').getall()).lower()
-        vehicle_keywords = ['bus', 'limousine', 'minivan', 'car', 'van', 'coach']
-        item['vehicle_types'] = [v for v in vehicle_keywords if v in page_text]
+        item['vehicle_types'] = self.keyword_matcher.ordered(doc.keyword_hits, 'vehicle')
         
         # Pricing
-        price_match = re.search(r'(\d+)\s*(?:DKK|EUR|kr)', page_text, re.IGNORECASE)
-        if price_match:
-            item['price_per_hour'] = f"{price_match.group(1)} DKK"
+        if doc.price:
+            item['price_per_hour'] = f"{doc.price} DKK"
         
         # Contact
-        item['phone'] = re.search(r'\+?\d{2,3}[\s-]?\d{2,3}[\s-]?\d{2,4}[\s-]?\d{2,4}', response.text)
-        if item['phone']:
-            item['phone'] = item['phone'].group(0)
+        item['phone'] = doc.contacts.phone
         
-        if item['name']:
-            yield item
+        yield item
     
-    def parse_activities(self, response):
+    def parse_activities(self, response, doc: Optional[ResponseDocument] = None):
         """Extract activities/entertainment data."""
+        doc = doc or self._document(response)
+        fields, name, address_full = self._required_fields(response, doc, 'activities')
+        if not self._passes_validation('activities', name, address_full, response):
+            return
+        
         item = ActivitiesItem()
         item['vendor_type'] = 'activities'
         item['url_source'] = response.url
-        
-        # Name
-        item['name'] = (
-            response.css('h1::text').get() or
-            response.css('title::text').get()
-        )
-        if item['name']:
-            item['name'] = item['name'].strip()
-        
-        # Address
-        item['address_full'] = response.css('address::text').get()
+        item['name'] = name
+        item['address_full'] = address_full
         
         # Activity types
-        page_text = ' '.join(response.css('body *::text').getall()).lower()
-        activity_keywords = ['team-building', 'cooking', 'escape-room', 'workshop', 'networking', 'sports']
-        item['activity_types'] = [a for a in activity_keywords if a in page_text]
+        item['activity_types'] = self.keyword_matcher.ordered(doc.keyword_hits, 'activity')
         
         # Pricing
-        price_match = re.search(r'(\d+)\s*(?:DKK|EUR|kr)', page_text, re.IGNORECASE)
-        if price_match:
-            item['price_per_person'] = f"{price_match.group(1)} DKK"
+        if doc.price:
+            item['price_per_person'] = f"{doc.price} DKK"
         
         # Contact
-        item['phone'] = re.search(r'\+?\d{2,3}[\s-]?\d{2,3}[\s-]?\d{2,4}[\s-]?\d{2,4}', response.text)
-        if item['phone']:
-            item['phone'] = item['phone'].group(0)
+        item['phone'] = doc.contacts.phone
         
-        if item['name']:
-            yield item
+        yield item
     
-    def parse_av_equipment(self, response):
+    def parse_av_equipment(self, response, doc: Optional[ResponseDocument] = None):
         """Extract AV equipment rental data."""
+        doc = doc or self._document(response)
+        fields, name, address_full = self._required_fields(response, doc, 'av-equipment')
+        if not self._passes_validation('av-equipment', name, address_full, response):
+            return
+        
         item = AVEquipmentItem()
         item['vendor_type'] = 'av-equipment'
         item['url_source'] = response.url
-        
-        # Name
-        item['name'] = (
-            response.css('h1::text').get() or
-            response.css('title::text').get()
-        )
-        if item['name']:
-            item['name'] = item['name'].strip()
-        
-        # Address
-        item['address_full'] = response.css('address::text').get()
+        item['name'] = name
+        item['address_full'] = address_full
         
         # Equipment types
-        page_text = ' '.join(response.css('body *::text').getall()).lower()
-        equipment_keywords = ['projector', 'sound system', 'microphone', 'screen', 'speaker', 'lighting']
-        item['equipment_types'] = [e for e in equipment_keywords if e in page_text]
+        hits = doc.keyword_hits
+        item['equipment_types'] = self.keyword_matcher.ordered(hits, 'equipment')
         
         # Services
-        item['delivery_available'] = 'delivery' in page_text or 'levering' in page_text
-        item['setup_service'] = 'setup' in page_text or 'opsætning' in page_text
-        item['technical_support'] = 'support' in page_text or 'teknisk' in page_text
+        item['delivery_available'] = 'delivery' in hits
+        item['setup_service'] = 'setup' in hits
+        item['technical_support'] = 'technical_support' in hits
         
         # Pricing
-        price_match = re.search(r'(\d+)\s*(?:DKK|EUR|kr)', page_text, re.IGNORECASE)
-        if price_match:
-            item['price_per_day'] = f"{price_match.group(1)} DKK"
+        if doc.price:
+            item['price_per_day'] = f"{doc.price} DKK"
         
         # Contact
-        item['phone'] = re.search(r'\+?\d{2,3}[\s-]?\d{2,3}[\s-]?\d{2,4}[\s-]?\d{2,4}', response.text)
-        if item['phone']:
-            item['phone'] = item['phone'].group(0)
+        item['phone'] = doc.contacts.phone
         
-        if item['name']:
-            yield item
+        yield item
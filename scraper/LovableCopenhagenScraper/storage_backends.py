@@ -0,0 +1,461 @@
+# Batched database backends for StoragePipeline.
+#
+# Besides the JSON snapshot, every new or changed vendor can be mirrored into
+# a database. Writing one row (and committing) per item makes that mirror the
+# slowest part of a large import, so items are buffered and written in
+# batches - by size and by age - with one statement or bulk operation and one
+# commit per batch:
+#
+#   sqlite      executemany upsert (default; local, no server needed)
+#   postgresql  COPY into a temporary staging table and one INSERT ... SELECT
+#               ... ON CONFLICT merge, or execute_values upserts
+#   mongodb     unordered bulk_write of upserting UpdateOne operations
+#
+# WriterThread moves storage work (index, log, compaction, backend writes)
+# off the reactor thread: items are handed over through a bounded queue and
+# a full queue makes process_item wait instead of growing memory without
+# bound, so a slow disk or database round-trip no longer stalls the crawl.
+
+import collections
+import csv
+import io
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from scrapy.utils.misc import load_object
+from twisted.internet.defer import Deferred, succeed
+from twisted.python.failure import Failure
+
+from LovableCopenhagenScraper import jsonio
+from LovableCopenhagenScraper.instrumentation import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Columns stored next to the full item (JSON) in the SQL backends
+COLUMNS = ('url_source', 'vendor_type', 'name', 'address_full')
+
+
+def _row(item: Dict[str, Any]) -> tuple:
+    return tuple(item.get(column) for column in COLUMNS) + (jsonio.dumps(item).decode('utf-8'),)
+
+
+class StorageBackend:
+    """
+    Interface of a batched storage backend.
+
+    `write_batch` receives items keyed by url_source (later duplicates within
+    a batch replace earlier ones before the call) and must write them as
+    upserts, so replaying a batch is harmless.
+    """
+
+    name = 'backend'
+
+    def open(self) -> None:
+        pass
+
+    def write_batch(self, items: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteBackend(StorageBackend):
+    """Vendors table in a local SQLite file, upserted with executemany."""
+
+    name = 'sqlite'
+
+    def __init__(self, path: str, table: str = 'vendors'):
+        self.path = path
+        self.table = table
+        self.connection: Optional[sqlite3.Connection] = None
+
+    @classmethod
+    def from_settings(cls, settings, data_dir: str) -> 'SQLiteBackend':
+        return cls(settings.get('STORAGE_SQLITE_PATH') or os.path.join(data_dir, 'vendors.sqlite'),
+                   settings.get('STORAGE_TABLE', 'vendors'))
+
+    def open(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                url_source TEXT PRIMARY KEY,
+                vendor_type TEXT,
+                name TEXT,
+                address_full TEXT,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.connection.commit()
+
+    def write_batch(self, items: List[Dict[str, Any]]) -> None:
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(f"""
+                INSERT INTO {self.table} (url_source, vendor_type, name, address_full, data, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (url_source) DO UPDATE SET
+                    vendor_type = excluded.vendor_type,
+                    name = excluded.name,
+                    address_full = excluded.address_full,
+                    data = excluded.data,
+                    updated_at = excluded.updated_at
+            """, [_row(item) + (now,) for item in items])
+
+    def close(self) -> None:
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+
+class PostgreSQLBackend(StorageBackend):
+    """
+    Vendors table in PostgreSQL (psycopg2).
+
+    method 'copy' streams the batch with COPY into a temporary staging table
+    and merges it with a single INSERT ... SELECT ... ON CONFLICT; method
+    'executemany' sends multi-row upserts with psycopg2.extras.execute_values.
+    """
+
+    name = 'postgresql'
+
+    def __init__(self, dsn: str, table: str = 'vendors', method: str = 'copy'):
+        if method not in ('copy', 'executemany'):
+            raise ValueError(f"Unknown PostgreSQL write method: {method}")
+        self.dsn = dsn
+        self.table = table
+        self.method = method
+        self.connection = None
+
+    @classmethod
+    def from_settings(cls, settings, data_dir: str) -> 'PostgreSQLBackend':
+        dsn = settings.get('STORAGE_POSTGRES_DSN')
+        if not dsn:
+            raise ValueError("STORAGE_BACKEND = 'postgresql' requires STORAGE_POSTGRES_DSN")
+        return cls(dsn, settings.get('STORAGE_TABLE', 'vendors'), settings.get('STORAGE_POSTGRES_METHOD', 'copy'))
+
+    def open(self) -> None:
+        import psycopg2
+        self.connection = psycopg2.connect(self.dsn)
+        with self.connection, self.connection.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    url_source TEXT PRIMARY KEY,
+                    vendor_type TEXT,
+                    name TEXT,
+                    address_full TEXT,
+                    data JSONB NOT NULL,
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            """)
+
+    def _merge_sql(self, source: str) -> str:
+        return f"""
+            INSERT INTO {self.table} (url_source, vendor_type, name, address_full, data, updated_at)
+            {source}
+            ON CONFLICT (url_source) DO UPDATE SET
+                vendor_type = EXCLUDED.vendor_type,
+                name = EXCLUDED.name,
+                address_full = EXCLUDED.address_full,
+                data = EXCLUDED.data,
+                updated_at = EXCLUDED.updated_at
+        """
+
+    def write_batch(self, items: List[Dict[str, Any]]) -> None:
+        rows = [_row(item) for item in items]
+        try:
+            with self.connection.cursor() as cursor:
+                if self.method == 'copy':
+                    cursor.execute(f"""
+                        CREATE TEMP TABLE IF NOT EXISTS {self.table}_staging
+                        (url_source TEXT, vendor_type TEXT, name TEXT, address_full TEXT, data JSONB)
+                        ON COMMIT DELETE ROWS
+                    """)
+                    buffer = io.StringIO()
+                    csv.writer(buffer).writerows(rows)
+                    buffer.seek(0)
+                    cursor.copy_expert(
+                        f"COPY {self.table}_staging (url_source, vendor_type, name, address_full, data) "
+                        f"FROM STDIN WITH (FORMAT csv)", buffer
+                    )
+                    cursor.execute(self._merge_sql(
+                        f"SELECT url_source, vendor_type, name, address_full, data, now() FROM {self.table}_staging"
+                    ))
+                else:
+                    from psycopg2.extras import execute_values
+                    execute_values(cursor, self._merge_sql('VALUES %s'), rows,
+                                   template='(%s, %s, %s, %s, %s::jsonb, now())', page_size=len(rows))
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+
+    def close(self) -> None:
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+
+class MongoBackend(StorageBackend):
+    """Vendors collection in MongoDB, upserted with unordered bulk_write."""
+
+    name = 'mongodb'
+
+    def __init__(self, uri: str, database: str = 'event_copilot', collection: str = 'vendors'):
+        self.uri = uri
+        self.database = database
+        self.collection_name = collection
+        self.client = None
+        self.collection = None
+
+    @classmethod
+    def from_settings(cls, settings, data_dir: str) -> 'MongoBackend':
+        return cls(settings.get('STORAGE_MONGO_URI', 'mongodb://localhost:27017/'),
+                   settings.get('STORAGE_MONGO_DATABASE', 'event_copilot'),
+                   settings.get('STORAGE_TABLE', 'vendors'))
+
+    def open(self) -> None:
+        from pymongo import MongoClient
+        self.client = MongoClient(self.uri)
+        self.collection = self.client[self.database][self.collection_name]
+        self.collection.create_index('url_source', unique=True)
+
+    def write_batch(self, items: List[Dict[str, Any]]) -> None:
+        from pymongo import UpdateOne
+        self.collection.bulk_write(
+            [UpdateOne({'url_source': item['url_source']}, {'$set': item}, upsert=True) for item in items],
+            ordered=False,
+        )
+
+    def close(self) -> None:
+        if self.client:
+            self.client.close()
+            self.client = None
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend,
+    'postgresql': PostgreSQLBackend,
+    'mongodb': MongoBackend,
+}
+
+
+def backend_from_settings(settings, data_dir: str) -> Optional[StorageBackend]:
+    """Build the backend named by STORAGE_BACKEND (a name from BACKENDS or a class path); None if disabled."""
+    name = settings.get('STORAGE_BACKEND', 'sqlite')
+    if not name:
+        return None
+    cls = BACKENDS[name] if name in BACKENDS else load_object(name)
+    return cls.from_settings(settings, data_dir)
+
+
+class BatchWriter:
+    """
+    Buffers items for a backend and writes them in batches.
+
+    A batch is written when it holds `batch_size` items, when the oldest
+    buffered item is `flush_interval` seconds old (checked as items arrive),
+    and on close. Items without a url_source cannot be upserted and are
+    skipped. A failed batch stays buffered (newer versions of its items win)
+    and is retried once `flush_interval` has passed, or on the next explicit
+    flush(); flush() reports whether the buffer reached the backend, so the
+    caller can keep its own copy of the items until it has.
+    """
+
+    def __init__(self, backend: StorageBackend, batch_size: int = 500, flush_interval: float = 5.0, stats=None):
+        self.backend = backend
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.stats = stats
+        self.buffer: Dict[str, Dict[str, Any]] = {}
+        self.oldest: Optional[float] = None
+        # After a failed write, no retry is due before this time
+        self.retry_at: Optional[float] = None
+
+    def open(self) -> None:
+        self.backend.open()
+        logger.info(f"Storage backend: {self.backend.name} (batches of {self.batch_size})")
+
+    def add(self, item: Dict[str, Any]) -> None:
+        key = item.get('url_source')
+        if not key:
+            return
+        if self.oldest is None:
+            self.oldest = time.monotonic()
+        self.buffer[key] = item
+        if self.due():
+            self.flush()
+
+    def due(self) -> bool:
+        """Whether the buffer is full or its oldest item has waited flush_interval seconds."""
+        if self.retry_at is not None and time.monotonic() < self.retry_at:
+            return False
+        if len(self.buffer) >= self.batch_size:
+            return True
+        return bool(self.flush_interval and self.oldest is not None
+                    and time.monotonic() - self.oldest >= self.flush_interval)
+
+    def flush(self) -> bool:
+        """Write the buffer; True if everything buffered is now in the backend."""
+        if not self.buffer:
+            return True
+        buffered = self.buffer
+        items = list(buffered.values())
+        self.buffer = {}
+        self.oldest = None
+        started = time.monotonic()
+        try:
+            self.backend.write_batch(items)
+        except Exception as e:
+            logger.error(f"Error writing {len(items)} items to {self.backend.name}, keeping them for a retry: {e}")
+            self._inc('storage/backend_failed_items', len(items))
+            self.buffer = buffered
+            self.oldest = started
+            self.retry_at = started + max(self.flush_interval, 1.0)
+            return False
+        self.retry_at = None
+        logger.debug(f"Wrote {len(items)} items to {self.backend.name} in {time.monotonic() - started:.3f}s")
+        self._inc('storage/backend_batches')
+        self._inc('storage/backend_items', len(items))
+        return True
+
+    def _inc(self, key: str, count: int = 1) -> None:
+        if self.stats is not None:
+            self.stats.inc_value(key, count)
+
+    def close(self) -> bool:
+        """Flush and close the backend; False if items could not be written."""
+        flushed = self.flush()
+        self.backend.close()
+        return flushed
+
+
+_STOP = object()
+
+
+class WriterThread(threading.Thread):
+    """
+    Dedicated storage thread fed by a bounded queue.
+
+    `setup` runs first on the thread (SQLite connections must be used by the
+    thread that made them), then `handle` is called with each queued item in
+    order and `idle` whenever no item arrived for `idle_interval` seconds
+    (time-based flushes). `stop` queues a marker behind the remaining items;
+    once they are handled `teardown` runs and `finished` fires. An error in
+    `setup` is delivered to `opened` and ends the thread; errors in `handle`,
+    `idle` and `teardown` are logged and counted in `failed`.
+
+    `submit` and `stop` are called on the reactor thread. `submit` returns a
+    Deferred that fires once the item is in the queue: immediately while
+    there is room, otherwise when the writer has made room (backpressure).
+    """
+
+    def __init__(self, handle: Callable[[Any], None], setup: Optional[Callable[[], None]] = None,
+                 teardown: Optional[Callable[[], None]] = None, idle: Optional[Callable[[], None]] = None,
+                 queue_size: int = 1000, idle_interval: float = 1.0):
+        super().__init__(name='storage-writer', daemon=True)
+        self.handle = handle
+        self.setup = setup
+        self.teardown = teardown
+        self.idle = idle
+        self.idle_interval = idle_interval
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        # Items that found the queue full, in arrival order: (item, result, deferred)
+        self.waiting: collections.deque = collections.deque()
+        self.opened: Deferred = Deferred()
+        self.finished: Deferred = Deferred()
+        self.latency = Histogram()
+        self.max_depth = 0
+        self.backpressure_waits = 0
+        self.failed = 0
+        self._reactor = None
+
+    def start(self) -> None:
+        from twisted.internet import reactor
+        self._reactor = reactor
+        super().start()
+
+    # Reactor thread
+
+    def submit(self, item: Any, result: Any = None) -> Deferred:
+        """Queue an item; the Deferred fires with `result` once it is queued."""
+        if not self.waiting:
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                pass
+            else:
+                self.max_depth = max(self.max_depth, self.queue.qsize())
+                return succeed(result)
+        d = Deferred()
+        self.waiting.append((item, result, d))
+        self.backpressure_waits += 1
+        # The writer may have emptied the queue since put_nowait failed
+        self._admit()
+        return d
+
+    def _admit(self) -> None:
+        while self.waiting:
+            item, result, d = self.waiting[0]
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                return
+            self.waiting.popleft()
+            self.max_depth = max(self.max_depth, self.queue.qsize())
+            d.callback(result)
+
+    def stop(self) -> Deferred:
+        """Drain the queue and tear down; returns `finished`."""
+        if self.is_alive():
+            self._admit()
+            # Blocks at most until the writer has taken one item
+            self.queue.put(_STOP)
+        return self.finished
+
+    # Writer thread
+
+    def run(self) -> None:
+        if self.setup:
+            try:
+                self.setup()
+            except Exception:
+                self._reactor.callFromThread(self.opened.errback, Failure())
+                self._reactor.callFromThread(self.finished.callback, None)
+                return
+        self._reactor.callFromThread(self.opened.callback, None)
+        try:
+            while True:
+                try:
+                    item = self.queue.get(timeout=self.idle_interval)
+                except queue.Empty:
+                    self._call(self.idle)
+                    continue
+                if self.waiting:
+                    self._reactor.callFromThread(self._admit)
+                if item is _STOP:
+                    break
+                started = time.perf_counter()
+                self._call(self.handle, item)
+                self.latency.observe(time.perf_counter() - started)
+        finally:
+            self._call(self.teardown)
+            self._reactor.callFromThread(self.finished.callback, None)
+
+    def _call(self, func: Optional[Callable], *args) -> None:
+        if func is None:
+            return
+        try:
+            func(*args)
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Error in storage writer thread: {e}")
@@ -0,0 +1,33 @@
+# Item validation rules shared by the spider and ValidationPipeline.
+#
+# The spider checks these rules on the required fields before it computes
+# anything else for an item, so pages that would be dropped by the pipeline
+# cost only a couple of selector evaluations. ValidationPipeline applies the
+# same rules to every item that still reaches it (stored items re-yielded on
+# a 304, items from other spiders).
+
+from typing import Optional
+
+# An address must mention one of these to count as being in the Copenhagen area
+REGION_MARKERS = ('copenhagen', 'denmark', 'københavn')
+
+# Vendor types that are dropped without an address (optional for the others)
+ADDRESS_REQUIRED = frozenset(['venue'])
+
+
+def in_region(address: str) -> bool:
+    """Whether an address appears to be in the Copenhagen area."""
+    address_lower = address.lower()
+    return any(marker in address_lower for marker in REGION_MARKERS)
+
+
+def rejection_reason(vendor_type: Optional[str], name: Optional[str], address_full: Optional[str]) -> Optional[str]:
+    """Why an item with these required fields would be dropped, or None if it is valid."""
+    if not name or not name.strip():
+        return "Missing required field: name"
+    if (vendor_type or 'venue') in ADDRESS_REQUIRED:
+        if not address_full or not address_full.strip():
+            return f"Missing required field: address_full for {vendor_type or 'venue'}"
+        if not in_region(address_full):
+            return f"Address does not appear to be in Copenhagen area: {address_full}"
+    return None
@@ -0,0 +1,146 @@
+# Persistent keyed vendor index backing StoragePipeline.
+#
+# Vendors are stored in a SQLite table keyed by url_source together with a
+# content hash of the normalized item. Re-crawled vendors whose content has
+# not changed are recognised with a single primary-key lookup and skipped;
+# changed vendors are updated in place, keeping their original position in
+# the published snapshot (an explicit insertion sequence, `seq`).
+
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from LovableCopenhagenScraper import jsonio
+
+logger = logging.getLogger(__name__)
+
+ADDED = 'added'
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+
+
+def normalize_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop empty values so that a missing field and an empty one hash the same."""
+    return {key: value for key, value in item.items() if value not in (None, '', [], {})}
+
+
+def content_hash(item: Dict[str, Any]) -> str:
+    """Stable hash of an item's normalized content (key order independent)."""
+    return hashlib.blake2b(jsonio.dumps(normalize_item(item), sort_keys=True), digest_size=16).hexdigest()
+
+
+def item_key(item: Dict[str, Any], digest: Optional[str] = None) -> str:
+    """Index key: url_source, or the content hash for items without one."""
+    return item.get('url_source') or f"hash:{digest or content_hash(item)}"
+
+
+class VendorIndex:
+    """
+    SQLite store of vendors keyed by url_source.
+
+    Writes are grouped into a transaction that is committed by `commit()`;
+    StoragePipeline commits on every compaction and relies on its JSON Lines
+    log to replay anything written after the last commit.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def open(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        # Indexes created before `seq` existed are rebuilt, numbering their rows in
+        # rowid (insertion) order while it still holds; VACUUM would not keep it
+        columns = {row[1] for row in self.connection.execute('PRAGMA table_info(vendors)')}
+        unsequenced = bool(columns) and 'seq' not in columns
+        if unsequenced:
+            logger.info(f"Adding an insertion sequence to vendor index {self.path}")
+            self.connection.execute('ALTER TABLE vendors RENAME TO vendors_unsequenced')
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS vendors (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL UNIQUE,
+                vendor_type TEXT,
+                content_hash TEXT NOT NULL,
+                data BLOB NOT NULL,
+                first_seen REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        if unsequenced:
+            self.connection.execute("""
+                INSERT INTO vendors (key, vendor_type, content_hash, data, first_seen, updated_at)
+                SELECT key, vendor_type, content_hash, data, first_seen, updated_at
+                FROM vendors_unsequenced ORDER BY rowid
+            """)
+            self.connection.execute('DROP TABLE vendors_unsequenced')
+        self.connection.commit()
+
+    def close(self) -> None:
+        if self.connection:
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
+
+    def commit(self) -> None:
+        self.connection.commit()
+
+    def __len__(self) -> int:
+        return self.connection.execute('SELECT COUNT(*) FROM vendors').fetchone()[0]
+
+    def upsert(self, item: Dict[str, Any], digest: Optional[str] = None) -> str:
+        """
+        Insert or update an item; returns ADDED, UPDATED or UNCHANGED.
+        Unchanged items cause no write at all.
+        """
+        digest = digest or content_hash(item)
+        key = item_key(item, digest)
+        row = self.connection.execute('SELECT content_hash FROM vendors WHERE key = ?', (key,)).fetchone()
+        if row and row[0] == digest:
+            return UNCHANGED
+
+        now = time.time()
+        self.connection.execute("""
+            INSERT INTO vendors (key, vendor_type, content_hash, data, first_seen, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET
+                vendor_type = excluded.vendor_type,
+                content_hash = excluded.content_hash,
+                data = excluded.data,
+                updated_at = excluded.updated_at
+        """, (key, item.get('vendor_type'), digest, jsonio.dumps(item), now, now))
+        return UPDATED if row else ADDED
+
+    def insert_if_missing(self, item: Dict[str, Any]) -> bool:
+        """Insert an item unless its key is already present (used for seeding)."""
+        digest = content_hash(item)
+        now = time.time()
+        cursor = self.connection.execute("""
+            INSERT OR IGNORE INTO vendors (key, vendor_type, content_hash, data, first_seen, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (item_key(item, digest), item.get('vendor_type'), digest, jsonio.dumps(item), now, now))
+        return cursor.rowcount > 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self.connection.execute('SELECT data FROM vendors WHERE key = ?', (key,)).fetchone()
+        return jsonio.loads(row[0]) if row else None
+
+    def iter_items(self, vendor_type: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield stored items (optionally of one vendor type) in first-seen order, streaming from disk."""
+        if vendor_type is None:
+            cursor = self.connection.execute('SELECT data FROM vendors ORDER BY seq')
+        else:
+            cursor = self.connection.execute('SELECT data FROM vendors WHERE vendor_type IS ? ORDER BY seq',
+                                             (vendor_type,))
+        for (data,) in cursor:
+            yield jsonio.loads(data)
+
+    def iter_hashes(self) -> Iterator[Tuple[str, Optional[str], str]]:
+        """Yield (key, vendor_type, content_hash) in first-seen order without loading the items."""
+        yield from self.connection.execute('SELECT key, vendor_type, content_hash FROM vendors ORDER BY seq')
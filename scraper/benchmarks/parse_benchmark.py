@@ -0,0 +1,90 @@
+"""
+Offline parse-time benchmark for CopenhagenEventVendorSpider.
+
+Builds synthetic vendor pages of a realistic size (large text-node count,
+inline scripts) and measures how long `parse_vendor` takes per page.
+No network access is required.
+
+Usage:
+    cd scraper
+    python benchmarks/parse_benchmark.py [--pages 50] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapy.http import HtmlResponse, Request  # noqa: E402
+
+from LovableCopenhagenScraper.spiders.copenhagen_venue_spider import (  # noqa: E402
+    CopenhagenEventVendorSpider,
+)
+
+
+PAGE_TEMPLATES = {
+    'venue': ('https://www.example-venues.dk/venue/{i}', 'Conference venue {i}', 'Conference and gala dinner venue'),
+    'catering': ('https://www.example.dk/catering/{i}', 'Catering house {i}', 'Buffet and plated menus, danish cuisine'),
+    'transport': ('https://www.example.dk/transport/{i}', 'Coach company {i}', 'Bus and limousine with chauffeur'),
+    'activities': ('https://www.example.dk/activity/{i}', 'Team event {i}', 'Team building workshop and cooking'),
+    'av-equipment': ('https://www.example.dk/projector-hire/{i}', 'AV house {i}', 'Projector, microphone and lighting'),
+}
+
+
+def build_page(vendor_type: str, i: int, paragraphs: int = 400) -> HtmlResponse:
+    """Build a synthetic vendor page with many text nodes and inline scripts."""
+    url_tpl, name_tpl, blurb = PAGE_TEMPLATES[vendor_type]
+    url = url_tpl.format(i=i)
+    body_parts = [
+        '<html><head><title>%s</title>' % name_tpl.format(i=i),
+        '<meta name="description" content="%s">' % blurb,
+        '<script type="application/ld+json">{"@type": "Place", "address": {'
+        '"streetAddress": "Vesterbrogade %d", "addressLocality": "Copenhagen", '
+        '"postalCode": "1620", "addressCountry": "Denmark"}}</script>' % i,
+        '<style>.a{color:red}</style></head><body>',
+        '<h1>%s</h1>' % name_tpl.format(i=i),
+        '<div class="capacity">Capacity 20 - 250 guests</div>',
+        '<ul class="amenities"><li>WiFi</li><li>Parking</li><li>Catering</li></ul>',
+        '<span class="price">From 8500 DKK</span>',
+    ]
+    for p in range(paragraphs):
+        body_parts.append(
+            '<div class="section"><p>%s paragraph %d with <b>details</b> about '
+            'our offer, available rooms and <a href="/x/%d">more</a>.</p></div>' % (blurb, p, p)
+        )
+        if p % 50 == 0:
+            body_parts.append('<script>window.__state_%d = {"id": 123456789, "v": "%s"};</script>' % (p, 'x' * 200))
+    body_parts.append('<footer>Call +45 33 12 34 56 or write to info@example.dk</footer>')
+    body_parts.append('</body></html>')
+    body = ''.join(body_parts).encode('utf-8')
+    return HtmlResponse(url=url, body=body, encoding='utf-8', request=Request(url))
+
+
+def run(pages: int, repeat: int) -> None:
+    spider = CopenhagenEventVendorSpider()
+    for vendor_type in PAGE_TEMPLATES:
+        responses = [build_page(vendor_type, i) for i in range(pages)]
+        size_kb = sum(len(r.body) for r in responses) / len(responses) / 1024
+        best = None
+        items = 0
+        for _ in range(repeat):
+            # Fresh responses each round so cached selectors do not skew results
+            responses = [build_page(vendor_type, i) for i in range(pages)]
+            start = time.perf_counter()
+            items = 0
+            for response in responses:
+                items += sum(1 for _ in spider.parse_vendor(response))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{vendor_type:<14} {size_kb:7.1f} KB/page  "
+              f"{best / pages * 1000:8.2f} ms/page  {items} items")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    run(args.pages, args.repeat)
@@ -0,0 +1,87 @@
+"""
+Record a benchmark fixture from the HTTP cache.
+
+Copies the cached response body for a URL (CompressedCacheStorage, see
+LovableCopenhagenScraper/httpcache.py) into benchmarks/fixtures and adds it to
+fixtures/manifest.json, replacing an existing entry for the same file. Crawl
+with HTTPCACHE_ENABLED=1 first; rendered fixtures come from a crawl where the
+page went through Playwright.
+
+Usage:
+    cd scraper
+    python benchmarks/record_fixture.py URL --vendor-type venue --variant rendered
+"""
+
+import argparse
+import gzip
+import io
+import os
+import sqlite3
+import sys
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapy.utils.project import data_path, get_project_settings  # noqa: E402
+
+from LovableCopenhagenScraper import jsonio  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def cached_body(cache_dir: str, url: str) -> bytes:
+    connection = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'))
+    try:
+        row = connection.execute(
+            'SELECT body_hash FROM responses WHERE url = ? OR response_url = ? ORDER BY timestamp DESC LIMIT 1',
+            (url, url),
+        ).fetchone()
+    finally:
+        connection.close()
+    if row is None:
+        raise SystemExit(f"{url} is not in the HTTP cache at {cache_dir}")
+    with open(os.path.join(cache_dir, 'bodies', row[0][:2], row[0]), 'rb') as f:
+        return zlib.decompress(f.read())
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('url')
+    parser.add_argument('--vendor-type', required=True,
+                        choices=['venue', 'catering', 'transport', 'activities', 'av-equipment'])
+    parser.add_argument('--variant', choices=['static', 'rendered'], default='static')
+    parser.add_argument('--name', help='fixture file name (default <variant>.html.gz)')
+    parser.add_argument('--spider', default='copenhagen_event_vendor_spider')
+    parser.add_argument('--cache-dir', help='HTTP cache directory of the spider (default from settings)')
+    args = parser.parse_args(argv)
+
+    cache_dir = args.cache_dir or os.path.join(data_path(get_project_settings()['HTTPCACHE_DIR']), args.spider)
+    body = cached_body(cache_dir, args.url)
+
+    relative = f"{args.vendor_type}/{args.name or args.variant + '.html.gz'}"
+    path = os.path.join(FIXTURES_DIR, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if path.endswith('.gz'):
+        # mtime=0 keeps the file byte-identical for identical content
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0, filename='') as f:
+            f.write(body)
+        body = buffer.getvalue()
+    jsonio.atomic_write(path, body)
+
+    manifest_path = os.path.join(FIXTURES_DIR, 'manifest.json')
+    with open(manifest_path, 'rb') as f:
+        manifest = [entry for entry in jsonio.loads(f.read()) if entry['file'] != relative]
+    manifest.append({
+        'file': relative,
+        'url': args.url,
+        'vendor_type': args.vendor_type,
+        'rendered': args.variant == 'rendered',
+    })
+    manifest.sort(key=lambda entry: entry['file'])
+    jsonio.atomic_write(manifest_path, jsonio.dumps(manifest, indent=True) + b'\n')
+    print(f"Recorded {args.url} as {relative}")
+
+
+if __name__ == '__main__':
+    main()
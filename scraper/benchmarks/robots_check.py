@@ -0,0 +1,86 @@
+"""
+Check that the project's downloader middlewares still honour robots.txt.
+
+Serves a site from a temporary directory on localhost whose robots.txt
+disallows everything, crawls it with the project settings (ROBOTSTXT_OBEY and
+all custom middlewares enabled, pipelines and extensions off) and fails if
+any page other than robots.txt was requested. A middleware that drops or
+rewrites the robots.txt response (served as text/plain) would let the page
+through.
+
+Usage:
+    cd scraper
+    python benchmarks/robots_check.py
+"""
+
+import functools
+import http.server
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scrapy  # noqa: E402
+from scrapy.crawler import CrawlerProcess  # noqa: E402
+from scrapy.utils.project import get_project_settings  # noqa: E402
+
+ROBOTS_TXT = b'User-agent: *\nDisallow: /\n'
+PAGE = b'<html><body><h1>Venue</h1></body></html>'
+
+
+def serve(directory: str, requested: list) -> http.server.ThreadingHTTPServer:
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        def log_message(self, format, *args):
+            requested.append(self.path)
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(Handler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> int:
+    requested = []
+    with tempfile.TemporaryDirectory(prefix='robots-check-') as directory:
+        with open(os.path.join(directory, 'robots.txt'), 'wb') as f:
+            f.write(ROBOTS_TXT)
+        with open(os.path.join(directory, 'index.html'), 'wb') as f:
+            f.write(PAGE)
+        server = serve(directory, requested)
+        url = f'http://127.0.0.1:{server.server_address[1]}/index.html'
+
+        class RobotsCheckSpider(scrapy.Spider):
+            name = 'robots_check'
+
+            async def start(self):
+                yield scrapy.Request(url, callback=self.parse)
+
+            def parse(self, response):
+                pass
+
+        settings = get_project_settings()
+        settings.setdict({
+            'ROBOTSTXT_OBEY': True,
+            'ITEM_PIPELINES': {},
+            'EXTENSIONS': {},
+            'HTTPCACHE_ENABLED': False,
+            'INCREMENTAL_CRAWL_ENABLED': False,
+            'DOWNLOAD_DELAY': 0,
+            'LOG_LEVEL': 'ERROR',
+        }, priority='cmdline')
+        process = CrawlerProcess(settings)
+        process.crawl(RobotsCheckSpider)
+        process.start()
+        server.shutdown()
+
+    fetched = [path for path in requested if path != '/robots.txt']
+    if '/robots.txt' not in requested or fetched:
+        print(f"FAIL: robots.txt disallows everything, but requested {requested}")
+        return 1
+    print("OK: only robots.txt was requested")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
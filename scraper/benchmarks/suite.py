@@ -0,0 +1,385 @@
+"""
+Offline benchmark suite for CopenhagenEventVendorSpider and the item pipelines.
+
+Runs on the recorded HTML fixtures in benchmarks/fixtures (one static and one
+Playwright-rendered page per vendor type, listed in fixtures/manifest.json)
+and reports, for every benchmark:
+
+    pages/s   - responses processed per second (best of --repeat rounds)
+    items/s   - items produced (callbacks) or passed through (pipelines) per second
+    peak MB   - growth of the process' peak RSS while the benchmark ran
+
+Benchmarks:
+    detect:<variant>             _detect_vendor_type on every fixture
+    selectors:<variant>          the vendor type's selector plan on every fixture (tree pre-parsed)
+    parse_vendor:<variant>       full dispatch (detection + extraction)
+    parse_<type>:<variant>       each parse_* callback on its own fixtures
+    pipeline:validation|cleaning|geocoding|storage
+    pipeline:storage-threaded    StoragePipeline on its writer thread (until the queue is drained at close)
+    pipeline:end-to-end          ValidationPipeline -> CleaningPipeline -> GeocodingPipeline -> StoragePipeline
+
+Each benchmark runs in a fresh interpreter so peak memory is not inherited
+from the previous one. Nothing touches the network; StoragePipeline writes to
+a temporary directory.
+
+Results are comparable across commits: the fixtures are fixed, every benchmark
+processes the same number of pages, and the --json output records the commit
+and a hash of the fixtures. Compare against an earlier run with --compare.
+
+Usage:
+    cd scraper
+    python benchmarks/suite.py [--scale 20] [--repeat 5] [--only parse_venue]
+    python benchmarks/suite.py --json before.json
+    python benchmarks/suite.py --compare before.json
+"""
+
+import argparse
+import concurrent.futures
+import gzip
+import hashlib
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+sys.path.insert(0, SCRAPER_DIR)
+
+from scrapy.http import HtmlResponse, Request  # noqa: E402
+
+from LovableCopenhagenScraper import jsonio  # noqa: E402
+
+VARIANTS = ('static', 'rendered')
+CALLBACKS = {
+    'venue': 'parse_venue',
+    'catering': 'parse_catering',
+    'transport': 'parse_transport',
+    'activities': 'parse_activities',
+    'av-equipment': 'parse_av_equipment',
+}
+
+
+# Fixtures
+
+def load_manifest() -> List[Dict[str, Any]]:
+    with open(os.path.join(FIXTURES_DIR, 'manifest.json'), 'rb') as f:
+        return jsonio.loads(f.read())
+
+
+def read_fixture(entry: Dict[str, Any]) -> bytes:
+    path = os.path.join(FIXTURES_DIR, entry['file'])
+    with open(path, 'rb') as f:
+        data = f.read()
+    return gzip.decompress(data) if path.endswith('.gz') else data
+
+
+def fixtures_hash(manifest: List[Dict[str, Any]]) -> str:
+    digest = hashlib.sha1(jsonio.dumps(manifest, sort_keys=True))
+    for entry in manifest:
+        digest.update(read_fixture(entry))
+    return digest.hexdigest()[:12]
+
+
+def make_response(entry: Dict[str, Any], body: bytes) -> HtmlResponse:
+    """A response as the spider would receive it, flagged as rendered for Playwright fixtures."""
+    meta = {'playwright': True} if entry['rendered'] else {}
+    return HtmlResponse(url=entry['url'], body=body, encoding='utf-8', request=Request(entry['url'], meta=meta))
+
+
+# Benchmarks (run inside a worker process)
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _spider():
+    from LovableCopenhagenScraper.spiders.copenhagen_venue_spider import CopenhagenEventVendorSpider
+    return CopenhagenEventVendorSpider()
+
+
+def _select(manifest, variant=None, vendor_type=None):
+    return [entry for entry in manifest
+            if (variant is None or entry['rendered'] == (variant == 'rendered'))
+            and (vendor_type is None or entry['vendor_type'] == vendor_type)]
+
+
+def _time_callback(entries, scale: int, repeat: int, run_one, parse_first: bool = False) -> Dict[str, Any]:
+    bodies = [(entry, read_fixture(entry)) for entry in entries]
+    pages = len(bodies) * scale
+    best = None
+    items = 0
+    for _ in range(repeat):
+        # Fresh responses every round so cached selectors do not skew results
+        responses = [make_response(entry, body) for entry, body in bodies for _ in range(scale)]
+        if parse_first:
+            for response in responses:
+                response.selector  # build the lxml tree outside the timed section
+        start = time.perf_counter()
+        items = 0
+        for response in responses:
+            items += run_one(response)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {'pages': pages, 'items': items, 'seconds': best}
+
+
+def _pipeline_items(manifest, scale: int) -> list:
+    """Items parsed from every fixture, replicated `scale` times with distinct url_source values."""
+    spider = _spider()
+    parsed = []
+    for entry in manifest:
+        parsed.extend(spider.parse_vendor(make_response(entry, read_fixture(entry))))
+    items = []
+    for n in range(scale):
+        for item in parsed:
+            copy = item.copy()
+            copy['url_source'] = f"{item['url_source']}#{n}"
+            items.append(copy)
+    return items
+
+
+_reactor_thread = None
+
+
+def _in_reactor(func, *args):
+    """Call func (which may return a Deferred) on a reactor running in a background thread and wait for its result."""
+    global _reactor_thread
+    from twisted.internet import reactor
+    from twisted.internet.threads import blockingCallFromThread
+    if _reactor_thread is None:
+        _reactor_thread = threading.Thread(target=reactor.run, kwargs={'installSignalHandlers': False}, daemon=True)
+        _reactor_thread.start()
+    return blockingCallFromThread(reactor, func, *args)
+
+
+def _time_pipelines(stages: List[str], items: list, repeat: int) -> Dict[str, Any]:
+    from scrapy.exceptions import DropItem
+    from twisted.internet.defer import Deferred, inlineCallbacks
+    from LovableCopenhagenScraper.geocoding import Gazetteer
+    from LovableCopenhagenScraper.pipelines import (
+        CleaningPipeline,
+        GeocodingPipeline,
+        StoragePipeline,
+        ValidationPipeline,
+    )
+
+    @inlineCallbacks
+    def run_round(pipelines, batch):
+        # Pipeline methods may return Deferreds (the writer thread's backpressure); they are
+        # waited for as Scrapy would, which needs the reactor only if one has not fired yet
+        start = time.perf_counter()
+        for pipeline in pipelines:
+            if hasattr(pipeline, 'open_spider'):
+                result = pipeline.open_spider(spider)
+                if isinstance(result, Deferred):
+                    yield result
+        passed = 0
+        for item in batch:
+            try:
+                for pipeline in pipelines:
+                    item = pipeline.process_item(item, spider)
+                    if isinstance(item, Deferred):
+                        item = yield item
+                passed += 1
+            except DropItem:
+                pass
+        for pipeline in pipelines:
+            if hasattr(pipeline, 'close_spider'):
+                result = pipeline.close_spider(spider)
+                if isinstance(result, Deferred):
+                    yield result
+        return time.perf_counter() - start, passed
+
+    spider = _spider()
+    threaded = 'storage-threaded' in stages
+    best = None
+    passed = 0
+    for _ in range(repeat):
+        workdir = tempfile.mkdtemp(prefix='bench-storage-')
+        try:
+            pipelines = []
+            for stage in stages:
+                if stage == 'validation':
+                    pipelines.append(ValidationPipeline())
+                elif stage == 'cleaning':
+                    pipelines.append(CleaningPipeline())
+                elif stage == 'geocoding':
+                    # A fresh cache, so every address is resolved once per round
+                    pipelines.append(GeocodingPipeline(
+                        Gazetteer.load(), cache_path=os.path.join(workdir, 'data', 'geocode_cache.sqlite')))
+                else:
+                    pipelines.append(StoragePipeline(
+                        data_dir=os.path.join(workdir, 'data'),
+                        public_dir=os.path.join(workdir, 'public'),
+                        index_path=os.path.join(workdir, 'data', 'vendor_index.sqlite'),
+                        threaded=threaded,
+                    ))
+            batch = [item.copy() for item in items]
+            if threaded:
+                elapsed, passed = _in_reactor(run_round, pipelines, batch)
+            else:
+                result = []
+                run_round(pipelines, batch).addCallback(result.append)
+                elapsed, passed = result[0]
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        best = elapsed if best is None else min(best, elapsed)
+    return {'pages': None, 'items': passed, 'seconds': best}
+
+
+def run_benchmark(name: str, scale: int, repeat: int) -> Dict[str, Any]:
+    """Run one benchmark by name; executed in a fresh worker process."""
+    logging.disable(logging.CRITICAL)
+    manifest = load_manifest()
+    kind, _, variant = name.partition(':')
+
+    if kind == 'pipeline':
+        from LovableCopenhagenScraper.pipelines import CleaningPipeline, ValidationPipeline
+        items = _pipeline_items(manifest, scale)
+        # Each stage gets the input it would see in a crawl
+        if variant in ('cleaning', 'geocoding', 'storage', 'storage-threaded'):
+            items = [item for item in items if _passes(ValidationPipeline(), item)]
+        if variant in ('geocoding', 'storage', 'storage-threaded'):
+            items = [CleaningPipeline().process_item(item, None) for item in items]
+        stages = ['validation', 'cleaning', 'geocoding', 'storage'] if variant == 'end-to-end' else [variant]
+        baseline_rss = _peak_rss_mb()
+        result = _time_pipelines(stages, items, repeat)
+    else:
+        spider = _spider()
+        if kind == 'detect':
+            entries = _select(manifest, variant)
+            run_one = lambda response: bool(spider._detect_vendor_type(response.url, response, spider._document(response)))
+        elif kind == 'selectors':
+            entries = _select(manifest, variant)
+            vendor_types = {entry['url']: entry['vendor_type'] for entry in entries}
+            run_one = lambda response: bool(spider.selector_plans[vendor_types[response.url]].extract(
+                response.selector.root))
+        elif kind == 'parse_vendor':
+            entries = _select(manifest, variant)
+            run_one = lambda response: sum(1 for _ in spider.parse_vendor(response))
+        else:
+            vendor_type = next(t for t, callback in CALLBACKS.items() if callback == kind)
+            entries = _select(manifest, variant, vendor_type)
+            callback = getattr(spider, kind)
+            run_one = lambda response: sum(1 for _ in callback(response))
+        baseline_rss = _peak_rss_mb()
+        result = _time_callback(entries, scale, repeat, run_one, parse_first=kind == 'selectors')
+        if kind in ('detect', 'selectors'):
+            result['items'] = None
+
+    result['peak_mb'] = max(0.0, _peak_rss_mb() - baseline_rss)
+    result['name'] = name
+    return result
+
+
+def _passes(pipeline, item) -> bool:
+    from scrapy.exceptions import DropItem
+    try:
+        pipeline.process_item(item, None)
+        return True
+    except DropItem:
+        return False
+
+
+# Runner
+
+def benchmark_names() -> List[str]:
+    names = []
+    for variant in VARIANTS:
+        names.append(f'detect:{variant}')
+        names.append(f'selectors:{variant}')
+        names.append(f'parse_vendor:{variant}')
+        names.extend(f'{callback}:{variant}' for callback in CALLBACKS.values())
+    names.extend(f'pipeline:{stage}' for stage in ('validation', 'cleaning', 'geocoding', 'storage',
+                                                   'storage-threaded', 'end-to-end'))
+    return names
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRAPER_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def throughput(result: Dict[str, Any]) -> float:
+    """Pages per second, or items per second for the pipeline benchmarks."""
+    count = result['pages'] if result['pages'] is not None else result['items']
+    return count / result['seconds']
+
+
+def format_rate(count: Optional[int], seconds: float) -> str:
+    if count is None:
+        return '-'
+    return f"{count / seconds:,.0f}" if seconds else 'inf'
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=20, help='copies of each fixture per round (default 20)')
+    parser.add_argument('--repeat', type=int, default=5, help='rounds per benchmark, best is reported (default 5)')
+    parser.add_argument('--only', action='append', default=[],
+                        help='run benchmarks whose name starts with this prefix (repeatable)')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--compare', help='compare with results previously written by --json')
+    args = parser.parse_args(argv)
+
+    manifest = load_manifest()
+    names = [name for name in benchmark_names() if not args.only or any(name.startswith(p) for p in args.only)]
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'rb') as f:
+            baseline = jsonio.loads(f.read())
+    fixtures_id = fixtures_hash(manifest)
+    if baseline and baseline.get('fixtures') != fixtures_id:
+        print(f"warning: fixtures differ from {args.compare} ({baseline.get('fixtures')} != {fixtures_id})")
+
+    print(f"{len(manifest)} fixtures ({fixtures_id}), scale {args.scale}, best of {args.repeat}, "
+          f"commit {git_revision() or 'unknown'}")
+    header = f"{'benchmark':<30} {'pages/s':>10} {'items/s':>10} {'peak MB':>8}"
+    if baseline:
+        header += f" {'vs base':>8}"
+    print(header)
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for name in names:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(run_benchmark, name, args.scale, args.repeat).result()
+        results.append(result)
+        line = (f"{name:<30} {format_rate(result['pages'], result['seconds']):>10} "
+                f"{format_rate(result['items'], result['seconds']):>10} {result['peak_mb']:8.1f}")
+        if baseline:
+            previous = next((r for r in baseline['results'] if r['name'] == name), None)
+            if previous and previous['seconds'] and result['seconds']:
+                line += f" {(throughput(result) / throughput(previous) - 1) * 100:+7.1f}%"
+        print(line)
+
+    if args.json:
+        jsonio.atomic_write(args.json, jsonio.dumps({
+            'commit': git_revision(),
+            'fixtures': fixtures_id,
+            'scale': args.scale,
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': results,
+        }, indent=True))
+        print(f"Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
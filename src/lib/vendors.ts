@@ -1,5 +1,6 @@
 import { Vendor } from '@/types/event';
 import { usdToDkk } from '@/lib/utils/currency';
+import { calculateDistance, CPH_CENTRAL_STATION } from '@/lib/utils/distance';
 
 // Scraped vendor data structure (from vendors.json)
 interface ScrapedVendor {
@@ -14,6 +15,18 @@ interface ScrapedVendor {
   rating?: number | null;
   review_count?: number | null;
   capacity_min_max?: string | null;
+  // Parsed by the scraper (CleaningPipeline)
+  capacity_min?: number | null;
+  capacity_max?: number | null;
+  price_amount?: number | null;
+  price_currency?: string | null;
+  // Resolved offline by the scraper (GeocodingPipeline)
+  coordinates?: {
+    lat: number;
+    lng: number;
+    confidence: number;
+    precision: 'street' | 'postal_code' | 'postal_district' | 'locality' | 'manual';
+  } | null;
   amenities?: string[];
   images?: string[];
   url_source: string;
@@ -66,6 +79,20 @@ function extractPrice(priceStr: string | null | undefined): number {
   return 0;
 }
 
+/**
+ * Convert a price parsed by the scraper (price_amount/price_currency) to DKK
+ */
+function priceInDkk(amount: number, currency: string | null | undefined): number {
+  switch ((currency || 'DKK').toUpperCase()) {
+    case 'USD':
+      return usdToDkk(amount);
+    case 'EUR':
+      return Math.round(amount * 7.3);
+    default:
+      return Math.round(amount);
+  }
+}
+
 /**
  * Extract capacity number from capacity string
  */
@@ -115,8 +142,9 @@ function calculateFitScore(vendor: ScrapedVendor): number {
  * Note: Geocoding is done lazily in the map component to avoid blocking vendor loading
  */
 function transformVendor(scraped: ScrapedVendor, index: number): Vendor {
-  // Extract price from various price fields (now in DKK)
+  // Use the parsed price, else extract it from the price fields (now in DKK)
   const price = 
+    (scraped.price_amount != null ? priceInDkk(scraped.price_amount, scraped.price_currency) : 0) ||
     extractPrice(scraped.base_package_price) ||
     extractPrice(scraped.price_per_person) ||
     extractPrice(scraped.price_per_hour) ||
@@ -131,8 +159,8 @@ function transformVendor(scraped: ScrapedVendor, index: number): Vendor {
   // Get location from address or default
   const location = scraped.address_full || 'Copenhagen, Denmark';
   
-  // Extract capacity
-  const capacity = extractCapacity(scraped.capacity_min_max);
+  // Use the parsed capacity (lower bound of a range), else extract it
+  const capacity = scraped.capacity_min ?? scraped.capacity_max ?? extractCapacity(scraped.capacity_min_max);
   
   // Store capacity_min_max as string (e.g., "20-30")
   const capacityMinMax = scraped.capacity_min_max || undefined;
@@ -146,8 +174,11 @@ function transformVendor(scraped: ScrapedVendor, index: number): Vendor {
   // Determine availability (default to true if not specified)
   const availability = true; // Assume available unless we have data saying otherwise
   
-  // Note: lat, lng, and distanceFromCphCentral will be calculated lazily when needed
-  // (e.g., in the map component) to avoid blocking vendor loading with geocoding requests
+  // Coordinates are geocoded by the scraper at crawl time
+  const coordinates = scraped.coordinates || undefined;
+  const distanceFromCphCentral = coordinates
+    ? calculateDistance(coordinates.lat, coordinates.lng, CPH_CENTRAL_STATION.lat, CPH_CENTRAL_STATION.lng)
+    : undefined;
   
   return {
     id: `scraped-${index}`,
@@ -168,7 +199,11 @@ function transformVendor(scraped: ScrapedVendor, index: number): Vendor {
     addressFull: scraped.address_full || undefined,
     email: scraped.email || undefined,
     phone: scraped.phone || undefined,
-    // lat, lng, distanceFromCphCentral will be set lazily when geocoding is done
+    lat: coordinates?.lat,
+    lng: coordinates?.lng,
+    locationConfidence: coordinates?.confidence,
+    locationPrecision: coordinates?.precision,
+    distanceFromCphCentral,
   };
 }
 
@@ -177,8 +212,24 @@ function transformVendor(scraped: ScrapedVendor, index: number): Vendor {
  */
 export async function loadScrapedVendors(): Promise<Vendor[]> {
   try {
-    // Fetch the vendors.json file from the public directory
-    const response = await fetch('/vendors.json');
+    // Prefer the minified export listed in the scraper's manifest, versioned by its
+    // content hash so the browser can cache it until the catalogue changes
+    let url = '/vendors.json';
+    try {
+      const manifestResponse = await fetch('/vendors.manifest.json', { cache: 'no-cache' });
+      if (manifestResponse.ok) {
+        const manifest = await manifestResponse.json();
+        const minified = manifest?.files?.['vendors.min.json'];
+        if (minified?.sha256) {
+          url = `/vendors.min.json?v=${minified.sha256.slice(0, 16)}`;
+        }
+      }
+    } catch {
+      // No manifest: fall back to vendors.json
+    }
+    
+    // Fetch the vendors file from the public directory
+    const response = await fetch(url);
     
     if (!response.ok) {
       console.warn('Could not load vendors.json, using empty array');
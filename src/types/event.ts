@@ -75,6 +75,9 @@ export interface Vendor {
   phone?: string;
   lat?: number;
   lng?: number;
+  // How precisely lat/lng locate the vendor (0-1) and how they were found
+  locationConfidence?: number;
+  locationPrecision?: 'street' | 'postal_code' | 'postal_district' | 'locality' | 'manual';
   distanceFromCphCentral?: number; // In km
 }
 